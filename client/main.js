@@ -9,9 +9,10 @@ document.addEventListener('DOMContentLoaded', (event) => { // Event listener for
     const heuristicSelect = document.getElementById('heuristic-select'); // Getting reference to the heuristic select element
     const searchMethodInputs = document.querySelectorAll('input[name="search-method"]'); // Getting references to all search method input elements
     let searchId; // Declaring a variable to store search ID
+    let eventSource; // Declaring a variable to store the log stream of the current search
 
     function updateHeuristicVisibility() { // Function to update heuristic visibility
-        const isAStarSelected = Array.from(searchMethodInputs).some(input => input.value === 'a_star' && input.checked); // Checking if A* search method is selected
+        const isAStarSelected = Array.from(searchMethodInputs).some(input => (input.value === 'a_star' || input.value === 'race') && input.checked); // Checking if A* search method (alone or in a race) is selected
         heuristicSelect.classList.toggle('visible', isAStarSelected); // Toggling visibility of heuristic select based on A* selection
     }
 
@@ -21,13 +22,21 @@ document.addEventListener('DOMContentLoaded', (event) => { // Event listener for
 
     updateHeuristicVisibility(); // Initial check on page load
 
-    // EventSource to listen for logs from the server
-    const eventSource = new EventSource('/logs'); // Creating EventSource object to listen for server logs
-    eventSource.onmessage = function(event) { // Event handler for message event
-        const logItem = document.createElement('div'); // Creating a new div element for log item
-        logItem.textContent = event.data; // Setting text content of log item
-        logsElement.appendChild(logItem); // Appending log item to logs content
-    };
+    // Function to listen for the logs of one search from the server
+    function streamLogs(searchId) { // Function to open the log stream of a search
+        if (eventSource) { // Checking if the stream of a previous search is still open
+            eventSource.close(); // Closing the previous stream
+        }
+        eventSource = new EventSource(`/logs/${searchId}`); // Creating EventSource object to listen for the search's logs
+        eventSource.onmessage = function(event) { // Event handler for message event
+            const logItem = document.createElement('div'); // Creating a new div element for log item
+            logItem.textContent = event.data; // Setting text content of log item
+            logsElement.appendChild(logItem); // Appending log item to logs content
+        };
+        eventSource.addEventListener('end', function() { // Event handler for the end of the search's logs
+            eventSource.close(); // Closing the stream so the browser does not reconnect
+        });
+    }
 
     // Function to clear statistics
     function clearStatistics() { // Function to clear statistics
@@ -47,7 +56,7 @@ document.addEventListener('DOMContentLoaded', (event) => { // Event listener for
         const startPage = document.getElementById('start-page').value; // Getting value of start page input
         const finishPage = document.getElementById('finish-page').value; // Getting value of finish page input
         const searchMethod = document.querySelector('input[name="search-method"]:checked').value; // Getting value of selected search method
-        const heuristicChoice = document.getElementById('heuristic-choice') ? document.getElementById('heuristic-choice').value : 'links'; // Default to 'links' if not present
+        const heuristicChoice = document.getElementById('heuristic-choice') ? document.getElementById('heuristic-choice').value : 'titles'; // Default to 'titles' if not present
 
         fetch('/find_path', { // Fetching data from server
             method: 'POST', // Setting request method
@@ -73,8 +82,11 @@ document.addEventListener('DOMContentLoaded', (event) => { // Event listener for
             searchIdElement.textContent = `Search ID: ${searchId}`; // Setting search ID text content
             console.log('Search ID:', searchId); // Logging search ID
 
-            // Start polling for search results
-            pollForResults(searchId); // Calling function to poll for search results
+            // Start listening for the search's logs
+            streamLogs(searchId); // Calling function to open the log stream
+
+            // Start listening for the search's progress and results
+            streamResults(searchId, searchingElement); // Calling function to stream the search's results
         })
         .catch(error => { // Handling error
             console.error('Error:', error); // Logging error
@@ -116,41 +128,42 @@ document.addEventListener('DOMContentLoaded', (event) => { // Event listener for
 });
 
 
-function pollForResults(searchId) { // Function to poll for search results
-    setTimeout(() => { // Setting a timeout for polling
-        fetch(`/get_results/${searchId}`) // Fetching search results from server
-            .then(response => { // Handling response
-                if (response.status === 404) { // Checking if search results are not ready
-                    console.log('Search results not ready, continuing to poll.'); // Logging message
-                    setTimeout(() => pollForResults(searchId), 2000); // Polling again after 2 seconds
-                    return null; // Returning null
-                } else if (!response.ok) { // Checking if response is not okay
-                    throw new Error(`Results retrieval failed with status: ${response.status}`); // Throwing error with status
-                }
-                return response.json(); // Returning JSON parsed response
-            })
-            .then(data => { // Handling data
-                console.log('Received data:', data); // Logging data received from server
-                if (data) { // Checking if data exists
-                    console.log('Received path length:', data.path_length); // Logging received path length
-                    if (data.completed && data.path) { // Checking if search is completed and path found
-                        displayResults(data.path); // Displaying search results
-                        displayStatistics({ // Displaying statistics
-                            totalLinksFound: data.discovered,
-                            pathFound: data.completed,
-                            pathLength: data.path_length,
-                            searchTime: data.time,
-                            searchMethod: data.search_method
-                        });
-                    } else if (data.message === 'Search is in progress') { // If search is in progress
-                        setTimeout(() => pollForResults(searchId), 150000); // Polling again after 150 seconds
-                    }
-                }
-            })
-            .catch(error => { // Handling error
-                console.error('Error during result polling:', error); // Logging error
+function streamResults(searchId, searchingElement) { // Function to receive a search's progress and results as they happen
+    const resultSource = new EventSource(`/results/${searchId}`); // Creating EventSource object to listen for the search's progress and results
+    resultSource.addEventListener('progress', function(event) { // Event handler for progress snapshots
+        const progress = JSON.parse(event.data); // Parsing the progress snapshot
+        if (progress.queue_position) { // Checking if the search is still waiting for a worker
+            searchingElement.textContent = `Waiting to start (position ${progress.queue_position} in the queue)...`; // Showing the queue position
+        } else if (progress.status === 'running') { // Checking if the search is running
+            searchingElement.textContent = `Searching... ${progress.pages_expanded} pages expanded, ${progress.frontier_size} in the frontier, ` +
+                `${progress.links_found} links seen, ${progress.fetch_rate.toFixed(1)} pages/s`; // Showing the progress
+        }
+    });
+    resultSource.addEventListener('result', function(event) { // Event handler for the final results
+        resultSource.close(); // Closing the stream so the browser does not reconnect
+        const data = JSON.parse(event.data); // Parsing the results
+        console.log('Received data:', data); // Logging data received from server
+        if (data.completed && data.path) { // Checking if search is completed and path found
+            searchingElement.textContent = 'Search completed.'; // Updating searching text content
+            displayResults(data.path); // Displaying search results
+            displayStatistics({ // Displaying statistics
+                totalLinksFound: data.discovered,
+                pathFound: data.completed,
+                pathLength: data.path_length,
+                searchTime: data.time,
+                searchMethod: data.race ? `race (won by ${data.race.winner})` : data.search_method
             });
-    }, 2000); // Polling interval
+        } else if (data.budget_exhausted) { // If the search ran out of its budget
+            const budget = data.budget_exhausted; // The limit that stopped the search and the search's statistics
+            searchingElement.textContent = `Search stopped: ${budget.reason} limit of ${budget.limit} reached after ${budget.pages_expanded} pages ` +
+                `and ${budget.elapsed.toFixed(1)} seconds.`; // Showing which limit stopped the search
+        } else { // If the search ended without a path
+            searchingElement.textContent = data.error ? `Search ended: ${data.error}` : 'No path found.'; // Showing why the search ended
+        }
+    });
+    resultSource.onerror = function() { // Event handler for a dropped connection
+        console.error('Result stream interrupted, reconnecting.'); // Logging the interruption (the browser reconnects by itself)
+    };
 }
 
 function displayResults(searchResults) { // Function to display search results
@@ -0,0 +1,92 @@
+import re  # Importing re for the old link filter
+import sys  # Importing sys for reading command line arguments
+import time  # Importing time for timing the parsers
+import random  # Importing random for generating synthetic pages
+import argparse  # Importing argparse for the command line interface
+from urllib.parse import urljoin  # Importing urljoin for the old link normalization
+from bs4 import BeautifulSoup  # Importing BeautifulSoup for the old parser
+from extract import extract_links  # Importing the new link extractor
+from standin import render_article  # Importing render_article for generating synthetic pages
+from titles import title_to_url  # Importing title_to_url for building page URLs
+
+
+# Anchors that a naive scan gets wrong, checked against the old parser along with the benchmark pages
+EDGE_CASES = [
+    '<a data-href="/wiki/Data_attribute" href="/wiki/Real_link">data-href before href</a>',
+    '<a data-href="/wiki/Only_data_attribute">no href at all</a>',
+    '<a title="a > b" href="/wiki/After_quoted_angle_bracket">quoted &gt;</a>',
+    '<a title=\'see href="/wiki/Inside_quotes"\' href="/wiki/After_quoted_href">quoted href</a>',
+    '<A CLASS=x HREF=/wiki/Bare_uppercase>bare value</A>',
+    '<a\n  href="/wiki/Newline_before_href">newline</a>',
+    '<abbr href="/wiki/Not_an_anchor">abbr</abbr>',
+    '<!-- <a href="/wiki/Commented_out">comment</a> -->',
+    '<script>document.write(\'<a href="/wiki/Inside_script">x</a>\')</script>',
+    '<SCRIPT type="text/javascript">var s = "<!--"; var t = "<a href=/wiki/Inside_uppercase_script>";</SCRIPT>',
+    '<a href="/wiki/After_script">after script</a>',
+    '<style>/* <a href="/wiki/Inside_style"> */</style>',
+]
+
+
+# Define a function named old_extract_links that reproduces the BeautifulSoup-based parsing get_links used to do
+def old_extract_links(html, page_url):
+    soup = BeautifulSoup(html, 'html.parser')
+    all_links = [urljoin(page_url, a['href']) for a in soup.find_all('a', href=True)]
+    valid_links = [link for link in all_links if '#' not in link and re.match(r'^https://en\.wikipedia\.org/wiki/[^:]*$', link)]
+    return valid_links, len(all_links)
+
+
+# Define a function named synthetic_pages that generates Wikipedia-like pages with many links
+def synthetic_pages(count, links_per_page=400):
+    random.seed(0)
+    pages = []
+    for page_number in range(count):
+        title = f"Synthetic_page_{page_number}"
+        links = [f"Topic_{random.randrange(100000)}_(disambiguation)" for _ in range(links_per_page)]
+        pages.append((title_to_url(title), render_article(title, links)))
+    return pages
+
+
+# Define a function named measure that returns the pages per second of a parser over a list of pages
+def measure(parser, pages, repeat):
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        for page_url, html in pages:
+            parser(page_url, html)
+    return repeat * len(pages) / (time.perf_counter() - start_time)
+
+
+# Define a function named main that runs the benchmark
+def main():
+    parser = argparse.ArgumentParser(description='Compare the old BeautifulSoup link parsing with extract.extract_links.')
+    parser.add_argument('pages', nargs='*', help='saved article HTML files named Title.html (default: synthetic pages)')
+    parser.add_argument('--repeat', type=int, default=3, help='number of passes over the pages')
+    args = parser.parse_args()
+
+    # Load saved pages, or generate synthetic ones
+    if args.pages:
+        pages = []
+        for path in args.pages:
+            with open(path, encoding='utf-8') as page_file:
+                pages.append((title_to_url(path.rsplit('/', 1)[-1][:-len('.html')]), page_file.read()))
+    else:
+        pages = synthetic_pages(50)
+
+    # Check that scanning the whole page finds exactly what the old parser found, on the pages and the edge cases
+    edge_cases = [(title_to_url('Edge_case'), f"<html><body><p>{case}</p></body></html>") for case in EDGE_CASES]
+    for page_url, html in pages + edge_cases:
+        if old_extract_links(html, page_url) != extract_links(html, page_url, body_only=False):
+            print(f"Link sets differ on {page_url}: {html[:200]}", file=sys.stderr)
+
+    # Time the three variants
+    results = {
+        'beautifulsoup': measure(lambda page_url, html: old_extract_links(html, page_url), pages, args.repeat),
+        'scanner_whole_page': measure(lambda page_url, html: extract_links(html, page_url, body_only=False), pages, args.repeat),
+        'scanner_body_only': measure(lambda page_url, html: extract_links(html, page_url), pages, args.repeat),
+    }
+    for name, pages_per_second in results.items():
+        print(f"{name:20s} {pages_per_second:10.1f} pages/s")
+
+
+# Entry point of the benchmark
+if __name__ == '__main__':
+    main()
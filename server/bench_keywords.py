@@ -0,0 +1,93 @@
+import time  # Importing time for timing the keyword functions
+import random  # Importing random for generating synthetic pages
+import argparse  # Importing argparse for the command line interface
+from nltk.corpus import stopwords  # Importing NLTK's stopwords corpus for the old extraction
+from nltk.probability import FreqDist  # Importing FreqDist for the old extraction
+from nltk.tokenize import word_tokenize  # Importing word_tokenize for the old extraction
+from nltk import pos_tag  # Importing pos_tag for the old extraction
+import keywords  # Importing the new keyword extraction
+from similarity import KeywordEngine, METRICS  # Importing the keyword engine
+
+
+# Define a function named old_extract_keywords that reproduces extract_keywords as it was, rebuilding the stopword set on every call
+def old_extract_keywords(text):
+    words = word_tokenize(text)
+    stopwords_set = set(stopwords.words('english')).union(keywords.additional_stopwords)
+    filtered_words = [word.lower() for word in words if word.isalnum() and word.lower() not in stopwords_set]
+    tagged_words = pos_tag(filtered_words)
+    found = [word for word, tag in tagged_words if tag in keywords.KEYWORD_TAGS]
+    return {word: freq for word, freq in FreqDist(found).items() if freq > 1 and len(word) > 1}
+
+
+# Define a function named old_jaccard_distance that reproduces the set-based heuristic_by_content comparison
+def old_jaccard_distance(current_keywords, finish_keywords):
+    intersection = set(current_keywords.keys()) & set(finish_keywords.keys())
+    union = set(current_keywords.keys()) | set(finish_keywords.keys())
+    return 1 - (len(intersection) / len(union) if union else 0)
+
+
+# Define a function named synthetic_keywords that generates keyword dictionaries drawn from a Zipf-like vocabulary
+def synthetic_keywords(count, vocabulary_size=20000, terms_per_page=300):
+    vocabulary = [f"term{index}" for index in range(vocabulary_size)]
+    weights = [1 / (rank + 1) for rank in range(vocabulary_size)]
+    return [{term: random.randint(2, 20) for term in random.choices(vocabulary, weights, k=terms_per_page)}
+            for _ in range(count)]
+
+
+# Define a function named timed that returns the seconds a function call takes and its result
+def timed(function, *args):
+    start_time = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start_time, result
+
+
+# Define a function named bench_extraction that compares per-page keyword extraction
+def bench_extraction(pages):
+    random.seed(0)
+    vocabulary = ['the', 'mathematician', 'proved', 'theorem', 'computer', 'logic', 'machine', 'war', 'code', 'of',
+                  'Turing', 'studied', 'numbers', 'and', 'worked', 'on', 'problems', 'in', 'Cambridge', 'England']
+    texts = [' '.join(random.choices(vocabulary, k=3000)) + '.' for _ in range(pages)]
+    try:
+        keywords.load_nltk()
+    except LookupError:
+        print("extraction: skipped, the NLTK stopwords/punkt/tagger data is not installed")
+        return
+    old_seconds, _ = timed(lambda: [old_extract_keywords(text) for text in texts])
+    new_seconds, _ = timed(lambda: [keywords.extract_keywords(text) for text in texts])
+    print(f"extraction: old {pages / old_seconds:8.1f} pages/s, new {pages / new_seconds:8.1f} pages/s")
+
+
+# Define a function named bench_scoring that compares per-candidate set Jaccard with batch scoring
+def bench_scoring(candidates):
+    random.seed(1)
+    finish_keywords, *pages = synthetic_keywords(candidates + 1)
+    engine = KeywordEngine()
+
+    # Old: one set-based comparison per candidate
+    old_seconds, _ = timed(lambda: [old_jaccard_distance(page, finish_keywords) for page in pages])
+    print(f"scoring:    old set Jaccard      {candidates / old_seconds:12.0f} candidates/s")
+
+    # New: vectorize the candidates, then score the whole batch in one operation per metric
+    vectorize_seconds, vectors = timed(lambda: [engine.vectorize(page) for page in pages])
+    for vector in vectors:
+        engine.observe(vector)
+    target = engine.target(finish_keywords)
+    print(f"scoring:    vectorize            {candidates / vectorize_seconds:12.0f} candidates/s")
+    for metric in METRICS:
+        score_seconds, _ = timed(engine.score, target, vectors, metric)
+        print(f"scoring:    batch {metric:14s} {candidates / score_seconds:12.0f} candidates/s")
+
+
+# Define a function named main that runs the benchmark
+def main():
+    parser = argparse.ArgumentParser(description='Compare keyword extraction and similarity scoring with the old functions.')
+    parser.add_argument('--pages', type=int, default=20, help='number of pages for keyword extraction')
+    parser.add_argument('--candidates', type=int, default=5000, help='number of candidate pages to score')
+    args = parser.parse_args()
+    bench_extraction(args.pages)
+    bench_scoring(args.candidates)
+
+
+# Entry point of the benchmark
+if __name__ == '__main__':
+    main()
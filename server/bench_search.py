@@ -0,0 +1,248 @@
+import os  # Importing os for pointing the crawler at the stand-in server
+import sys  # Importing sys for reporting where the output went
+import json  # Importing json for the machine-readable output
+import time  # Importing time for wall-clock timings
+import random  # Importing random for picking (start, finish) pairs
+import argparse  # Importing argparse for the command line interface
+import tempfile  # Importing tempfile for throwaway link caches
+import statistics  # Importing statistics for the per-method summary
+import tracemalloc  # Importing tracemalloc for peak memory
+from collections import deque, Counter  # Importing deque for the reference breadth-first distances, and Counter for the race wins
+from queue import Queue  # Importing Queue for collecting (and discarding) search logs
+from standin import StandinServer, synthetic_graph, synthetic_pages, load_pages  # Importing the local stand-in for en.wikipedia.org
+from titles import title_to_url, url_to_title  # Importing title helpers for building page URLs
+from extract import extract_links  # Importing extract_links for reading the graph of recorded pages
+from scheduler import SearchContext, SearchBudget  # Importing the search context and budget for limiting each search
+from linkgraph import LinkGraph, build_graph  # Importing the offline link graph for the landmark heuristic
+from landmarks import Landmarks, build_landmarks  # Importing the landmark precomputation for the landmark heuristic
+import frontier  # Importing frontier for setting the spill threshold of the searches
+
+# Search methods the benchmark can run
+METHODS = ['breadth-first', 'bidirectional', 'a_star', 'race']
+
+
+# Define a function named page_graph that returns {title: [linked titles]} of a set of pages, as the crawler would see it
+def page_graph(pages):
+    return {title: [url_to_title(link) for link in extract_links(html, title_to_url(title))[0]] for title, html in pages.items()}
+
+
+# Define a function named distances_from that returns the number of links from a title to every title reachable from it
+def distances_from(graph, start):
+    distances = {start: 0}
+    queue = deque([start])
+    while queue:
+        title = queue.popleft()
+        for link in graph.get(title, []):
+            if link not in distances:
+                distances[link] = distances[title] + 1
+                queue.append(link)
+    return distances
+
+
+# Define a function named pick_pairs that picks (start, finish, distance) triples at distances 2 to max_distance, spread evenly over the distances
+def pick_pairs(graph, count, max_distance, seed):
+    rng = random.Random(seed)
+    titles = sorted(graph)
+    by_distance = {distance: [] for distance in range(2, max_distance + 1)}
+    for start in rng.sample(titles, min(len(titles), 50)):
+        for finish, distance in sorted(distances_from(graph, start).items()):
+            if distance in by_distance:
+                by_distance[distance].append((start, finish, distance))
+    pairs = []
+    while len(pairs) < count and any(by_distance.values()):
+        for distance in sorted(by_distance):
+            if by_distance[distance] and len(pairs) < count:
+                candidates = by_distance[distance]
+                pairs.append(candidates.pop(rng.randrange(len(candidates))))
+    return pairs
+
+
+# Define a function named reset_crawler that gives the crawler empty caches, so every run starts cold
+def reset_crawler(crawler, standin_url, cache_directory):
+    from fetcher import Fetcher
+    from linkcache import LinkCache
+    from similarity import KeywordEngine
+    from redirects import RedirectTable
+    crawler.fetcher = Fetcher(host_overrides={'en.wikipedia.org': standin_url})
+    crawler.link_cache = LinkCache(os.path.join(cache_directory, f"links-{time.perf_counter_ns()}.sqlite"))
+    crawler.redirect_table = RedirectTable(os.path.join(cache_directory, f"redirects-{time.perf_counter_ns()}.sqlite"))
+    crawler.redirects_loaded.clear()
+    crawler.keyword_engine = KeywordEngine(metric=crawler.SIMILARITY_METRIC)
+    crawler.get_page_text.cache_clear()
+    crawler.get_page_keywords.cache_clear()
+
+
+# Define a function named run_search that runs one search and returns its measurements
+def run_search(crawler, standin, method, start, finish, args, landmarks=None):
+    start_page, finish_page = title_to_url(start), title_to_url(finish)
+    logs = Queue()
+    requests_before = standin.requests
+    if args.memory:
+        tracemalloc.start()
+    context = SearchContext('bench', budget=SearchBudget(args.deadline, args.max_pages))
+    context.started_at = time.time()
+    start_time = time.perf_counter()
+    error = None
+    path, total_links = None, 0
+    heuristic = (lambda page: 0) if args.heuristic == 'zero' else None
+    if args.heuristic == 'landmarks':
+        heuristic = landmarks.heuristic(finish_page)
+    refine_top_k = 5 if args.heuristic == 'content' else 0
+
+    # Define a function named run_method that runs one search method under a context (the benchmark's, or a race strategy's)
+    def run_method(method, method_context):
+        if method == 'breadth-first':
+            return crawler.breadth_first_search(start_page, finish_page, logs, method_context.search_id, max_workers=args.concurrency, context=method_context)
+        if method == 'bidirectional':
+            return crawler.bidirectional_search(start_page, finish_page, logs, method_context.search_id, max_workers=args.concurrency, context=method_context)
+        return crawler.a_star(start_page, finish_page, logs, method_context.search_id, heuristic=heuristic, refine_top_k=refine_top_k, context=method_context)
+
+    try:
+        if method == 'race':
+            strategies = {name: (lambda strategy_context, name=name: run_method(name, strategy_context)) for name in METHODS if name != 'race'}
+            path, _, discovered, _, total_links = crawler.race_search(start_page, finish_page, logs, 'bench', strategies, context=context)
+        else:
+            path, _, discovered, _, total_links = run_method(method, context)
+    except Exception as e:
+        # Keep the first line of the message that says something (NLTK's LookupError starts with a row of asterisks)
+        message = next((line.strip() for line in str(e).splitlines() if any(char.isalpha() for char in line)), '')
+        error = f"{type(e).__name__}: {message}"
+        discovered = 0
+    wall_seconds = time.perf_counter() - start_time
+    # The strategies that lost a race stop at their next check, after the fetches they have started; let them, so they do not
+    # write into the next search's cold cache
+    while any(strategy.finished_at is None for strategy in context.strategies.values()) or crawler.fetches_in_flight:
+        time.sleep(0.01)
+    peak_memory = None
+    if args.memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {
+        'method': method,
+        'start': start,
+        'finish': finish,
+        'wall_seconds': wall_seconds,
+        'pages_fetched': standin.requests - requests_before,
+        'links_parsed': total_links,
+        'discovered': discovered,
+        'pages_expanded': context.pages_expanded,
+        'peak_memory_bytes': peak_memory,
+        'path_length': len(path) - 1 if path else None,
+        'path': [url_to_title(page) for page in path] if path else None,
+        'budget_exhausted': context.exhausted,
+        'race_winner': context.race['winner'] if context.race else None,
+        'error': error,
+    }
+
+
+# Define a function named check_path that tells whether every step of a path follows a link of the graph
+def check_path(graph, path):
+    return all(link in graph.get(title, ()) for title, link in zip(path, path[1:]))
+
+
+# Define a function named summarize that returns per-method totals and medians
+def summarize(results):
+    summary = {}
+    for method in dict.fromkeys(result['method'] for result in results):
+        runs = [result for result in results if result['method'] == method]
+        found = [result for result in runs if result['path']]
+        summary[method] = {
+            'runs': len(runs),
+            'paths_found': len(found),
+            'shortest_paths': sum(result['optimal'] for result in runs),
+            'errors': sum(1 for result in runs if result['error']),
+            'budgets_exhausted': sum(1 for result in runs if result['budget_exhausted']),
+            'median_wall_seconds': statistics.median(result['wall_seconds'] for result in runs),
+            'max_wall_seconds': max(result['wall_seconds'] for result in runs),
+            'total_wall_seconds': sum(result['wall_seconds'] for result in runs),
+            'total_pages_fetched': sum(result['pages_fetched'] for result in runs),
+            'total_links_parsed': sum(result['links_parsed'] for result in runs),
+            'total_pages_expanded': sum(result['pages_expanded'] for result in runs),
+            'max_peak_memory_bytes': max((result['peak_memory_bytes'] or 0) for result in runs),
+        }
+        if method == 'race':
+            summary[method]['wins'] = dict(Counter(result['race_winner'] for result in runs))
+    return summary
+
+
+# Define a function named main that runs the benchmark and writes the results as JSON
+def main():
+    parser = argparse.ArgumentParser(description='Run the searches against a local stand-in for Wikipedia and report their cost as JSON.')
+    parser.add_argument('--pages', help='directory of recorded Title.html files (default: a synthetic graph)')
+    parser.add_argument('--synthetic', type=int, default=2000, help='number of synthetic pages')
+    parser.add_argument('--degree', type=int, default=20, help='links per synthetic page')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic graph and of the pair selection')
+    parser.add_argument('--pairs', type=int, default=8, help='number of (start, finish) pairs')
+    parser.add_argument('--pairs-file', help='JSON list of [start title, finish title] pairs to use instead')
+    parser.add_argument('--max-distance', type=int, default=4, help='largest number of links between a start and finish page')
+    parser.add_argument('--methods', default=','.join(METHODS), help='comma-separated search methods')
+    parser.add_argument('--heuristic', choices=['titles', 'content', 'zero', 'landmarks'], default='titles', help='A* heuristic')
+    parser.add_argument('--landmarks', type=int, default=16, help='number of landmarks precomputed for the landmark heuristic')
+    parser.add_argument('--latency', type=float, default=0.005, help='seconds the stand-in adds to every response')
+    parser.add_argument('--deadline', type=float, help='seconds each search may run')
+    parser.add_argument('--max-pages', type=int, help='pages each search may expand')
+    parser.add_argument('--concurrency', type=int, default=8, help='parallel fetches of the breadth-first and bidirectional searches')
+    parser.add_argument('--spill-at', type=int, help='frontier entries kept in memory before spilling to disk (default: WIKI_FRONTIER_SPILL_AT)')
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help='skip tracemalloc (it slows the searches down)')
+    parser.add_argument('--output', help='file to write the JSON to (default: standard output)')
+    args = parser.parse_args()
+
+    # Build the corpus and serve it locally
+    if args.pages:
+        pages = load_pages(args.pages)
+        graph = page_graph(pages)
+    else:
+        graph = synthetic_graph(args.synthetic, args.degree, seed=args.seed)
+        pages = synthetic_pages(graph)
+    standin = StandinServer(pages, latency=args.latency)
+    standin.start()
+
+    # Point the crawler at the stand-in before it builds its fetcher
+    os.environ['WIKI_STANDIN'] = standin.url
+    import crawler
+    if args.spill_at is not None:
+        frontier.SPILL_AT = args.spill_at
+
+    if args.pairs_file:
+        with open(args.pairs_file) as pairs_file:
+            pairs = [(start, finish, distances_from(graph, start).get(finish)) for start, finish in json.load(pairs_file)]
+    else:
+        pairs = pick_pairs(graph, args.pairs, args.max_distance, args.seed)
+
+    results = []
+    with tempfile.TemporaryDirectory() as cache_directory:
+        # The landmark heuristic reads its distances from an offline graph of the same corpus, as a dump would give
+        landmarks = None
+        if args.heuristic == 'landmarks':
+            graph_directory = os.path.join(cache_directory, 'graph')
+            build_graph(((title, link) for title, links in graph.items() for link in links), graph_directory)
+            build_landmarks(graph_directory, args.landmarks)
+            landmarks = Landmarks(LinkGraph(graph_directory))
+        for method in args.methods.split(','):
+            for start, finish, distance in pairs:
+                reset_crawler(crawler, standin.url, cache_directory)
+                result = run_search(crawler, standin, method, start, finish, args, landmarks)
+                result['distance'] = distance
+                result['valid'] = bool(result['path']) and check_path(graph, result['path'])
+                result['optimal'] = result['valid'] and result['path_length'] == distance
+                results.append(result)
+    standin.stop()
+
+    report = {
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'pages': len(pages),
+        'summary': summarize(results),
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+        print(f"Wrote {len(results)} results to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+# Entry point of the benchmark
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+import os  # Importing os for locating the server directory
+import sys  # Importing sys for the interpreter path
+import json  # Importing json for the machine-readable output
+import argparse  # Importing argparse for the command line interface
+import statistics  # Importing statistics for medians
+import subprocess  # Importing subprocess for starting cold interpreters
+
+# Program run in a fresh interpreter: import the server, then serve its first request in process
+STARTUP_PROGRAM = '''
+import json, sys, time
+start_time = time.perf_counter()
+import server
+imported_time = time.perf_counter()
+response = server.app.test_client().get(sys.argv[1])
+served_time = time.perf_counter()
+print(json.dumps({
+    "import_seconds": imported_time - start_time,
+    "first_request_seconds": served_time - imported_time,
+    "status": response.status_code,
+    "nltk_loaded": "nltk" in sys.modules,
+    "bs4_loaded": "bs4" in sys.modules,
+}))
+'''
+
+
+# Define a function named measure_startup that runs one cold start and returns its timings
+def measure_startup(path):
+    server_directory = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, '-c', STARTUP_PROGRAM, path], cwd=server_directory,
+                            capture_output=True, text=True, check=True)
+    # The timings are the last line of output; the server may print before it
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+# Define a function named main that runs the benchmark and prints the results as JSON
+def main():
+    parser = argparse.ArgumentParser(description='Measure the time from a cold interpreter to the first request served by server.py.')
+    parser.add_argument('--runs', type=int, default=5, help='number of cold starts')
+    parser.add_argument('--path', default='/', help='path of the first request')
+    args = parser.parse_args()
+
+    runs = [measure_startup(args.path) for _ in range(args.runs)]
+    print(json.dumps({
+        'runs': args.runs,
+        'import_seconds': statistics.median(run['import_seconds'] for run in runs),
+        'first_request_seconds': statistics.median(run['first_request_seconds'] for run in runs),
+        'total_seconds': statistics.median(run['import_seconds'] + run['first_request_seconds'] for run in runs),
+        'status': runs[-1]['status'],
+        'nltk_loaded': any(run['nltk_loaded'] for run in runs),
+        'bs4_loaded': any(run['bs4_loaded'] for run in runs),
+    }, indent=2))
+
+
+# Entry point of the benchmark
+if __name__ == '__main__':
+    main()
@@ -1,138 +1,255 @@
 import requests  # Importing the requests library for making HTTP requests
-from bs4 import BeautifulSoup  # Importing BeautifulSoup for web scraping
-from urllib.parse import urljoin  # Importing urljoin for URL manipulation
-import nltk  # Importing the Natural Language Toolkit library
-from nltk.corpus import stopwords  # Importing NLTK's stopwords corpus
-from collections import Counter  # Importing Counter for counting occurrences
+import os  # Importing os for reading configuration from the environment
+import json  # Importing json for parsing MediaWiki API responses
 import time  # Importing the time module for time-related functions
-from queue import PriorityQueue, Queue  # Importing Queue and PriorityQueue for implementing data structures
-import re  # Importing re for regular expressions
-import requests_cache  # Importing requests_cache for caching HTTP responses
-from flask import Flask, request, jsonify, send_from_directory, Response  # Importing Flask modules for web server functionality
-from flask_limiter import Limiter  # Importing Limiter for rate limiting in Flask
-from flask_limiter.util import get_remote_address  # Importing get_remote_address for IP address handling in Flask
-from threading import Event  # Importing Event for synchronization between threads
-from collections import deque  # Importing deque for implementing a double-ended queue
-import heapq  # Importing heapq for heap queue algorithm
+from threading import Event, Lock  # Importing Event and Lock for synchronization between threads
 from functools import lru_cache  # Importing lru_cache for memoization
-from nltk.corpus import wordnet  # Importing NLTK's WordNet corpus for lexical database
-from nltk.probability import FreqDist  # Importing FreqDist for frequency distribution
-from nltk.tokenize import word_tokenize  # Importing word_tokenize for tokenization
-from nltk import pos_tag  # Importing pos_tag for part-of-speech tagging
-from requests import Session  # Importing Session for HTTP session management
-from collections import namedtuple  # Importing namedtuple for creating named tuples
-
-# Add any domain-specific stopwords
-additional_stopwords = {'example', 'another_word', 'more_noise'}
-
-# Global cache for finish page keywords
-finish_page_keywords_cache = None
-search_states = {}
-
-# Download necessary NLTK packages
-nltk.download('punkt')  # Downloading the 'punkt' tokenizer model
-nltk.download('stopwords')  # Downloading the stopwords corpus
-nltk.download('averaged_perceptron_tagger')  # POS tagger
-
-# Initialize caching for requests
-session = Session()  # Creating a session object for making HTTP requests
-requests_cache.install_cache('my_cache')  # Setting up a cache for HTTP responses
-
-# Event for aborting the search
-abort_search_event = Event()  # Creating an event object for aborting the search
-
-# Queue for logging messages
-logs_queue = Queue()  # Creating a queue for logging messages
-
-# Define a function named extract_keywords that takes a text as input
-def extract_keywords(text):
-    # Tokenize the input text into words
-    words = word_tokenize(text)
-    
-    # Create a set of English stopwords and union it with additional stopwords
-    stopwords_set = set(stopwords.words('english')).union(additional_stopwords)
-    
-    # Filter out non-alphanumeric words and stopwords, converting them to lowercase
-    filtered_words = [word.lower() for word in words if word.isalnum() and word.lower() not in stopwords_set]
-    
-    # Tag the filtered words with their parts of speech
-    tagged_words = pos_tag(filtered_words)
-    
-    # Extract words that are nouns (singular and plural) or verbs (various forms)
-    keywords = [word for word, tag in tagged_words if tag in {'NN', 'NNS', 'NNP', 'NNPS', 'VB', 'VBD', 'VBG', 'VBN', 'VBP', 'VBZ'}]
-    
-    # Create a frequency distribution of the extracted keywords
-    freq_dist = FreqDist(keywords)
-    
-    # Filter out keywords that occur less than twice and have a length greater than one character
-    significant_keywords = {word: freq for word, freq in freq_dist.items() if freq > 1 and len(word) > 1}
-    
-    # Return the dictionary of significant keywords
-    return significant_keywords
+from urllib.parse import urlencode  # Importing urlencode for building MediaWiki API queries
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED  # Importing thread pool tools for concurrent frontier expansion
+from contextlib import closing  # Importing closing for stopping level expansion early
+from itertools import islice  # Importing islice for submitting fetches in bounded batches
+from fetcher import Fetcher  # Importing Fetcher for pooled, cached HTTP requests
+from linkcache import LinkCache  # Importing LinkCache for persisting extracted links and keywords
+from redirects import RedirectTable  # Importing RedirectTable for resolving redirects to their target articles
+from titles import url_to_title, title_to_url  # Importing title helpers for keying the link cache
+from extract import extract_links, extract_canonical  # Importing extract_links for scanning article bodies for links, and extract_canonical for spotting redirects
+from keywords import extract_keywords, extract_text, title_terms  # Importing text and keyword extraction
+from similarity import KeywordEngine  # Importing KeywordEngine for vectorized keyword similarity
+import numpy as np  # Importing NumPy for batch heuristic scores
+from parsepool import ParsePool  # Importing ParsePool for parsing pages in worker processes
+from nodes import NodeBitset, NodeArray, build_path  # Importing compact node id structures for the searches
+from frontier import SpillQueue, SpillHeap, SpillTable  # Importing the frontier structures that spill to disk past WIKI_FRONTIER_SPILL_AT entries
+from scheduler import get_context  # Importing get_context for the per-search cancel token, target keywords and counters
+from logstream import LogChannel, log, log_enabled, DEBUG, ERROR  # Importing the bounded log channels and verbosity levels
+import metrics  # Importing metrics for latency histograms and cache counters
+from metrics import Counter, Histogram, timed, collector  # Importing the metric types
+
+# Optional origin (such as a local standin.py server) that receives all en.wikipedia.org requests
+WIKI_STANDIN = os.environ.get('WIKI_STANDIN')
+
+# Shared fetcher used for every page request; it keeps no HTML, since the link cache below holds what searches need from a page
+fetcher = Fetcher(host_overrides={'en.wikipedia.org': WIKI_STANDIN} if WIKI_STANDIN else None)
+
+# MediaWiki API endpoint used for backlinks ("what links here"), and the most backlinks read per page (hubs have millions)
+WIKI_API_URL = 'https://en.wikipedia.org/w/api.php'
+BACKLINKS_LIMIT = 5000
+
+# Persistent cache of extracted links and keywords by title, shared by all server processes
+LINK_CACHE_TTL = 7 * 86400  # Seconds before a cached link list is fetched again
+LINK_CACHE_MAX_PAGES = 500000  # Number of pages kept before the least recently used ones are evicted
+link_cache = LinkCache('link_cache.sqlite', ttl=LINK_CACHE_TTL, max_entries=LINK_CACHE_MAX_PAGES)
+
+# Persistent table of redirects, filled from fetched pages, the API and redirect dumps (see redirects.py)
+redirect_table = RedirectTable('redirects.sqlite')
+
+# Titles whose incoming redirects have been read from the API by load_redirects_to
+redirects_loaded = set()
+
+# Fetches of page links in progress by title (to an Event set when the fetch ends), so searches running at the same time
+# (such as the strategies of a race) fetch a page once and the others read its links from the link cache
+fetches_in_flight = {}
+fetches_lock = Lock()
+
+# Keyword engine shared by the A* heuristics; the metric is 'jaccard', 'cosine' or 'tfidf'
+SIMILARITY_METRIC = 'jaccard'
+keyword_engine = KeywordEngine(metric=SIMILARITY_METRIC)
+
+# Optional pool of worker processes for HTML parsing and keyword extraction, set up by configure_parse_pool
+parse_pool = None
+
+# Latency histograms of the hot paths, exported by the /metrics endpoint
+LINKS_SECONDS = Histogram('wiki_get_links_seconds', 'Seconds to read the links of a page, by where they came from')
+FETCH_SECONDS = Histogram('wiki_fetch_seconds', 'Seconds to fetch a page for its links')
+PARSE_SECONDS = Histogram('wiki_parse_seconds', 'Seconds to extract the links of a fetched page')
+PAGE_TEXT_SECONDS = Histogram('wiki_page_text_seconds', 'Seconds to fetch a page and extract its paragraph text')
+KEYWORD_SECONDS = Histogram('wiki_keyword_extraction_seconds', 'Seconds to extract the keywords of a page, by where they were extracted')
+HEURISTIC_SECONDS = Histogram('wiki_heuristic_seconds', 'Seconds to score a batch of pages, by heuristic')
+RACE_WINS = Counter('wiki_race_wins_total', 'Races by the strategy that found a path first (none if no strategy did)')
+
+# Bounded channel for server-wide log messages that belong to no search
+logs_queue = LogChannel()
+
+# Define a function named record_time that records the seconds since start_time in a histogram and in a search's timings
+def record_time(start_time, histogram=None, context=None, name=None, **labels):
+    if not metrics.ENABLED:
+        return
+    seconds = time.perf_counter() - start_time
+    if histogram is not None:
+        histogram.observe(seconds, **labels)
+    if context is not None:
+        context.add_time(name, seconds)
+
+
+# Define a function named cache_metrics that exports the hit counts the caches already keep
+@collector
+def cache_metrics():
+    page_text, page_keywords = get_page_text.cache_info(), get_page_keywords.cache_info()
+    link_stats, fetch_stats = link_cache.stats(), fetcher.stats()
+    return [
+        ('wiki_memory_cache_requests_total', 'counter', 'Calls of the in-memory page caches by result',
+         [({'cache': 'page_text', 'result': 'hit'}, page_text.hits), ({'cache': 'page_text', 'result': 'miss'}, page_text.misses),
+          ({'cache': 'page_keywords', 'result': 'hit'}, page_keywords.hits), ({'cache': 'page_keywords', 'result': 'miss'}, page_keywords.misses)]),
+        ('wiki_link_cache_requests_total', 'counter', 'Lookups in the persistent link cache by result',
+         [({'result': result}, link_stats[name]) for name, result in (('hits', 'hit'), ('misses', 'miss'), ('stale', 'stale'))]),
+        ('wiki_page_cache_requests_total', 'counter', 'Page requests by how the HTTP cache answered them',
+         [({'result': result}, fetch_stats[name]) for name, result in (('hits', 'hit'), ('misses', 'miss'), ('revalidations', 'revalidated'))]),
+        ('wiki_fetch_retries_total', 'counter', 'Page requests retried after a transient failure', [({}, fetch_stats['retries'])]),
+        ('wiki_fetch_errors_total', 'counter', 'Page requests that failed', [({}, fetch_stats['errors'])]),
+        ('wiki_fetch_bytes_total', 'counter', 'Bytes of pages downloaded', [({}, fetch_stats['bytes'])]),
+        ('wiki_redirects_followed_total', 'counter', 'Titles resolved to another article through the redirect table',
+         [({}, redirect_table.stats()['redirects_followed'])]),
+    ]
+
+
+# Define a function named canonical_page that returns the canonical URL of a page: its normalized title, through any known redirect
+def canonical_page(page_url):
+    return title_to_url(redirect_table.resolve(url_to_title(page_url)))
+
+
+# Define a function named canonical_links that turns link titles into the URLs of the articles they lead to, without duplicates
+def canonical_links(link_titles):
+    return [title_to_url(title) for title in dict.fromkeys(redirect_table.resolve_many(link_titles))]
+
+
+# Define a function named configure_parse_pool that moves parsing to the given number of worker processes (0 turns it off)
+def configure_parse_pool(processes):
+    global parse_pool
+    if parse_pool is not None:
+        parse_pool.shutdown()
+    parse_pool = ParsePool(processes) if processes else None
+
+
+# Define a function named get_page_content that takes a URL as input and returns the raw HTML bytes
+def get_page_content(url):
+    try:
+        # Fetch the page through the shared fetcher (raises an exception if the status code is not OK)
+        return fetcher.fetch(url).content
+    except requests.exceptions.RequestException as e:
+        # Log the failure to retrieve the page along with the error message
+        log(logs_queue, f"Failed to retrieve page: {url} with error: {e}", ERROR)
+        # Return empty content in case of failure
+        return b''
 
 
 # Decorator to cache results of the function with a maximum size of 100
 @lru_cache(maxsize=100)
+@timed(PAGE_TEXT_SECONDS)
 # Define a function named get_page_text that takes a URL as input
 def get_page_text(url):
-    try:
-        # Make a GET request to the URL using the session object
-        response = session.get(url)
-        # Raise an exception if the response status code is not OK
-        response.raise_for_status()
-        # Parse the HTML content of the response using BeautifulSoup
-        soup = BeautifulSoup(response.text, 'html.parser')
-        # Extract text from all <p> tags and join them into a single string
-        text = ' '.join(p.text for p in soup.find_all('p'))
-        # Return the extracted text
-        return text
-    except requests.exceptions.RequestException as e:
-        # Log the failure to retrieve the page along with the error message
-        logs_queue.put(f"Failed to retrieve page: {url} with error: {e}")
-        # Return an empty string in case of failure
-        return ''
+    # Get the HTML of the page
+    content = get_page_content(url)
+    # Extract text from all <p> tags and join them into a single string
+    return extract_text(content.decode('utf-8', errors='replace')) if content else ''
 
 
 # Decorator to cache results of the function with a maximum size of 100
 @lru_cache(maxsize=100)
 # Define a function named get_page_keywords that takes a URL as input
 def get_page_keywords(url):
-    # Get the text content of the page from the provided URL
-    text = get_page_text(url)
-    
-    # Extract significant keywords from the page text using the extract_keywords function
-    keywords = extract_keywords(text)
+    # Serve the keywords from the persistent link cache if they are there
+    title = url_to_title(url)
+    keywords = link_cache.get_keywords(title)
+    if keywords is not None:
+        return keywords
+
+    if parse_pool is not None:
+        # Hand the raw HTML to a worker process, which parses it and extracts the keywords
+        content = get_page_content(url)
+        start_time = time.perf_counter()
+        keywords = parse_pool.keywords(content) if content else {}
+        record_time(start_time, KEYWORD_SECONDS, where='pool')
+    else:
+        # Get the text content of the page and extract significant keywords from it
+        content = get_page_text(url)
+        start_time = time.perf_counter()
+        keywords = extract_keywords(content)
+        record_time(start_time, KEYWORD_SECONDS, where='local')
+
+    # Store the keywords for later searches, unless the page could not be retrieved
+    if content:
+        link_cache.put_keywords(title, keywords)
+        # Count the page's terms in the document frequencies used by the TF-IDF metric
+        keyword_engine.observe(keyword_engine.vectorize(keywords))
     
     # Return the extracted keywords
     return keywords
 
 
+# Define a function named claim_fetch that claims the fetch of a title for the calling thread
+# It returns None if the caller is to fetch the page, or the Event that is set when another thread's fetch of it ends
+def claim_fetch(title):
+    with fetches_lock:
+        in_flight = fetches_in_flight.get(title)
+        if in_flight is None:
+            fetches_in_flight[title] = Event()
+        return in_flight
+
+
+# Define a function named release_fetch that ends the calling thread's fetch of a title and wakes the threads waiting for it
+def release_fetch(title):
+    with fetches_lock:
+        fetches_in_flight.pop(title).set()
+
+
 # Define a function named get_links that takes a page URL, logs queue, and search ID as input
 def get_links(page_url, logs_queue, search_id):
-    # Access the global variable search_states
-    global search_states
-    
-    # Check if the search is completed or if the search has been aborted
-    if search_states.get(search_id, {}).get('completed', False) or abort_search_event.is_set():
-        # If either condition is met, return an empty list of links and a link count of 0
+    # Check if the search has been aborted
+    context = get_context(search_id)
+    if context.cancelled:
+        # Return an empty list of links and a link count of 0 for an aborted search
         return [], 0
+
+    # Serve the links from the persistent link cache, skipping both the network and HTML parsing
+    # Pages are looked up by canonical title, so URL variants and known redirects share one entry
+    start_time = time.perf_counter()
+    title = redirect_table.resolve(url_to_title(page_url))
+    cached = link_cache.get_links(title)
+    # When another search is fetching the page already, wait for it and read the links it stored (and fetch the page here only if it failed)
+    while cached is None:
+        in_flight = claim_fetch(title)
+        if in_flight is None:
+            break
+        while not in_flight.wait(0.1):
+            if context.cancelled:
+                return [], 0
+        title = redirect_table.resolve(title)
+        cached = link_cache.get_links(title)
+    if cached is not None:
+        link_titles, total_links_count = cached
+        logs_queue.put(f"Found {len(link_titles)} cached links on page: {page_url}")
+        record_time(start_time, LINKS_SECONDS, context, 'link_cache', source='cache')
+        return canonical_links(link_titles), total_links_count
+    fetch_title = title
     
     try:
-        # Make a GET request to the page URL
-        response = requests.get(page_url)
-        response.raise_for_status()  # Raise an exception if the response status code is not OK
+        # Fetch the page through the shared fetcher (raises an exception if the status code is not OK)
+        fetch_start_time = time.perf_counter()
+        # The fetch (retries included) is cut short when the search's deadline comes first
+        response = fetcher.fetch(title_to_url(title), deadline=context.deadline_at())
+        record_time(fetch_start_time, FETCH_SECONDS, context, 'fetch')
         
-        # Parse the HTML content of the response using BeautifulSoup
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Extract all links from the page and join them with the base URL
-        all_links = [urljoin(page_url, a['href']) for a in soup.find_all('a', href=True)]
-        
-        # Count the total number of links found on the page
-        total_links_count = len(all_links)
-        
-        # Filter out invalid links (links with '#' and links not pointing to Wikipedia articles)
-        valid_links = [link for link in all_links if '#' not in link and re.match(r'^https://en\.wikipedia\.org/wiki/[^:]*$', link)]
+        # Scan the article body for links to other Wikipedia articles (links with '#' and non-article links are filtered out)
+        # The scan runs in a worker process when the parse pool is enabled
+        parse_start_time = time.perf_counter()
+        if parse_pool is not None:
+            content = response.content
+            valid_links, total_links_count = parse_pool.links(content, page_url)
+        else:
+            content = response.text
+            valid_links, total_links_count = extract_links(content, page_url)
+        record_time(parse_start_time, PARSE_SECONDS, context, 'parse')
+
+        # A redirect is served with its target's content and canonical link: remember it, and store the links under the target
+        canonical_url = extract_canonical(content)
+        if canonical_url is not None and url_to_title(canonical_url) != title:
+            redirect_table.add(title, url_to_title(canonical_url))
+            logs_queue.put(f"Page {page_url} redirects to {canonical_url}")
+            title = url_to_title(canonical_url)
+
+        # Store the links by title and return them in the same canonical form the cache serves
+        link_titles = [url_to_title(link) for link in valid_links]
+        link_cache.put_links(title, link_titles, total_links_count)
+        valid_links = canonical_links(link_titles)
         
         # Log the number of valid links found on the page
         logs_queue.put(f"Found {len(valid_links)} valid links on page: {page_url}")
@@ -141,61 +258,194 @@ def get_links(page_url, logs_queue, search_id):
         logs_queue.put(f"Found {total_links_count} total links on page: {page_url}")
         
         # Return the list of valid links and the total number of links
+        record_time(start_time, LINKS_SECONDS, context, 'fetch_links', source='fetch')
         return valid_links, total_links_count
     
     except requests.exceptions.RequestException as e:
         # Log the failure to retrieve the page along with the error message
         error_type = type(e).__name__
-        logs_queue.put(f"Failed to retrieve page: {page_url} with error [{error_type}]: {e}")
+        log(logs_queue, f"Failed to retrieve page: {page_url} with error [{error_type}]: {e}", ERROR)
+        record_time(start_time, LINKS_SECONDS, context, 'failed_fetch', source='error')
         
         # Return an empty list of links and a link count of 0
         return [], 0
 
+    finally:
+        # Let the searches waiting for this page read its links
+        release_fetch(fetch_title)
 
 
-# Define a function named precompute_finish_page_keywords that takes a finish page URL as input
-def precompute_finish_page_keywords(finish_page):
-    # Access the global variable finish_page_keywords_cache
-    global finish_page_keywords_cache
-    
-    # Get the text content of the finish page
-    finish_text = get_page_text(finish_page)
-    
-    # Extract keywords from the finish page text and store them in the finish_page_keywords_cache
-    finish_page_keywords_cache = extract_keywords(finish_text)
 
-def heuristic_by_content(current_page, finish_page_keywords_cache):
-    # Get the keywords from the current page using the get_page_keywords function
-    current_keywords = get_page_keywords(current_page)
-    
-    # Calculate the Jaccard similarity coefficient between the current page keywords and finish page keywords
-    intersection = set(current_keywords.keys()) & set(finish_page_keywords_cache.keys())
-    union = set(current_keywords.keys()) | set(finish_page_keywords_cache.keys())
-    similarity = len(intersection) / len(union) if union else 0
-    
-    # Calculate the distance as 1 minus the similarity
-    distance = 1 - similarity
-    
-    # Return the calculated distance
-    return distance
+# Define a function named get_backlinks that takes a page URL, logs queue, and search ID as input
+# It returns the pages linking to the given page (the predecessors used by the backward half of bidirectional_search)
+def get_backlinks(page_url, logs_queue, search_id):
+    # Check if the search has been aborted
+    context = get_context(search_id)
+    if context.cancelled:
+        return [], 0
+    start_time = time.perf_counter()
 
-# Define a function named a_star that takes start and finish page URLs, logs queue, and search ID as input
-def a_star(start_page, finish_page, logs_queue, search_id):
-    # Use global variables for search states and finish page keywords cache
-    global search_states, finish_page_keywords_cache
+    # Ask the backlinks API for articles (namespace 0) linking to the page, following continuations up to the limit
+    params = {'action': 'query', 'list': 'backlinks', 'bltitle': url_to_title(page_url), 'blnamespace': 0,
+              'blfilterredir': 'nonredirects', 'bllimit': 'max', 'format': 'json', 'formatversion': 2}
+    backlinks = []
+    try:
+        while len(backlinks) < BACKLINKS_LIMIT:
+            data = json.loads(fetcher.fetch(WIKI_API_URL + '?' + urlencode(params), deadline=context.deadline_at()).content)
+            backlinks.extend(title_to_url(page['title'].replace(' ', '_')) for page in data.get('query', {}).get('backlinks', []))
+            if 'continue' not in data:
+                break
+            params['blcontinue'] = data['continue']['blcontinue']
+    except (requests.exceptions.RequestException, ValueError) as e:
+        # Log the failure and continue with the backlinks read so far
+        error_type = type(e).__name__
+        log(logs_queue, f"Failed to retrieve backlinks of page: {page_url} with error [{error_type}]: {e}", ERROR)
+
+    # Log the number of backlinks found
+    logs_queue.put(f"Found {len(backlinks)} backlinks of page: {page_url}")
+    record_time(start_time, LINKS_SECONDS, context, 'backlinks', source='backlinks')
+    return backlinks, len(backlinks)
+
+
+# Define a function named load_redirects_to that reads the titles redirecting to a page from the API into the redirect table
+# With them known, a link to any redirect of the finish page is recognized as soon as it is seen, instead of once it is fetched
+# If the page is itself a redirect, the API resolves it first and that redirect is recorded too
+def load_redirects_to(page_url, logs_queue):
+    title = redirect_table.resolve(url_to_title(page_url))
+    if title in redirects_loaded:
+        return
+    params = {'action': 'query', 'prop': 'redirects', 'titles': title, 'redirects': 1, 'rdnamespace': 0,
+              'rdlimit': 'max', 'rdprop': 'title', 'format': 'json', 'formatversion': 2}
+    redirects = []
+    try:
+        while True:
+            data = json.loads(fetcher.fetch(WIKI_API_URL + '?' + urlencode(params)).content)
+            query = data.get('query', {})
+            redirects.extend((url_to_title(redirect['from']), url_to_title(redirect['to'])) for redirect in query.get('redirects', []))
+            for page in query.get('pages', []):
+                target = url_to_title(page['title'])
+                redirects.extend((url_to_title(redirect['title']), target) for redirect in page.get('redirects', []))
+            if 'continue' not in data:
+                break
+            params['rdcontinue'] = data['continue']['rdcontinue']
+    except (requests.exceptions.RequestException, ValueError) as e:
+        # Log the failure; the redirects are still learned one by one as they are fetched
+        error_type = type(e).__name__
+        log(logs_queue, f"Failed to retrieve redirects to page: {page_url} with error [{error_type}]: {e}", ERROR)
+        return
+    redirect_table.add_many(redirects, 'api')
+    redirects_loaded.update({title, redirect_table.resolve(title)})
+    logs_queue.put(f"Found {len(redirects)} redirects to page: {page_url}")
+
+
+# Define a function named canonical_endpoints that returns the canonical start and finish pages of a search, and how to canonicalize expanded pages
+# Pages expanded through get_links can turn out to be redirects; an offline link graph has its redirects resolved when it is built
+# (see linkgraph.iter_dump_edges), so its pages need no canonicalizing and None is returned for it
+def canonical_endpoints(start_page, finish_page, logs_queue, link_source=None):
+    canonical = None
+    if link_source is None:
+        load_redirects_to(finish_page, logs_queue)
+        canonical = canonical_page
+    return canonical_page(start_page), canonical_page(finish_page), canonical
+
+
+# Define a function named follow_redirect that checks whether an expanded page turned out to be a redirect
+# The page's node then also stands for the redirect's target, so links to the target are not expanded again
+# It returns the node the target stands for, or None if the page is not a redirect
+def follow_redirect(canonical, table, node):
+    if canonical is None:
+        return None
+    page = table.url(node)
+    target_page = canonical(page)
+    if target_page == page:
+        return None
+    return table.alias(target_page, node)
+
+
+# Define a function named precompute_finish_page_keywords that takes a finish page URL and an optional search context as input
+def precompute_finish_page_keywords(finish_page, context=None):
+    # Extract keywords from the finish page (through the link cache and parse pool) and keep them in the search's context
+    finish_keywords = get_page_keywords(finish_page)
+    if context is not None:
+        context.finish_keywords = finish_keywords
+    return finish_keywords
+
+# Define a function named heuristic_by_content that estimates the distance of one page from its content
+def heuristic_by_content(current_page, finish_keywords):
+    # Score the page against the finish page keywords with the keyword engine's similarity measure
+    target = keyword_engine.target(finish_keywords)
+    return float(heuristic_by_content_batch([current_page], target)[0])
+
+
+# Define a function named heuristic_by_content_batch that estimates the distance of a batch of pages from their content
+# Each page's keywords are fetched (or read from the link cache) and all pages are scored against the target in one operation
+@timed(HEURISTIC_SECONDS, heuristic='content')
+def heuristic_by_content_batch(pages, target):
+    vectors = [keyword_engine.vectorize(get_page_keywords(page)) for page in pages]
+    return 1 - keyword_engine.score(target, vectors)
+
+
+# Define a function named heuristic_by_titles that estimates the distance of a batch of pages from their titles alone
+# It needs no page fetches: the titles are already known from the links of the current page
+@timed(HEURISTIC_SECONDS, heuristic='titles')
+def heuristic_by_titles(pages, target):
+    vectors = [keyword_engine.vectorize(title_terms(page)) for page in pages]
+    return 1 - keyword_engine.coverage(target, vectors)
+
+
+# Define a function named score_neighbors that estimates the distance of a batch of neighbor pages to the target
+# Every page gets the title heuristic; the refine_top_k most promising ones are then rescored by content (one fetch each)
+def score_neighbors(pages, target, refine_top_k=0):
+    costs = heuristic_by_titles(pages, target)
+    if refine_top_k and len(pages):
+        best = np.argsort(costs, kind='stable')[:refine_top_k]
+        costs[best] = heuristic_by_content_batch([pages[index] for index in best], target)
+    return costs.tolist()
 
-    # Ensure the finish page keywords are precomputed
-    assert finish_page_keywords_cache is not None, "Finish page keywords are not precomputed"
 
-    # Initialize the open set with the start page and its path
-    open_set = []
-    heapq.heappush(open_set, (0, start_page, [start_page]))
+# Define a function named a_star that takes start and finish page URLs, logs queue, and search ID as input
+# Neighbors are scored with the title heuristic, refined by content for the refine_top_k best ones of each expansion
+# An optional link source (such as a linkgraph.LinkGraph) replaces get_links, and an optional per-page heuristic replaces the scoring
+# A heuristic with a batch method scores each expansion's neighbors at once; one marked admissible (such as landmarks.LandmarkHeuristic) makes the search stop only when the finish page is taken off the open set, so the path is a shortest one
+# The search context (looked up by search ID if not given) carries the cancel token, finish page keywords and counters
+def a_star(start_page, finish_page, logs_queue, search_id, link_source=None, heuristic=None, refine_top_k=0, context=None):
+    context = context or get_context(search_id)
+    start_page, finish_page, canonical = canonical_endpoints(start_page, finish_page, logs_queue, link_source)
+
+    # Score the neighbors of each expansion in one batch
+    if heuristic is not None:
+        score_batch = getattr(heuristic, 'batch', None) or (lambda pages: [heuristic(page) for page in pages])
+    else:
+        # The keyword heuristics need the finish page keywords, computed here unless they were precomputed
+        if context.finish_keywords is None:
+            precompute_finish_page_keywords(finish_page, context)
+        target = keyword_engine.target(context.finish_keywords)
+        score_batch = lambda pages: score_neighbors(pages, target, refine_top_k)
+
+    # Expand pages through the link source if one is given
+    expand = link_source.get_links if link_source is not None else get_links
+
+    # Other heuristics may overestimate, so the search returns as soon as it sees the finish page
+    stop_when_seen = not getattr(heuristic, 'admissible', False)
+
+    # Intern page URLs to integer node ids; paths are rebuilt from parent pointers only when the finish page is reached
+    # The table and the frontier move to disk when they outgrow frontier.SPILL_AT, the visited bitset and parent array stay compact in memory
+    table = SpillTable()
+    start_node = table.intern(start_page)
+    finish_node = table.intern(finish_page)
+    parents = NodeArray()
+
+    # Initialize the open set with the start node (entries are estimated cost, node id)
+    open_set = SpillHeap()
+    open_set.push(0, start_node)
     
-    # Dictionary to store the cost of the path from the start page to the current page
-    g_costs = {start_page: 0}
+    # Array storing the cost of the path from the start page to each node (-1 for nodes not reached yet)
+    g_costs = NodeArray()
+    g_costs[start_node] = 0
+    discovered = 1
     
-    # Set to keep track of the pages that have already been evaluated
-    closed_set = set()
+    # Bitset keeping track of the nodes that have already been evaluated
+    closed_set = NodeBitset()
     
     # Initialize the total count of links processed
     total_links_count = 0
@@ -204,95 +454,199 @@ def a_star(start_page, finish_page, logs_queue, search_id):
     start_time = time.time()
 
     # Continue the search while there are pages to evaluate and the search is not completed
-    while open_set and not search_states.get(search_id, {}).get('completed', False):
+    while open_set:
         # Check if the search has been aborted
-        if abort_search_event.is_set():
-            logs_queue.put(f"Search {search_id} aborted by user request.")
-            return None, time.time() - start_time, len(g_costs), 'a_star', total_links_count
-
-        # Get the page with the lowest estimated cost from the open set
-        _, current_page, path = heapq.heappop(open_set)
-
-        # If the current page is the finish page, return the successful path
-        if current_page == finish_page:
+        if context.cancelled:
+            logs_queue.put(f"Search {search_id} {context.stop_message()}.")
+            return None, time.time() - start_time, discovered, 'a_star', total_links_count
+
+        # Get the node with the lowest estimated cost from the open set, skipping outdated entries
+        _, current_node = open_set.pop()
+        if current_node in closed_set:
+            continue
+
+        # If the current node is the finish node, return the successful path
+        if current_node == finish_node:
+            path = build_path(parents, current_node, table)
             logs_queue.put(f"Search {search_id} completed. Path found: {path}")
-            return path, time.time() - start_time, len(g_costs), 'a_star', total_links_count
+            return path, time.time() - start_time, discovered, 'a_star', total_links_count
 
-        # Add the current page to the closed set
-        closed_set.add(current_page)
+        # Add the current node to the closed set
+        closed_set.add(current_node)
 
         # Retrieve valid links from the current page and update the total link count
-        valid_links, page_links_count = get_links(current_page, logs_queue, search_id)
+        valid_links, page_links_count = expand(table.url(current_node), logs_queue, search_id)
         total_links_count += page_links_count
+        context.count_page(page_links_count)
+        context.frontier_size = len(open_set)
+        context.visited_size = discovered
+
+        # A page can turn out to be a redirect once fetched; one to the finish page ends the search
+        if follow_redirect(canonical, table, current_node) == finish_node:
+            path = build_path(parents, current_node, table)[:-1] + [finish_page]
+            logs_queue.put(f"Search {search_id} completed. Path found: {path}")
+            return path, time.time() - start_time, discovered, 'a_star', total_links_count
+
+        # Evaluate each neighbor linked from the current page, collecting the ones to score
+        to_score = []
+        for neighbor_page in valid_links:
+            neighbor = table.intern(neighbor_page)
 
-        # Evaluate each neighbor linked from the current page
-        for neighbor in valid_links:
             # Skip the neighbor if it has already been evaluated
             if neighbor in closed_set:
                 continue
 
             # Calculate the tentative cost to reach the neighbor
-            tentative_g_cost = g_costs[current_page] + 1
+            tentative_g_cost = g_costs[current_node] + 1
 
-            # If the neighbor has not been evaluated or a shorter path to it is found
-            if neighbor not in g_costs or tentative_g_cost < g_costs[neighbor]:
-                # Update the cost to reach the neighbor
+            # If the neighbor has not been reached yet or a shorter path to it is found
+            if g_costs[neighbor] == -1 or tentative_g_cost < g_costs[neighbor]:
+                if g_costs[neighbor] == -1:
+                    discovered += 1
+                # Update the cost and the parent of the neighbor
                 g_costs[neighbor] = tentative_g_cost
-                # Estimate the total cost using the heuristic
-                heuristic_cost = heuristic_by_content(neighbor, finish_page_keywords_cache)
-                estimated_total_cost = tentative_g_cost + heuristic_cost
-                # Add the neighbor to the open set with the updated path
-                heapq.heappush(open_set, (estimated_total_cost, neighbor, path + [neighbor]))
+                parents[neighbor] = current_node
 
                 # If the neighbor is the finish page, return the successful path
-                if neighbor == finish_page:
-                    logs_queue.put(f"Search {search_id} completed. Path found: {path + [neighbor]}")
-                    return path + [neighbor], time.time() - start_time, len(g_costs), 'a_star', total_links_count
+                if neighbor == finish_node and stop_when_seen:
+                    path = build_path(parents, neighbor, table)
+                    logs_queue.put(f"Search {search_id} completed. Path found: {path}")
+                    return path, time.time() - start_time, discovered, 'a_star', total_links_count
+
+                to_score.append((neighbor_page, neighbor))
+
+        # Estimate the total costs of the new neighbors in one batch and add them to the open set
+        score_start_time = time.perf_counter()
+        heuristic_costs = score_batch([neighbor_page for neighbor_page, _ in to_score])
+        record_time(score_start_time, context=context, name='heuristic')
+        for (_, neighbor), heuristic_cost in zip(to_score, heuristic_costs):
+            open_set.push(g_costs[neighbor] + heuristic_cost, neighbor)
 
     # If no path is found, log the conclusion and return the search details
     logs_queue.put(f"Search {search_id} concluded without finding a path.")
-    return None, time.time() - start_time, len(g_costs), 'a_star', total_links_count
+    return None, time.time() - start_time, discovered, 'a_star', total_links_count
+
+
 
+# Define a generator named expand_level that expands a list of pages and yields (page, valid links, link count) for each
+# With max_workers set, pages are fetched in parallel in bounded batches and yielded in completion order
+def expand_level(pages, expand, logs_queue, search_id, max_workers=None):
+    # Without a worker count, expand the pages one after another
+    if not max_workers:
+        for page in pages:
+            valid_links, page_links_count = expand(page, logs_queue, search_id)
+            yield page, valid_links, page_links_count
+        return
+
+    # Event that makes fetches which have not started yet return immediately once the caller stops
+    stop_event = Event()
+
+    # Define a function named guarded_expand that skips the fetch if the level is no longer needed
+    def guarded_expand(page):
+        if stop_event.is_set():
+            return [], 0
+        return expand(page, logs_queue, search_id)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pages = iter(pages)
+    pending = {}
+    try:
+        # Keep at most two fetches per worker in flight so a huge level is expanded in bounded batches
+        for page in islice(pages, 2 * max_workers):
+            pending[executor.submit(guarded_expand, page)] = page
+
+        while pending:
+            # Wait for the next fetch to finish and refill the batch
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                page = pending.pop(future)
+                next_page = next(pages, None)
+                if next_page is not None:
+                    pending[executor.submit(guarded_expand, next_page)] = next_page
+                valid_links, page_links_count = future.result()
+                yield page, valid_links, page_links_count
+    finally:
+        # Stop outstanding fetches when the level is done or the caller has found its target
+        stop_event.set()
+        executor.shutdown(wait=False, cancel_futures=True)
 
 
 # Define a function named breadth_first_search that takes start and finish page URLs, logs queue, and search ID as input
-def breadth_first_search(start_page, finish_page, logs_queue, search_id):
-    # Initialize queue with start page and discovered set with start page
-    queue = deque([(start_page, [start_page])])
-    discovered = set([start_page])
+# An optional link source (such as a linkgraph.LinkGraph) replaces get_links, and max_workers expands each level concurrently
+def breadth_first_search(start_page, finish_page, logs_queue, search_id, link_source=None, max_workers=None, context=None):
+    context = context or get_context(search_id)
+    start_page, finish_page, canonical = canonical_endpoints(start_page, finish_page, logs_queue, link_source)
+
+    # Expand pages through the link source if one is given
+    expand = link_source.get_links if link_source is not None else get_links
+
+    # Intern page URLs to integer node ids; paths are rebuilt from parent pointers only when the finish page is reached
+    # The table and the frontier move to disk when they outgrow frontier.SPILL_AT, the visited bitset and parent array stay compact in memory
+    table = SpillTable()
+    start_node = table.intern(start_page)
+    finish_node = table.intern(finish_page)
+    parents = NodeArray()
+
+    # Initialize queue with the start node and the discovered bitset with the start node
+    queue = SpillQueue([start_node])
+    discovered = NodeBitset()
+    discovered.add(start_node)
     
     # Record start time and initialize total links count
     start_time = time.time()
     total_links_count = 0
 
-    # Main loop: continue until queue is empty
+    # Main loop: continue until queue is empty, expanding one whole level at a time
     while queue:
-        # Check if search has been aborted
-        if abort_search_event.is_set():
-            logs_queue.put(f"Search {search_id} aborted by user request.")
-            return None, time.time() - start_time, len(discovered), 'breadth-first', total_links_count
-
-        # Dequeue a vertex and its path
-        current_vertex, path = queue.popleft()
-        logs_queue.put(f"Dequeued: {current_vertex}, Path: {path}")
-        
-        # Get valid links from the current vertex and count page links
-        valid_links, page_links_count = get_links(current_vertex, logs_queue, search_id)
-        total_links_count += page_links_count
-
-        # Explore neighbors of the current vertex
-        for next_page in set(valid_links) - discovered:
-            discovered.add(next_page)
-            new_path = path + [next_page]
-            logs_queue.put(f"Enqueueing: {next_page}, New path: {new_path}")
-
-            # Check if finish page is reached
-            if next_page == finish_page:
-                logs_queue.put(f"Finish page found: {next_page}, Final path: {new_path}")
-                return new_path, time.time() - start_time, len(discovered), 'breadth-first', total_links_count
-
-            # Enqueue the neighbor and its new path
-            queue.append((next_page, new_path))
+        # Take the current level off the queue; its pages are streamed from it (and from disk if it spilled)
+        level, queue = queue, SpillQueue()
+        remaining = len(level)
+
+        with closing(expand_level((table.url(node) for node in level), expand, logs_queue, search_id, max_workers)) as expansions:
+            for current_vertex, valid_links, page_links_count in expansions:
+                # Check if search has been aborted
+                if context.cancelled:
+                    logs_queue.put(f"Search {search_id} {context.stop_message()}.")
+                    return None, time.time() - start_time, len(discovered), 'breadth-first', total_links_count
+
+                logs_queue.put(f"Dequeued: {current_vertex}")
+                current_node = table.id_of(current_vertex)
+                total_links_count += page_links_count
+                context.count_page(page_links_count)
+                remaining -= 1
+                context.frontier_size = remaining + len(queue)
+                context.visited_size = len(discovered)
+
+                # A page can turn out to be a redirect once fetched; one to the finish page ends the search
+                if follow_redirect(canonical, table, current_node) == finish_node:
+                    new_path = build_path(parents, current_node, table)[:-1] + [finish_page]
+                    logs_queue.put(f"Finish page found: {current_vertex}, Final path: {new_path}")
+                    return new_path, time.time() - start_time, len(discovered), 'breadth-first', total_links_count
+
+                # Only format a message per link when someone is listening at debug level
+                verbose = log_enabled(logs_queue, DEBUG)
+
+                # Explore neighbors of the current vertex
+                for next_page in valid_links:
+                    next_node = table.intern(next_page)
+                    if next_node in discovered:
+                        continue
+                    discovered.add(next_node)
+                    parents[next_node] = current_node
+                    if verbose:
+                        log(logs_queue, f"Enqueueing: {next_page}", DEBUG)
+
+                    # Check if finish page is reached
+                    if next_node == finish_node:
+                        new_path = build_path(parents, next_node, table)
+                        logs_queue.put(f"Finish page found: {next_page}, Final path: {new_path}")
+                        return new_path, time.time() - start_time, len(discovered), 'breadth-first', total_links_count
+
+                    # Enqueue the neighbor for the next level
+                    queue.append(next_node)
+
+        # Remove the expanded level's spill file
+        level.close()
 
     # If the loop completes without finding the finish page, log and return
     logs_queue.put(f"Search {search_id} concluded without finding the finish page.")
@@ -300,60 +654,264 @@ def breadth_first_search(start_page, finish_page, logs_queue, search_id):
 
 
 # Define a function named bidirectional_search that takes start and finish page URLs, logs queue, and search ID as input
-def bidirectional_search(start_page, finish_page, logs_queue, search_id):
-    # Access global variable
-    global search_states
+# The start side follows outgoing links and the finish side follows backlinks, always expanding the smaller frontier
+# An optional link source (such as a linkgraph.LinkGraph) replaces get_links and get_backlinks, and max_workers expands each level concurrently
+def bidirectional_search(start_page, finish_page, logs_queue, search_id, link_source=None, max_workers=None, context=None):
+    context = context or get_context(search_id)
+    start_page, finish_page, canonical = canonical_endpoints(start_page, finish_page, logs_queue, link_source)
+
+    # Expand pages through the link source if one is given
+    expand_forward = link_source.get_links if link_source is not None else get_links
+    expand_backward = link_source.get_backlinks if link_source is not None else get_backlinks
 
     # If start and finish pages are the same, return immediately
     if start_page == finish_page:
         logs_queue.put("Start and finish pages are the same for search_id: {}".format(search_id))
         return [start_page], 0, 1, 'bidirectional', 1
 
-    # Initialize queues, visited sets, total links count, and start time
-    start_queue = deque([(start_page, [start_page])])
-    finish_queue = deque([(finish_page, [finish_page])])
-    start_visited = {start_page: [start_page]}
-    finish_visited = {finish_page: [finish_page]}
+    # Intern page URLs to integer node ids; each side keeps its own parent pointers and visited bitset
+    # Start-side parents point back towards the start page, finish-side parents point on towards the finish page
+    table = SpillTable()
+    start_node = table.intern(start_page)
+    finish_node = table.intern(finish_page)
+    start_parents, finish_parents = NodeArray(), NodeArray()
+    start_visited, finish_visited = NodeBitset(), NodeBitset()
+    start_visited.add(start_node)
+    finish_visited.add(finish_node)
+
+    # Initialize frontiers, total links count, and start time
+    start_frontier = SpillQueue([start_node])
+    finish_frontier = SpillQueue([finish_node])
     total_links_count = 0
     start_time = time.time()
 
-    # Main loop: continue until either queue becomes empty
-    while start_queue and finish_queue:
-        # Check if search has been completed or aborted
-        if search_states.get(search_id, {}).get('completed', False) or abort_search_event.is_set():
-            logs_queue.put("Search {} aborted or already completed.".format(search_id))
-            return None, time.time() - start_time, len(start_visited) + len(finish_visited), 'bidirectional', total_links_count
-
-        # Process nodes from the start queue
-        current_start, path_start = start_queue.popleft()
-        start_valid_links, start_page_links_count = get_links(current_start, logs_queue, search_id)
-        total_links_count += start_page_links_count
-
-        # Explore neighbors of the current start node
-        for link in start_valid_links:
-            if link not in start_visited:
-                start_visited[link] = path_start + [link]
-                start_queue.append((link, start_visited[link]))
-                # Check if a meeting point is found
-                if link in finish_visited:
-                    combined_path = start_visited[link] + finish_visited[link][::-1][1:]
-                    return combined_path, time.time() - start_time, len(start_visited) + len(finish_visited), 'bidirectional', total_links_count
-
-        # Process nodes from the finish queue
-        current_finish, path_finish = finish_queue.popleft()
-        finish_valid_links, finish_page_links_count = get_links(current_finish, logs_queue, search_id)
-        total_links_count += finish_page_links_count
-
-        # Explore neighbors of the current finish node
-        for link in finish_valid_links:
-            if link not in finish_visited:
-                finish_visited[link] = path_finish + [link]
-                finish_queue.append((link, finish_visited[link]))
-                # Check if a meeting point is found
-                if link in start_visited:
-                    combined_path = finish_visited[link][:-1] + start_visited[link][::-1]
-                    return combined_path[::-1], time.time() - start_time, len(start_visited) + len(finish_visited), 'bidirectional', total_links_count
+    # Main loop: expand one whole level of the smaller frontier at a time until either side runs out
+    # The first meeting point found this way lies on a shortest path
+    while start_frontier and finish_frontier:
+        # Pick the side to expand and the other side to look for a meeting point in
+        expand_start_side = len(start_frontier) <= len(finish_frontier)
+        if expand_start_side:
+            frontier, expand, visited, parents, other_visited = start_frontier, expand_forward, start_visited, start_parents, finish_visited
+        else:
+            frontier, expand, visited, parents, other_visited = finish_frontier, expand_backward, finish_visited, finish_parents, start_visited
+        next_frontier = SpillQueue()
+
+        with closing(expand_level((table.url(node) for node in frontier), expand, logs_queue, search_id, max_workers)) as expansions:
+            for current_page, valid_links, page_links_count in expansions:
+                # Check if search has been aborted
+                if context.cancelled:
+                    logs_queue.put("Search {} {}.".format(search_id, context.stop_message()))
+                    return None, time.time() - start_time, len(start_visited) + len(finish_visited), 'bidirectional', total_links_count
+
+                current_node = table.id_of(current_page)
+                total_links_count += page_links_count
+                context.count_page(page_links_count)
+                context.frontier_size = len(start_frontier) + len(finish_frontier) + len(next_frontier)
+                context.visited_size = len(start_visited) + len(finish_visited)
+
+                # A page of the start side can turn out to be a redirect once fetched; one into the finish side joins the two halves
+                if expand_start_side:
+                    target_node = follow_redirect(canonical, table, current_node)
+                    if target_node is not None and target_node in finish_visited:
+                        combined_path = build_path(start_parents, current_node, table)[:-1] + build_path(finish_parents, target_node, table)[::-1]
+                        return combined_path, time.time() - start_time, len(start_visited) + len(finish_visited), 'bidirectional', total_links_count
+
+                # Explore neighbors of the current node
+                for link in valid_links:
+                    node = table.intern(link)
+                    if node not in visited:
+                        visited.add(node)
+                        parents[node] = current_node
+                        next_frontier.append(node)
+                        # Check if a meeting point is found and join the two halves at it
+                        if node in other_visited:
+                            combined_path = build_path(start_parents, node, table) + build_path(finish_parents, node, table)[::-1][1:]
+                            return combined_path, time.time() - start_time, len(start_visited) + len(finish_visited), 'bidirectional', total_links_count
+
+        # Replace the expanded frontier, removing its spill file
+        frontier.close()
+        if expand_start_side:
+            start_frontier = next_frontier
+        else:
+            finish_frontier = next_frontier
 
     # If the loop completes without finding a path, log and return
     logs_queue.put("Search {} concluded without finding a path.".format(search_id))
     return None, time.time() - start_time, len(start_visited) + len(finish_visited), 'bidirectional', total_links_count
+
+
+# Define a function named multi_target_search that finds shortest paths from one start page to many finish pages in a single breadth-first traversal
+# All finish pages share the fetches and the visited set; each one is reported through on_path(finish page, path) the moment it is reached
+# It returns ({finish page: path} for the finish pages reached, time, discovered, method, total links) and stops once every finish page is reached
+def multi_target_search(start_page, finish_pages, logs_queue, search_id, link_source=None, max_workers=None, context=None, on_path=None):
+    context = context or get_context(search_id)
+
+    # Expand pages through the link source if one is given
+    expand = link_source.get_links if link_source is not None else get_links
+
+    # Canonicalize the pages; with get_links, the redirects to every finish page are read first so links to them count as reaching it
+    # (an offline link graph needs no canonicalizing, see canonical_endpoints)
+    canonical = None
+    if link_source is None:
+        for finish_page in finish_pages:
+            load_redirects_to(finish_page, logs_queue)
+        canonical = canonical_page
+    start_page = canonical_page(start_page)
+
+    # Intern page URLs to integer node ids; targets maps the node of every finish page not reached yet to its URL
+    table = SpillTable()
+    start_node = table.intern(start_page)
+    targets = {}
+    for finish_page in finish_pages:
+        finish_page = canonical_page(finish_page)
+        targets[table.intern(finish_page)] = finish_page
+    parents = NodeArray()
+    paths = {}
+
+    # Define a function named reach that records the path to a finish page
+    def reach(node, path):
+        finish_page = targets.pop(node)
+        paths[finish_page] = path
+        logs_queue.put(f"Finish page found: {finish_page}, Final path: {path} ({len(targets)} finish pages left)")
+        if on_path is not None:
+            on_path(finish_page, path)
+
+    # Initialize queue with the start node and the discovered bitset with the start node
+    queue = SpillQueue([start_node])
+    discovered = NodeBitset()
+    discovered.add(start_node)
+    if start_node in targets:
+        reach(start_node, [start_page])
+
+    # Record start time and initialize total links count
+    start_time = time.time()
+    total_links_count = 0
+
+    # Main loop: expand one whole level at a time until every finish page is reached or the queue is empty
+    while queue and targets:
+        # Take the current level off the queue; its pages are streamed from it (and from disk if it spilled)
+        level, queue = queue, SpillQueue()
+        remaining = len(level)
+
+        with closing(expand_level((table.url(node) for node in level), expand, logs_queue, search_id, max_workers)) as expansions:
+            for current_vertex, valid_links, page_links_count in expansions:
+                # Check if search has been aborted
+                if context.cancelled:
+                    logs_queue.put(f"Search {search_id} {context.stop_message()}.")
+                    return paths, time.time() - start_time, len(discovered), 'breadth-first', total_links_count
+
+                current_node = table.id_of(current_vertex)
+                total_links_count += page_links_count
+                context.count_page(page_links_count)
+                remaining -= 1
+                context.frontier_size = remaining + len(queue)
+                context.visited_size = len(discovered)
+
+                # A page can turn out to be a redirect once fetched; one to a finish page reaches it
+                target_node = follow_redirect(canonical, table, current_node)
+                if target_node in targets:
+                    reach(target_node, build_path(parents, current_node, table)[:-1] + [targets[target_node]])
+
+                # Explore neighbors of the current vertex
+                for next_page in valid_links:
+                    next_node = table.intern(next_page)
+                    if next_node in discovered:
+                        continue
+                    discovered.add(next_node)
+                    parents[next_node] = current_node
+
+                    # Check if a finish page is reached
+                    if next_node in targets:
+                        reach(next_node, build_path(parents, next_node, table))
+
+                    # Enqueue the neighbor for the next level
+                    queue.append(next_node)
+
+                # Stop as soon as every finish page has been reached
+                if not targets:
+                    return paths, time.time() - start_time, len(discovered), 'breadth-first', total_links_count
+
+        # Remove the expanded level's spill file
+        level.close()
+
+    # If the loop completes without reaching every finish page, log and return
+    logs_queue.put(f"Search {search_id} concluded with {len(paths)} of {len(paths) + len(targets)} finish pages reached.")
+    return paths, time.time() - start_time, len(discovered), 'breadth-first', total_links_count
+
+
+
+# Define a function named strategy_report that describes what one strategy of a race cost, for the race's result
+def strategy_report(context, outcome, path=None, error=None):
+    strategy_metrics = context.metrics()
+    return {
+        'outcome': outcome,  # 'won', 'lost' (cancelled once another strategy won), 'no_path', 'exhausted', 'cancelled' or 'error'
+        'seconds': strategy_metrics['run_seconds'],
+        'pages_expanded': strategy_metrics['pages_expanded'],
+        'links_found': strategy_metrics['links_found'],
+        'fetch_seconds': strategy_metrics['timings'].get('fetch', {}).get('seconds', 0.0),
+        'path_length': len(path) if path else None,
+        'error': error,
+    }
+
+
+# Define a function named race_search that runs several search strategies at the same time and returns the first path any of them finds
+# strategies maps a strategy name to a function taking the strategy's context (see SearchContext.strategy) and returning
+# (path, time, discovered, method, total_links); the strategies share the fetcher, the link cache and each other's fetches in flight
+# Once a path is found the other strategies are cancelled (they stop at their next check, without being waited for)
+# The winner and each strategy's cost are left in context.race
+def race_search(start_page, finish_page, logs_queue, search_id, strategies, context=None):
+    context = context or get_context(search_id)
+    start_time = time.time()
+    logs_queue.put(f"Search {search_id} racing {', '.join(strategies)} from {start_page} to {finish_page}")
+
+    # Start every strategy on a thread of its own; each one unregisters its context when it ends
+    contexts = {name: context.strategy(name) for name in strategies}
+    executor = ThreadPoolExecutor(max_workers=len(strategies), thread_name_prefix='race')
+    futures = {}
+    for name, strategy in strategies.items():
+        future = executor.submit(strategy, contexts[name])
+        future.add_done_callback(lambda _, strategy_context=contexts[name]: strategy_context.finish_strategy())
+        futures[future] = name
+    executor.shutdown(wait=False)
+
+    # Take the strategies' results in the order they finish, until one of them has a path
+    reports = {}
+    winner, path, discovered, total_links_count = None, None, 0, 0
+    pending = set(futures)
+    while pending and winner is None:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            name = futures[future]
+            strategy_context = contexts[name]
+            try:
+                found, _, found_discovered, _, found_links = future.result()
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                log(logs_queue, f"Search {search_id}: strategy {name} failed with error: {error}", ERROR)
+                reports[name] = strategy_report(strategy_context, 'error', error=error)
+                continue
+            if found and winner is None:
+                winner, path, discovered, total_links_count = name, found, found_discovered, found_links
+                reports[name] = strategy_report(strategy_context, 'won', found)
+            else:
+                outcome = 'exhausted' if strategy_context.exhausted else 'cancelled' if strategy_context.stopped else 'no_path'
+                reports[name] = strategy_report(strategy_context, outcome, found)
+
+    # Cancel the strategies still running; their cost so far is what the race paid for them
+    for future in pending:
+        name = futures[future]
+        contexts[name].cancel()
+        reports[name] = strategy_report(contexts[name], 'lost')
+
+    # A race no strategy won because a strategy ran out of its budget reports that limit
+    if winner is None and context.exhausted is None:
+        context.exhausted = next((strategy_context.exhausted for strategy_context in contexts.values() if strategy_context.exhausted), None)
+    context.race = {'winner': winner, 'strategies': {name: reports[name] for name in strategies}}
+    if metrics.ENABLED:
+        RACE_WINS.inc(strategy=winner or 'none')
+
+    if winner is not None:
+        logs_queue.put(f"Search {search_id}: {winner} found a path first, after {time.time() - start_time:.2f} seconds")
+    else:
+        logs_queue.put(f"Search {search_id} concluded without any strategy finding a path.")
+    return path, time.time() - start_time, discovered, 'race', total_links_count
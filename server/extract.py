@@ -0,0 +1,88 @@
+import re  # Importing re for the precompiled link scanner
+from html import unescape  # Importing unescape for decoding entities in href values
+from urllib.parse import urljoin  # Importing urljoin for the rare hrefs that are not plain article paths
+from titles import WIKI_ORIGIN  # Importing the Wikipedia origin for resolving root-relative hrefs
+
+# Pattern matching the href value of an <a> tag, whether double-quoted, single-quoted or bare
+# Quoted attribute values are skipped whole and href has to follow whitespace, so values containing '>' or 'href=' and names such as data-href are passed over
+ANCHOR_HREF_PATTERN = re.compile(r'''<a\s(?:[^>"']|"[^"]*"|'[^']*')*?(?<=\s)href\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>"']+))''',
+                                 re.IGNORECASE)
+
+# Pattern matching HTML comments and script and style elements, which must not contribute links
+# Whichever starts first wins, as in an HTML parser: a comment inside a script is script text and vice versa
+IGNORED_PATTERN = re.compile(r'<!--.*?-->|<(script|style)\b[^>]*>.*?</\1\s*>', re.DOTALL | re.IGNORECASE)
+
+# Pattern matching links to Wikipedia articles (the same filter get_links has always used)
+VALID_LINK_PATTERN = re.compile(r'^https://en\.wikipedia\.org/wiki/[^:]*$')
+
+# Pattern matching the canonical link in the head of a page; a redirect is served with the canonical link of its target
+CANONICAL_PATTERN = re.compile(r'<link\s+rel="canonical"\s+href="([^"]*)"')
+
+# Marker of the article body and the markers of what follows it
+CONTENT_START_MARKER = 'id="mw-content-text"'
+CONTENT_END_MARKERS = ('<div class="printfooter"', 'id="catlinks"')
+
+
+# Define a function named content_region that returns the part of a page holding the article body
+def content_region(html):
+    # Fall back to the whole page if it has no article body marker
+    start = html.find(CONTENT_START_MARKER)
+    if start == -1:
+        return html
+
+    # The body ends where the print footer or the category links begin
+    ends = [end for end in (html.find(marker, start) for marker in CONTENT_END_MARKERS) if end != -1]
+    return html[start:min(ends)] if ends else html[start:]
+
+
+# Define a function named resolve_href that turns an href into an absolute URL without a general-purpose urljoin
+def resolve_href(href, page_url):
+    # Decode entities such as &amp; the way an HTML parser would
+    if '&' in href:
+        href = unescape(href)
+
+    # Article paths are by far the most common hrefs
+    if href.startswith('/wiki/'):
+        return WIKI_ORIGIN + href
+    if href.startswith('//en.wikipedia.org/'):
+        return 'https:' + href
+    if href.startswith(('https://', 'http://')):
+        return href
+
+    # Anything else (relative paths, fragments, other schemes) goes through urljoin
+    return urljoin(page_url, href)
+
+
+# Define a function named extract_links that returns (valid article links, total link count) of a page
+# With body_only, only links inside #mw-content-text are considered; otherwise the whole page is scanned like get_links used to
+def extract_links(html, page_url, body_only=True):
+    # Restrict the scan to the article body
+    if body_only:
+        html = content_region(html)
+
+    # Drop comments, scripts and styles before scanning
+    html = IGNORED_PATTERN.sub('', html)
+
+    # Scan every <a href> and keep the links that point to Wikipedia articles
+    valid_links = []
+    total_links_count = 0
+    for match in ANCHOR_HREF_PATTERN.finditer(html):
+        total_links_count += 1
+        link = resolve_href(match.group(1) or match.group(2) or match.group(3) or '', page_url)
+        if '#' not in link and VALID_LINK_PATTERN.match(link):
+            valid_links.append(link)
+    return valid_links, total_links_count
+
+
+# Define a function named extract_canonical that returns the canonical URL of a page (text or UTF-8 bytes), or None if it has none
+def extract_canonical(html):
+    # Only the head is scanned, and only the head of a page in bytes is decoded
+    if isinstance(html, bytes):
+        head_end = html.find(b'</head>')
+        html = (html if head_end == -1 else html[:head_end]).decode('utf-8', errors='replace')
+        head_end = len(html)
+    else:
+        head_end = html.find('</head>')
+        head_end = len(html) if head_end == -1 else head_end
+    match = CANONICAL_PATTERN.search(html, 0, head_end)
+    return resolve_href(match.group(1), WIKI_ORIGIN + '/') if match else None
@@ -0,0 +1,212 @@
+import time  # Importing time for cache ages and backoff sleeps
+import zlib  # Importing zlib for compressing cached page bodies
+import random  # Importing random for jittered backoff
+import sqlite3  # Importing sqlite3 for the on-disk page cache
+import threading  # Importing threading for locks, semaphores and per-thread connections
+from collections import namedtuple  # Importing namedtuple for fetch results
+from urllib.parse import urlsplit  # Importing urlsplit for per-host bookkeeping
+import requests  # Importing requests for making HTTP requests
+from requests.adapters import HTTPAdapter  # Importing HTTPAdapter for sizing the connection pool
+
+# Status codes that are retried with backoff
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# User agent sent with every request, as asked for by the Wikimedia user agent policy
+USER_AGENT = 'WikipediaGame/1.0 (https://github.com/alexhkurz/WikipediaGame)'
+
+
+# Define a class named FetchResult holding the outcome of one fetch
+class FetchResult(namedtuple('FetchResult', ['url', 'status_code', 'content', 'from_cache'])):
+    # Property that decodes the body the way Wikipedia serves it
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+
+# Define a class named Fetcher, a pooled keep-alive HTTP client with an optional, size-bounded on-disk revalidating cache
+class Fetcher:
+    # Constructor method to configure the pool, retries and cache
+    def __init__(self, cache_path=None, max_age=86400, pool_size=32, per_host=8, retries=4, backoff=0.5,
+                 max_backoff=30.0, timeout=10.0, host_overrides=None, max_entries=10000):
+        self.max_age = max_age  # Seconds a cached page is served without revalidation
+        self.max_entries = max_entries  # Number of cached pages kept before the least recently fetched ones are evicted
+        self.retries = retries  # Number of retries after the first attempt
+        self.backoff = backoff  # Base delay of the exponential backoff in seconds
+        self.max_backoff = max_backoff  # Upper bound of a single backoff delay in seconds
+        self.timeout = timeout  # Default request timeout in seconds
+        self.per_host = per_host  # Maximum number of concurrent requests per host
+        self.host_overrides = host_overrides or {}  # Maps host names to another origin, e.g. a local stand-in server
+
+        # One session with a connection pool large enough for every concurrent fetch
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # Per-host semaphores capping concurrent requests
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+        # Counters readable through stats()
+        self._counters = {'hits': 0, 'misses': 0, 'revalidations': 0, 'retries': 0, 'errors': 0, 'bytes': 0}
+
+        # On-disk cache, opened lazily once per thread
+        self.cache_path = cache_path
+        self._local = threading.local()
+        self._puts = 0  # Pages stored since the last eviction check
+        if cache_path:
+            with self._connection() as connection:
+                connection.execute('CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, etag TEXT, '
+                                   'last_modified TEXT, content BLOB, fetched_at REAL)')
+                connection.execute('CREATE INDEX IF NOT EXISTS pages_fetched ON pages (fetched_at)')
+
+    # Method that returns a snapshot of the counters
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+    # Method that adds to one of the counters
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    # Method that returns this thread's connection to the cache database
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.cache_path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    # Method that returns the semaphore limiting concurrent requests to a host
+    def _host_slot(self, host):
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_slots[host]
+
+    # Method that rewrites a URL to the overriding origin of its host, if any
+    def _target_url(self, url):
+        parts = urlsplit(url)
+        override = self.host_overrides.get(parts.hostname)
+        if override is None:
+            return url
+        return override.rstrip('/') + url[len(f"{parts.scheme}://{parts.netloc}"):]
+
+    # Method that computes the delay before the next attempt
+    def _retry_delay(self, attempt, response):
+        # Honour a numeric Retry-After header from the server
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+        # Otherwise use exponential backoff with full jitter
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    # Method that sends a GET request, retrying transient failures
+    # With a deadline (a time.time() value), every attempt is cut short by it and no retry is started past it
+    def _request(self, url, headers, timeout, deadline=None):
+        target_url = self._target_url(url)
+        slot = self._host_slot(urlsplit(target_url).netloc)
+        attempt = 0
+        while True:
+            response = None
+            error = None
+            attempt_timeout = timeout if deadline is None else max(min(timeout, deadline - time.time()), 0.1)
+            try:
+                # Hold a per-host slot only while the request is on the wire
+                with slot:
+                    response = self.session.get(target_url, headers=headers, timeout=attempt_timeout)
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.retries:
+                    return response
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= self.retries:
+                    self._count('errors')
+                    raise
+                error = e
+
+            # Give up rather than sleep past the deadline
+            delay = self._retry_delay(attempt, response)
+            if deadline is not None and time.time() + delay >= deadline:
+                if response is not None:
+                    return response
+                self._count('errors')
+                raise error
+
+            # Back off before the next attempt
+            self._count('retries')
+            time.sleep(delay)
+            attempt += 1
+
+    # Method that reads a cached page
+    def _cache_get(self, url):
+        if not self.cache_path:
+            return None
+        return self._connection().execute('SELECT etag, last_modified, content, fetched_at FROM pages WHERE url = ?',
+                                          (url,)).fetchone()
+
+    # Method that stores a page in the cache
+    def _cache_put(self, url, response):
+        if not self.cache_path:
+            return
+        with self._connection() as connection:
+            connection.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)',
+                               (url, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                                zlib.compress(response.content), time.time()))
+        with self._lock:
+            self._puts += 1
+            check = self._puts >= max(self.max_entries // 10, 1)
+            if check:
+                self._puts = 0
+        if check:
+            self.evict()
+
+    # Method that deletes the least recently fetched pages beyond max_entries (down to 90% of it)
+    def evict(self):
+        with self._connection() as connection:
+            count = connection.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+            if count <= self.max_entries:
+                return 0
+            excess = count - int(self.max_entries * 0.9)
+            connection.execute('DELETE FROM pages WHERE url IN (SELECT url FROM pages ORDER BY fetched_at LIMIT ?)', (excess,))
+        return excess
+
+    # Method that marks a cached page as fresh after a successful revalidation
+    def _cache_touch(self, url):
+        with self._connection() as connection:
+            connection.execute('UPDATE pages SET fetched_at = ? WHERE url = ?', (time.time(), url))
+
+    # Method that fetches a URL through the cache, raising requests exceptions on failure
+    # An optional deadline (a time.time() value) bounds the whole fetch, retries included
+    def fetch(self, url, timeout=None, deadline=None):
+        # Serve fresh cache entries without touching the network
+        entry = self._cache_get(url)
+        if entry is not None and time.time() - entry[3] < self.max_age:
+            self._count('hits')
+            return FetchResult(url, 200, zlib.decompress(entry[2]), True)
+
+        # Revalidate stale entries with a conditional request
+        headers = {}
+        if entry is not None:
+            if entry[0]:
+                headers['If-None-Match'] = entry[0]
+            if entry[1]:
+                headers['If-Modified-Since'] = entry[1]
+
+        response = self._request(url, headers, timeout or self.timeout, deadline)
+        self._count('bytes', len(response.content))
+
+        # A 304 answer means the cached copy is still current
+        if response.status_code == 304 and entry is not None:
+            self._count('revalidations')
+            self._cache_touch(url)
+            return FetchResult(url, 200, zlib.decompress(entry[2]), True)
+
+        # Anything else is a fresh download
+        if not response.ok:
+            self._count('errors')
+        response.raise_for_status()
+        self._count('misses')
+        self._cache_put(url, response)
+        return FetchResult(url, response.status_code, response.content, False)
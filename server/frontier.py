@@ -0,0 +1,273 @@
+import os  # Importing os for reading configuration from the environment and removing spill files
+import heapq  # Importing heapq for the in-memory heap and merging sorted runs
+import struct  # Importing struct for the binary records of spilled heap entries
+import sqlite3  # Importing sqlite3 for the on-disk part of a spilled node table
+import tempfile  # Importing tempfile for the spill files
+import weakref  # Importing weakref for removing a node table's spill file once the table is gone
+from array import array  # Importing array for compact int32 batches of node ids
+from itertools import chain, islice  # Importing chain and islice for streaming runs in chunks
+import metrics  # Importing metrics for counting spilled entries
+from metrics import Counter  # Importing the metric type
+from nodes import NodeTable  # Importing NodeTable, the in-memory table a SpillTable starts as
+
+# Number of entries a frontier queue, heap or node table keeps in memory before it spills to disk (0 never spills)
+SPILL_AT = int(os.environ.get('WIKI_FRONTIER_SPILL_AT', 1000000))
+
+# Directory the spill files are written to (None is the system's temporary directory)
+SPILL_DIRECTORY = os.environ.get('WIKI_SPILL_DIRECTORY') or None
+
+# Number of entries read back from a spill file at a time
+READ_CHUNK = 8192
+
+# Number of sorted runs a spilled heap reads from before it merges them into one
+MAX_RUNS = 16
+
+# Binary record of a spilled heap entry: estimated cost (float64) and node id (int32)
+RECORD = struct.Struct('<di')
+
+# Size of the SQLite page cache of a spilled node table, in KiB
+TABLE_CACHE_KIB = 16384
+
+# Entries written to disk by the frontier structures, by structure
+SPILLED_ENTRIES = Counter('wiki_frontier_spilled_entries_total', 'Frontier entries written to disk because a search outgrew SPILL_AT, by structure')
+
+
+# Define a function named count_spill that counts entries a structure wrote to disk
+def count_spill(structure, entries):
+    if metrics.ENABLED:
+        SPILLED_ENTRIES.inc(entries, structure=structure)
+
+
+# Define a class named SpillQueue, a first-in first-out queue of node ids for one level of a breadth-first search
+# Ids are kept as int32 values; past spill_at of them, the batch in memory is appended to an anonymous temporary file
+# Iterating streams the spilled ids back in order, READ_CHUNK at a time, followed by the ones still in memory
+class SpillQueue:
+    # Constructor method that takes the first node ids and the spill threshold and directory (defaulting to SPILL_AT and SPILL_DIRECTORY)
+    def __init__(self, nodes=(), spill_at=None, directory=None):
+        self.spill_at = SPILL_AT if spill_at is None else spill_at
+        self.directory = directory or SPILL_DIRECTORY
+        self.spilled = 0  # Number of ids in the spill file
+        self._buffer = array('i')
+        self._file = None
+        for node in nodes:
+            self.append(node)
+
+    # Method that adds a node id at the end of the queue
+    def append(self, node):
+        self._buffer.append(node)
+        if self.spill_at and len(self._buffer) >= self.spill_at:
+            self._spill()
+
+    # Method that appends the ids in memory to the spill file
+    def _spill(self):
+        if self._file is None:
+            self._file = tempfile.TemporaryFile(dir=self.directory)
+        self._file.seek(0, os.SEEK_END)
+        self._buffer.tofile(self._file)
+        self.spilled += len(self._buffer)
+        count_spill('queue', len(self._buffer))
+        self._buffer = array('i')
+
+    # Method that yields the node ids in the order they were added
+    def __iter__(self):
+        if self._file is not None:
+            self._file.seek(0)
+            remaining = self.spilled
+            while remaining:
+                chunk = array('i')
+                chunk.fromfile(self._file, min(READ_CHUNK, remaining))
+                remaining -= len(chunk)
+                yield from chunk
+        yield from self._buffer
+
+    # Method that returns the number of node ids in the queue
+    def __len__(self):
+        return self.spilled + len(self._buffer)
+
+    # Method that empties the queue and removes its spill file
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._buffer = array('i')
+        self.spilled = 0
+
+
+# Define a class named SpillRun, a sorted run of (cost, node) entries a SpillHeap wrote to an anonymous temporary file
+class SpillRun:
+    # Constructor method that writes the entries, which have to be sorted already
+    def __init__(self, entries, directory=None):
+        self._file = tempfile.TemporaryFile(dir=directory)
+        self.size = 0
+        entries = iter(entries)
+        while True:
+            chunk = list(islice(entries, READ_CHUNK))
+            if not chunk:
+                break
+            self._file.write(b''.join(RECORD.pack(cost, node) for cost, node in chunk))
+            self.size += len(chunk)
+        self._file.seek(0)
+
+    # Method that yields the entries in order, reading READ_CHUNK at a time
+    def __iter__(self):
+        while True:
+            data = self._file.read(RECORD.size * READ_CHUNK)
+            if not data:
+                self._file.close()
+                return
+            yield from RECORD.iter_unpack(data)
+
+
+# Define a class named SpillHeap, the min-heap of (estimated cost, node id) entries of an A* search
+# Past spill_at entries in memory, the worse half is sorted and written to disk as a run; pop takes the smallest of the heap's
+# top and the heads of the runs, so entries come out in the same order as from one heap
+class SpillHeap:
+    # Constructor method that takes the spill threshold and directory (defaulting to SPILL_AT and SPILL_DIRECTORY)
+    def __init__(self, spill_at=None, directory=None):
+        self.spill_at = SPILL_AT if spill_at is None else spill_at
+        self.directory = directory or SPILL_DIRECTORY
+        self.spilled = 0  # Number of entries written to disk so far
+        self._heap = []
+        self._heads = []  # Heap of (cost, node, run number), the next entry of every run
+        self._runs = {}  # Run number to the iterator over the rest of that run
+        self._next_run = 0
+        self._size = 0
+
+    # Method that adds an entry
+    def push(self, cost, node):
+        heapq.heappush(self._heap, (cost, node))
+        self._size += 1
+        if self.spill_at and len(self._heap) > self.spill_at:
+            self._spill()
+
+    # Method that removes and returns the entry with the lowest cost (ties broken by node id, as with tuples on a heap)
+    def pop(self):
+        if self._heads and (not self._heap or self._heads[0][:2] < self._heap[0]):
+            cost, node, run = heapq.heappop(self._heads)
+            self._advance(run)
+        else:
+            cost, node = heapq.heappop(self._heap)
+        self._size -= 1
+        return cost, node
+
+    # Method that returns the number of entries
+    def __len__(self):
+        return self._size
+
+    # Method that writes the worse half of the entries in memory to disk as a sorted run
+    def _spill(self):
+        entries = sorted(self._heap)
+        keep = len(entries) // 2
+        self._heap = entries[:keep]  # A sorted list is a valid heap
+        self._add_run(SpillRun(entries[keep:], self.directory))
+        self.spilled += len(entries) - keep
+        count_spill('heap', len(entries) - keep)
+        if len(self._runs) > MAX_RUNS:
+            self._merge_runs()
+
+    # Method that starts reading a run
+    def _add_run(self, run):
+        number = self._next_run
+        self._next_run += 1
+        self._runs[number] = iter(run)
+        self._advance(number)
+
+    # Method that moves the head of a run to its next entry, forgetting the run once it is read
+    def _advance(self, number):
+        entry = next(self._runs[number], None)
+        if entry is None:
+            del self._runs[number]
+        else:
+            heapq.heappush(self._heads, (entry[0], entry[1], number))
+
+    # Method that merges every run into one, so the number of open files and read buffers stays bounded
+    def _merge_runs(self):
+        heads = {number: (cost, node) for cost, node, number in self._heads}
+        streams = [chain([heads[number]], rest) for number, rest in self._runs.items()]
+        self._heads, self._runs = [], {}
+        self._add_run(SpillRun(heapq.merge(*streams), self.directory))
+
+
+# Define a class named SpillTable, a NodeTable that moves its URLs to an on-disk SQLite table past spill_at of them in memory
+# Node ids stay consecutive, so the bitsets and arrays indexed by them work unchanged; URLs on disk are looked up there
+class SpillTable(NodeTable):
+    # Constructor method that takes the spill threshold and directory (defaulting to SPILL_AT and SPILL_DIRECTORY)
+    def __init__(self, spill_at=None, directory=None):
+        super().__init__()
+        self.spill_at = SPILL_AT if spill_at is None else spill_at
+        self.directory = directory or SPILL_DIRECTORY
+        self._base = 0  # Id of the first node whose URL is in memory; the ones before it are on disk
+        self._db = None
+
+    # Method that returns the id of a URL, assigning the next free id to new URLs
+    def intern(self, url):
+        node = self._ids.get(url)
+        if node is None:
+            if self._db is not None:
+                node = self._disk_id(url)
+            if node is None:
+                node = self._ids[url] = self._base + len(self._urls)
+                self._urls.append(url)
+                if self.spill_at and len(self._urls) >= self.spill_at:
+                    self._spill()
+        return node
+
+    # Method that makes a URL another name of an existing node, unless it already has a node, and returns the node the URL stands for
+    def alias(self, url, node):
+        existing = self.id_of(url)
+        if existing is not None:
+            return existing
+        self._ids[url] = node
+        return node
+
+    # Method that returns the id of a URL, or None if it has not been interned
+    def id_of(self, url):
+        node = self._ids.get(url)
+        if node is None and self._db is not None:
+            node = self._disk_id(url)
+        return node
+
+    # Method that returns the URL of a node id
+    def url(self, node):
+        if node >= self._base:
+            return self._urls[node - self._base]
+        return self._db.execute('SELECT url FROM urls WHERE node = ?', (node,)).fetchone()[0]
+
+    # Method that returns the number of interned URLs
+    def __len__(self):
+        return self._base + len(self._urls)
+
+    # Method that looks a URL up on disk
+    def _disk_id(self, url):
+        row = self._db.execute('SELECT node FROM ids WHERE url = ?', (url,)).fetchone()
+        return row[0] if row else None
+
+    # Method that moves the URLs in memory to disk, creating the database on the first spill
+    def _spill(self):
+        if self._db is None:
+            descriptor, path = tempfile.mkstemp(suffix='.sqlite', dir=self.directory)
+            os.close(descriptor)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            # The database lives only as long as the table, so it needs neither a journal nor syncing
+            self._db.execute('PRAGMA journal_mode = OFF')
+            self._db.execute('PRAGMA synchronous = OFF')
+            self._db.execute(f'PRAGMA cache_size = -{TABLE_CACHE_KIB}')
+            self._db.execute('CREATE TABLE ids (url TEXT PRIMARY KEY, node INTEGER) WITHOUT ROWID')
+            self._db.execute('CREATE TABLE urls (node INTEGER PRIMARY KEY, url TEXT)')
+            weakref.finalize(self, remove_database, self._db, path)
+        with self._db:
+            self._db.executemany('INSERT INTO ids VALUES (?, ?)', self._ids.items())
+            self._db.executemany('INSERT INTO urls VALUES (?, ?)', enumerate(self._urls, self._base))
+        count_spill('table', len(self._urls))
+        self._base += len(self._urls)
+        self._ids = {}
+        self._urls = []
+
+
+# Define a function named remove_database that closes a spilled node table's database and deletes its file
+def remove_database(db, path):
+    db.close()
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,135 @@
+import os  # Importing os for locating the bundled NLTK data
+import re  # Importing re for splitting titles into words
+import threading  # Importing threading for loading NLTK once when several threads need it
+from titles import url_to_title  # Importing url_to_title for reading titles out of link URLs
+# BeautifulSoup and NLTK are imported inside the functions below, so only processes that extract keywords pay for loading them
+
+# NLTK data directory shipped with the repository, searched before NLTK's default locations
+NLTK_DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nltk_data')
+
+# NLTK resources used by extract_keywords (newer NLTK releases name the tokenizer and tagger data punkt_tab and averaged_perceptron_tagger_eng)
+NLTK_RESOURCES = ['punkt', 'punkt_tab', 'stopwords', 'averaged_perceptron_tagger', 'averaged_perceptron_tagger_eng']
+
+# Where each of NLTK_RESOURCES lives inside an NLTK data directory
+NLTK_RESOURCE_PATHS = {
+    'punkt': 'tokenizers/punkt',
+    'punkt_tab': 'tokenizers/punkt_tab',
+    'stopwords': 'corpora/stopwords',
+    'averaged_perceptron_tagger': 'taggers/averaged_perceptron_tagger',
+    'averaged_perceptron_tagger_eng': 'taggers/averaged_perceptron_tagger_eng',
+}
+
+# Whether load_nltk downloads missing NLTK data into NLTK_DATA_PATH (once per process) instead of failing right away
+NLTK_DOWNLOAD = os.environ.get('WIKI_NLTK_DOWNLOAD', '1') != '0'
+
+# Add any domain-specific stopwords
+additional_stopwords = {'example', 'another_word', 'more_noise'}
+
+# Part-of-speech tags of the words kept as keywords: nouns (singular and plural) and verbs (various forms)
+KEYWORD_TAGS = {'NN', 'NNS', 'NNP', 'NNPS', 'VB', 'VBD', 'VBG', 'VBN', 'VBP', 'VBZ'}
+
+# Pattern matching the words of a title (underscores separate words)
+TITLE_WORD_PATTERN = re.compile(r'[^\W_]+')
+
+# Stopword set, built once by load_nltk
+stopwords_set = None
+
+# Message of the LookupError load_nltk raises once the data could not be loaded even after trying to download it
+nltk_error = None
+nltk_lock = threading.Lock()
+
+
+# Define a function named missing_nltk_resources that returns the names of NLTK_RESOURCES not found in NLTK's data path
+def missing_nltk_resources(nltk):
+    missing = []
+    for name in NLTK_RESOURCES:
+        try:
+            nltk.data.find(NLTK_RESOURCE_PATHS[name])
+        except LookupError:
+            missing.append(name)
+    return missing
+
+
+# Define a function named load_nltk that loads the stopwords, tokenizer and tagger once per process
+# Missing data is downloaded into nltk_data/ the first time (unless download is False or WIKI_NLTK_DOWNLOAD is 0)
+# If it is still missing, LookupError is raised; after a download attempt the failure is remembered, so it is not retried on every page
+def load_nltk(download=None):
+    global stopwords_set, nltk_error
+    if stopwords_set is not None:
+        return stopwords_set
+    download = NLTK_DOWNLOAD if download is None else download
+    with nltk_lock:
+        if stopwords_set is not None:
+            return stopwords_set
+        if nltk_error is not None:
+            raise LookupError(nltk_error)
+        import nltk
+        from nltk.corpus import stopwords
+        from nltk.tokenize import word_tokenize
+        from nltk import pos_tag
+        # Look in the bundled data directory first
+        if NLTK_DATA_PATH not in nltk.data.path:
+            nltk.data.path.insert(0, NLTK_DATA_PATH)
+        missing = missing_nltk_resources(nltk)
+        if missing and download:
+            # Releases need only one of the two names of the tokenizer and tagger data, so a failed download is not an error by itself
+            for name in missing:
+                nltk.download(name, download_dir=NLTK_DATA_PATH, quiet=True, raise_on_error=False)
+        try:
+            # Create a set of English stopwords and union it with additional stopwords
+            loaded_stopwords = set(stopwords.words('english')).union(additional_stopwords)
+            # Run the tokenizer and tagger once so their models are loaded before the first real page
+            pos_tag(word_tokenize('Loading the tagger model.'))
+        except LookupError:
+            message = (f"NLTK data missing from {NLTK_DATA_PATH} ({', '.join(missing_nltk_resources(nltk))}); "
+                       f"run setup.sh or python -m nltk.downloader -d nltk_data {' '.join(NLTK_RESOURCES)}")
+            if missing and download:
+                nltk_error = message
+            raise LookupError(message) from None
+        stopwords_set = loaded_stopwords
+    return stopwords_set
+
+
+# Define a function named extract_text that returns the paragraph text of a page's HTML
+def extract_text(html):
+    from bs4 import BeautifulSoup
+    # Parse the HTML content using BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    # Extract text from all <p> tags and join them into a single string
+    return ' '.join(p.text for p in soup.find_all('p'))
+
+
+# Define a function named extract_keywords that takes a text as input
+def extract_keywords(text):
+    # Get the English stopwords together with the additional stopwords (loading NLTK on first use)
+    stopwords_set = load_nltk()
+    from nltk.probability import FreqDist
+    from nltk.tokenize import word_tokenize
+    from nltk import pos_tag
+
+    # Tokenize the input text into words
+    words = word_tokenize(text)
+
+    # Filter out non-alphanumeric words and stopwords, converting them to lowercase
+    filtered_words = [word.lower() for word in words if word.isalnum() and word.lower() not in stopwords_set]
+
+    # Tag the filtered words with their parts of speech
+    tagged_words = pos_tag(filtered_words)
+
+    # Extract words that are nouns or verbs
+    keywords = [word for word, tag in tagged_words if tag in KEYWORD_TAGS]
+
+    # Create a frequency distribution of the extracted keywords
+    freq_dist = FreqDist(keywords)
+
+    # Filter out keywords that occur less than twice and have a length greater than one character
+    significant_keywords = {word: freq for word, freq in freq_dist.items() if freq > 1 and len(word) > 1}
+
+    # Return the dictionary of significant keywords
+    return significant_keywords
+
+
+# Define a function named title_terms that returns the lowercase words of a page's title
+def title_terms(url):
+    return {word.lower() for word in TITLE_WORD_PATTERN.findall(url_to_title(url))}
+
@@ -0,0 +1,202 @@
+import os  # Importing os for file and path handling
+import json  # Importing json for the landmark metadata file
+import argparse  # Importing argparse for the command line interface
+import numpy as np  # Importing NumPy for level-synchronous breadth-first searches and the batch bounds
+from linkgraph import LinkGraph  # Importing LinkGraph for the graph the distances are measured on
+from titles import url_to_title  # Importing url_to_title for looking pages up in the graph
+
+# Name of the directory (inside a graph directory) and of the files that make up a set of landmarks
+LANDMARKS_DIRECTORY = 'landmarks'
+META_FILE = 'landmarks.json'
+FORWARD_FILE = 'forward.u8'
+BACKWARD_FILE = 'backward.u8'
+
+# Distance stored for pages a landmark does not reach (or that do not reach it); real distances stop one short of it
+UNREACHABLE = 255
+
+# Estimate given to pages that provably cannot reach the finish page
+NO_PATH_COST = 1000
+
+
+# Define a function named graph_arrays that returns the forward and reverse CSR arrays of a graph as NumPy arrays
+# The arrays share the graph's memory maps; graphs built before the reverse index existed get their reverse arrays computed here
+def graph_arrays(graph):
+    offsets = np.asarray(graph.offsets, dtype=np.int64)
+    targets = np.asarray(graph.targets, dtype=np.int32)
+    if graph.has_backlinks:
+        return offsets, targets, np.asarray(graph.reverse_offsets, dtype=np.int64), np.asarray(graph.reverse_targets, dtype=np.int32)
+    sources = np.repeat(np.arange(graph.node_count, dtype=np.int32), np.diff(offsets))
+    order = np.argsort(targets, kind='stable')
+    reverse_offsets = np.concatenate(([0], np.cumsum(np.bincount(targets, minlength=graph.node_count)))).astype(np.int64)
+    return offsets, targets, reverse_offsets, sources[order]
+
+
+# Define a function named bfs_distances that returns the hop distance from a page to every page as a uint8 array
+# Each level is expanded at once: the adjacency slices of the whole frontier are gathered with one index computation
+def bfs_distances(offsets, targets, source, node_count):
+    distances = np.full(node_count, UNREACHABLE, dtype=np.uint8)
+    distances[source] = 0
+    frontier = np.array([source], dtype=np.int64)
+    for level in range(1, UNREACHABLE):
+        starts = offsets[frontier]
+        counts = offsets[frontier + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            break
+        # Index of every link of the frontier: the start of its page's slice plus its position within it
+        positions = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(starts, counts)
+        neighbors = targets[positions]
+        frontier = np.unique(neighbors[distances[neighbors] == UNREACHABLE]).astype(np.int64)
+        if frontier.size == 0:
+            break
+        distances[frontier] = level
+    return distances
+
+
+# Define a function named select_landmarks that picks landmark pages with the farthest-point strategy
+# The first landmark is the page with the most links in and out; each next one is the page farthest from the landmarks picked so far
+def select_landmarks(offsets, targets, reverse_offsets, reverse_targets, node_count, count):
+    degrees = np.diff(offsets) + np.diff(reverse_offsets)
+    landmarks = [int(np.argmax(degrees))]
+    forward, backward = [], []
+    nearest = np.full(node_count, UNREACHABLE, dtype=np.int32)
+    while True:
+        landmark = landmarks[-1]
+        forward.append(bfs_distances(offsets, targets, landmark, node_count))
+        backward.append(bfs_distances(reverse_offsets, reverse_targets, landmark, node_count))
+        if len(landmarks) == count:
+            return landmarks, np.stack(forward), np.stack(backward)
+
+        # Distance of every page to its nearest landmark, either way; unreachable pages and landmarks are not candidates
+        nearest = np.minimum(nearest, np.minimum(forward[-1], backward[-1]))
+        candidates = np.where(nearest < UNREACHABLE, nearest, -1)
+        candidates[landmarks] = -1
+        # Break ties between equally far pages by degree, so landmarks sit on hubs
+        best = np.flatnonzero(candidates == candidates.max())
+        if candidates.max() <= 0:
+            return landmarks, np.stack(forward), np.stack(backward)
+        landmarks.append(int(best[np.argmax(degrees[best])]))
+
+
+# Define a function named build_landmarks that computes the landmark distances of a graph and writes them into its directory
+def build_landmarks(graph_path, count=16):
+    graph = LinkGraph(graph_path)
+    arrays = graph_arrays(graph)
+    landmarks, forward, backward = select_landmarks(*arrays, graph.node_count, count)
+    titles = [graph.title(landmark) for landmark in landmarks]
+    node_count = graph.node_count
+    # The arrays are views of the graph's memory maps, which cannot be closed while they exist
+    del arrays
+    graph.close()
+
+    # Write the (landmarks x pages) distance matrices, then the metadata last so a half-written directory is never opened
+    path = os.path.join(graph_path, LANDMARKS_DIRECTORY)
+    os.makedirs(path, exist_ok=True)
+    forward.tofile(os.path.join(path, FORWARD_FILE))
+    backward.tofile(os.path.join(path, BACKWARD_FILE))
+    meta = {'nodes': node_count, 'landmarks': landmarks, 'titles': titles}
+    with open(os.path.join(path, META_FILE), 'w') as out:
+        json.dump(meta, out)
+    return meta
+
+
+# Define a class named Landmarks, the memory-mapped landmark distances of a graph
+class Landmarks:
+    # Constructor method that opens the landmarks of the graph stored in the given directory
+    def __init__(self, graph, path=None):
+        path = path or os.path.join(graph.path, LANDMARKS_DIRECTORY)
+        with open(os.path.join(path, META_FILE)) as meta_file:
+            meta = json.load(meta_file)
+        if meta['nodes'] != graph.node_count:
+            raise ValueError(f"Landmarks in {path} were built for a graph of {meta['nodes']} pages, not {graph.node_count}")
+
+        self.graph = graph  # Graph the distances were measured on
+        self.ids = meta['landmarks']  # Page ids of the landmarks
+        self.titles = meta['titles']  # Titles of the landmarks
+        shape = (len(self.ids), graph.node_count)
+        self.forward = np.memmap(os.path.join(path, FORWARD_FILE), dtype=np.uint8, mode='r', shape=shape)  # Distance from each landmark to each page
+        self.backward = np.memmap(os.path.join(path, BACKWARD_FILE), dtype=np.uint8, mode='r', shape=shape)  # Distance from each page to each landmark
+
+    # Method that returns lower bounds on the distance from pages (by id) to a target page (by id)
+    # By the triangle inequality, d(v, t) >= d(L, t) - d(L, v) and d(v, t) >= d(v, L) - d(t, L) for every landmark L
+    def lower_bounds(self, page_ids, target_id):
+        page_ids = np.asarray(page_ids, dtype=np.int64)
+        from_landmark = self.forward[:, page_ids].astype(np.int16)
+        to_landmark = self.backward[:, page_ids].astype(np.int16)
+        target_from = self.forward[:, target_id].astype(np.int16)[:, None]
+        target_to = self.backward[:, target_id].astype(np.int16)[:, None]
+
+        # Only pairs of known distances give a bound
+        forward_bounds = np.where((from_landmark < UNREACHABLE) & (target_from < UNREACHABLE), target_from - from_landmark, 0)
+        backward_bounds = np.where((to_landmark < UNREACHABLE) & (target_to < UNREACHABLE), to_landmark - target_to, 0)
+        bounds = np.maximum(forward_bounds.max(axis=0), backward_bounds.max(axis=0)).clip(min=0)
+
+        # A page a landmark reaches cannot reach a target the landmark does not reach, and a page that cannot reach a landmark cannot reach a target that does
+        no_path = ((from_landmark < UNREACHABLE) & (target_from == UNREACHABLE)).any(axis=0)
+        no_path |= ((to_landmark == UNREACHABLE) & (target_to < UNREACHABLE)).any(axis=0)
+        return np.where(no_path, NO_PATH_COST, bounds)
+
+    # Method that returns the A* heuristic estimating the distance of pages to a finish page
+    def heuristic(self, finish_page):
+        return LandmarkHeuristic(self, finish_page)
+
+
+# Define a class named LandmarkHeuristic, an admissible and consistent A* heuristic toward one finish page
+# It is called with one page URL, or with a batch of them through batch; pages missing from the graph are estimated at 0
+class LandmarkHeuristic:
+    # A* may only stop when the finish page is taken off the open set, not when it is first seen, for the path to be shortest
+    admissible = True
+
+    # Constructor method that takes the landmarks and the finish page URL
+    def __init__(self, landmarks, finish_page):
+        self.landmarks = landmarks
+        self.target_id = landmarks.graph.id_of(url_to_title(finish_page))
+
+    # Method that estimates the distance of one page to the finish page
+    def __call__(self, page):
+        return self.batch([page])[0]
+
+    # Method that estimates the distances of a batch of pages to the finish page
+    def batch(self, pages):
+        if self.target_id is None:
+            return [0] * len(pages)
+        page_ids = [self.landmarks.graph.id_of(url_to_title(page)) for page in pages]
+        known = [index for index, page_id in enumerate(page_ids) if page_id is not None]
+        estimates = [0] * len(pages)
+        if known:
+            bounds = self.landmarks.lower_bounds([page_ids[index] for index in known], self.target_id)
+            for index, bound in zip(known, bounds.tolist()):
+                estimates[index] = bound
+        return estimates
+
+
+# Define a function named main that implements the command line interface
+def main():
+    parser = argparse.ArgumentParser(description='Precompute landmark distances of an offline link graph for the A* landmark heuristic.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    # Command for picking landmarks and computing their distances
+    build = commands.add_parser('build', help='pick landmarks and store their distances in the graph directory')
+    build.add_argument('graph', help='graph directory built with linkgraph.py')
+    build.add_argument('--count', type=int, default=16, help='number of landmarks')
+
+    # Command for printing the landmarks of a graph
+    info = commands.add_parser('info', help='print the landmarks of a graph')
+    info.add_argument('graph', help='graph directory')
+
+    args = parser.parse_args()
+    if args.command == 'build':
+        meta = build_landmarks(args.graph, args.count)
+        print(f"{len(meta['landmarks'])} landmarks over {meta['nodes']} pages: {', '.join(meta['titles'])}")
+    elif args.command == 'info':
+        graph = LinkGraph(args.graph)
+        landmarks = Landmarks(graph)
+        for landmark, title in zip(landmarks.ids, landmarks.titles):
+            reached = int((landmarks.forward[landmarks.ids.index(landmark)] < UNREACHABLE).sum())
+            print(f"{title}\treaches {reached} of {graph.node_count} pages")
+        graph.close()
+
+
+# Entry point of the command line interface
+if __name__ == '__main__':
+    main()
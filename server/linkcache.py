@@ -0,0 +1,260 @@
+import json  # Importing json for storing keyword dictionaries
+import time  # Importing time for staleness and recency timestamps
+import zlib  # Importing zlib for compressing keyword dictionaries
+import sqlite3  # Importing sqlite3 for the shared on-disk store
+import threading  # Importing threading for locks and per-thread connections
+import numpy as np  # Importing NumPy for decoding many link lists at once when sweeping unused titles
+
+# Maximum number of SQL parameters used in a single IN (...) query
+SQL_BATCH_SIZE = 900
+
+# Number of link lists decoded together when sweeping unused titles
+SWEEP_BATCH_SIZE = 10000
+
+
+# Define a function named encode_ids that packs a list of ids as sorted, delta-encoded varints
+def encode_ids(ids):
+    out = bytearray()
+    previous = 0
+    for value in sorted(set(ids)):
+        # Store the gap to the previous id, seven bits per byte
+        delta = value - previous
+        previous = value
+        while delta >= 0x80:
+            out.append((delta & 0x7f) | 0x80)
+            delta >>= 7
+        out.append(delta)
+    return bytes(out)
+
+
+# Define a function named decode_ids that unpacks the output of encode_ids
+def decode_ids(data):
+    ids = []
+    previous = value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            previous += value
+            ids.append(previous)
+            value = shift = 0
+    return ids
+
+
+# Define a function named mark_ids that sets marks[id] for every id in a list of encode_ids outputs, decoding them together
+def mark_ids(marks, blobs):
+    blobs = [blob for blob in blobs if blob]
+    if not blobs:
+        return
+    data = np.frombuffer(b''.join(blobs), dtype=np.uint8)
+
+    # Every byte without the high bit ends a varint; the bytes of one varint carry seven bits each, lowest first
+    ends = (data & 0x80) == 0
+    starts = np.concatenate(([True], ends[:-1]))
+    varint = np.cumsum(starts) - 1
+    shift = 7 * (np.arange(len(data)) - np.flatnonzero(starts)[varint])
+    deltas = np.bincount(varint, weights=(data & 0x7f).astype(np.int64) << shift).astype(np.int64)
+
+    # Ids are running sums of the deltas, restarting with every list
+    counts = np.add.reduceat(ends, np.cumsum([0] + [len(blob) for blob in blobs[:-1]]))
+    firsts = np.cumsum(counts) - counts
+    totals = np.cumsum(deltas)
+    marks[totals - np.repeat(totals[firsts] - deltas[firsts], counts)] = True
+
+
+# Define a class named LinkCache, a persistent store of extracted link lists and keywords keyed by canonical title
+class LinkCache:
+    # Constructor method to open (or create) the store
+    def __init__(self, path, ttl=7 * 86400, max_entries=500000, touch_interval=60):
+        self.path = path  # SQLite database file shared by all processes
+        self.ttl = ttl  # Seconds after which an entry is stale and has to be fetched again
+        self.max_entries = max_entries  # Number of pages kept before the least recently used ones are evicted
+        self.touch_interval = touch_interval  # Minimum seconds between recency updates of one entry
+        self._local = threading.local()  # Per-thread connections
+        self._lock = threading.Lock()  # Lock protecting the counters
+        self._counters = {'hits': 0, 'misses': 0, 'stale': 0, 'puts': 0, 'evictions': 0}
+
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS titles (id INTEGER PRIMARY KEY, title TEXT UNIQUE NOT NULL)')
+            # fetched_at is when the links were stored and keywords_fetched_at when the keywords were; each goes stale on its own
+            connection.execute('CREATE TABLE IF NOT EXISTS pages (title_id INTEGER PRIMARY KEY, links BLOB, '
+                               'total_links INTEGER, keywords BLOB, fetched_at REAL, accessed_at REAL, keywords_fetched_at REAL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at)')
+
+            # Stores created before keywords had their own timestamp keep the shared one for their keywords
+            columns = [column[1] for column in connection.execute('PRAGMA table_info(pages)')]
+            if 'keywords_fetched_at' not in columns:
+                connection.execute('ALTER TABLE pages ADD COLUMN keywords_fetched_at REAL')
+                connection.execute('UPDATE pages SET keywords_fetched_at = fetched_at WHERE keywords IS NOT NULL')
+
+    # Method that returns this thread's connection, in WAL mode so readers never block the writer
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    # Method that adds to one of the counters and returns its new value
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+            return self._counters[name]
+
+    # Method that returns a snapshot of the counters
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+    # Method that returns the ids of titles, creating the missing ones
+    def _ids_for(self, connection, titles):
+        ids = {}
+        titles = list(set(titles))
+        connection.executemany('INSERT OR IGNORE INTO titles (title) VALUES (?)', ((title,) for title in titles))
+        for start in range(0, len(titles), SQL_BATCH_SIZE):
+            batch = titles[start:start + SQL_BATCH_SIZE]
+            query = 'SELECT title, id FROM titles WHERE title IN ({})'.format(','.join('?' * len(batch)))
+            ids.update(connection.execute(query, batch))
+        return ids
+
+    # Method that returns the titles of a list of ids (call it in the transaction that read the ids, so eviction cannot delete them in between)
+    def _titles_for(self, connection, ids):
+        titles = {}
+        for start in range(0, len(ids), SQL_BATCH_SIZE):
+            batch = ids[start:start + SQL_BATCH_SIZE]
+            query = 'SELECT id, title FROM titles WHERE id IN ({})'.format(','.join('?' * len(batch)))
+            titles.update(connection.execute(query, batch))
+        return [titles[page_id] for page_id in ids]
+
+    # Method that reads the row of a title if its links or keywords (column) are present and fresh
+    def _fresh_row(self, connection, title, column):
+        fetched_at = 'keywords_fetched_at' if column == 'keywords' else 'fetched_at'
+        row = connection.execute(f'SELECT p.title_id, p.{column}, p.total_links, p.{fetched_at}, p.accessed_at '
+                                 'FROM pages p JOIN titles t ON t.id = p.title_id WHERE t.title = ?', (title,)).fetchone()
+        if row is None or row[1] is None:
+            self._count('misses')
+            return None
+        if time.time() - row[3] > self.ttl:
+            self._count('stale')
+            return None
+        self._count('hits')
+        return row
+
+    # Method that updates the recency used by eviction after a read, but not on every single read
+    def _touch(self, connection, row):
+        now = time.time()
+        if now - row[4] > self.touch_interval:
+            with connection:
+                connection.execute('UPDATE pages SET accessed_at = ? WHERE title_id = ?', (now, row[0]))
+
+    # Method that returns (link titles, total link count) of a page, or None if it is missing or stale
+    def get_links(self, title):
+        connection = self._connection()
+        # Read the row and the titles of its links in one read transaction, which sees no eviction that commits meanwhile
+        connection.execute('BEGIN')
+        try:
+            row = self._fresh_row(connection, title, 'links')
+            link_titles = self._titles_for(connection, decode_ids(row[1])) if row is not None else None
+        finally:
+            connection.commit()
+        if row is None:
+            return None
+        self._touch(connection, row)
+        return link_titles, row[2]
+
+    # Method that stores the filtered outgoing links of a page
+    def put_links(self, title, link_titles, total_links):
+        connection = self._connection()
+        now = time.time()
+        with connection:
+            ids = self._ids_for(connection, [title] + list(link_titles))
+            connection.execute('INSERT INTO pages (title_id, links, total_links, fetched_at, accessed_at) '
+                               'VALUES (?, ?, ?, ?, ?) ON CONFLICT (title_id) DO UPDATE SET links = excluded.links, '
+                               'total_links = excluded.total_links, fetched_at = excluded.fetched_at, '
+                               'accessed_at = excluded.accessed_at',
+                               (ids[title], encode_ids(ids[link] for link in link_titles), total_links, now, now))
+        self._after_put()
+
+    # Method that returns which of a list of titles have fresh links, without counting lookups or touching their recency
+    def fresh_titles(self, titles):
+        connection = self._connection()
+        cutoff = time.time() - self.ttl
+        titles = list(set(titles))
+        fresh = set()
+        for start in range(0, len(titles), SQL_BATCH_SIZE):
+            batch = titles[start:start + SQL_BATCH_SIZE]
+            query = ('SELECT t.title FROM titles t JOIN pages p ON p.title_id = t.id WHERE p.links IS NOT NULL '
+                     'AND p.fetched_at >= ? AND t.title IN ({})').format(','.join('?' * len(batch)))
+            fresh.update(title for title, in connection.execute(query, [cutoff] + batch))
+        return fresh
+
+    # Method that returns the keyword dictionary of a page, or None if it is missing or stale
+    def get_keywords(self, title):
+        connection = self._connection()
+        row = self._fresh_row(connection, title, 'keywords')
+        if row is None:
+            return None
+        self._touch(connection, row)
+        return json.loads(zlib.decompress(row[1]))
+
+    # Method that stores the keyword dictionary of a page
+    def put_keywords(self, title, keywords):
+        connection = self._connection()
+        now = time.time()
+        with connection:
+            title_id = self._ids_for(connection, [title])[title]
+            connection.execute('INSERT INTO pages (title_id, keywords, keywords_fetched_at, accessed_at) VALUES (?, ?, ?, ?) '
+                               'ON CONFLICT (title_id) DO UPDATE SET keywords = excluded.keywords, '
+                               'keywords_fetched_at = excluded.keywords_fetched_at, accessed_at = excluded.accessed_at',
+                               (title_id, zlib.compress(json.dumps(keywords).encode('utf-8')), now, now))
+        self._after_put()
+
+    # Method that evicts entries every so often once the store is over its size bound
+    def _after_put(self):
+        if self._count('puts') % 1000 == 0:
+            self.evict()
+
+    # Method that deletes the least recently used pages beyond max_entries (down to 90% of it), and the titles no longer used
+    def evict(self):
+        connection = self._connection()
+        with connection:
+            count = connection.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+            if count <= self.max_entries:
+                return 0
+            excess = count - int(self.max_entries * 0.9)
+            connection.execute('DELETE FROM pages WHERE title_id IN '
+                               '(SELECT title_id FROM pages ORDER BY accessed_at LIMIT ?)', (excess,))
+            # The sweep runs in the same transaction, so no put can start using a title between marking and deleting
+            self._sweep_titles(connection)
+        self._count('evictions', excess)
+        return excess
+
+    # Method that deletes the titles that are neither a cached page nor in the link list of one
+    # A title id inside a link list has to stay, or the list could no longer be read back
+    def _sweep_titles(self, connection):
+        last_id = connection.execute('SELECT MAX(id) FROM titles').fetchone()[0]
+        if last_id is None:
+            return 0
+        marks = np.zeros(last_id + 1, dtype=bool)
+        cursor = connection.execute('SELECT title_id, links FROM pages')
+        while True:
+            rows = cursor.fetchmany(SWEEP_BATCH_SIZE)
+            if not rows:
+                break
+            marks[[title_id for title_id, _ in rows]] = True
+            mark_ids(marks, [links for _, links in rows if links])
+        titles = np.fromiter((title_id for title_id, in connection.execute('SELECT id FROM titles')), dtype=np.int64)
+        unused = [(int(title_id),) for title_id in titles[~marks[titles]]]
+        connection.executemany('DELETE FROM titles WHERE id = ?', unused)
+        return len(unused)
+
+    # Method that yields every cached (source title, target title) link, e.g. for linkgraph.build_graph
+    def iter_edges(self):
+        connection = self._connection()
+        titles = dict(connection.execute('SELECT id, title FROM titles'))
+        for title_id, links in connection.execute('SELECT title_id, links FROM pages WHERE links IS NOT NULL'):
+            for target_id in decode_ids(links):
+                yield titles[title_id], titles[target_id]
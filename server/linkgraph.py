@@ -0,0 +1,343 @@
+import os  # Importing os for file and path handling
+import re  # Importing re for parsing SQL dump rows
+import sys  # Importing sys for the native byte order
+import json  # Importing json for the graph metadata file
+import gzip  # Importing gzip for reading compressed Wikipedia dumps
+import mmap  # Importing mmap for sharing the graph arrays through the page cache
+import argparse  # Importing argparse for the command line interface
+from array import array  # Importing array for compact integer arrays
+from titles import url_to_title, title_to_url  # Importing title helpers for converting between URLs and graph titles
+from linkcache import LinkCache  # Importing LinkCache for building graphs from our own crawl cache
+
+# Version of the on-disk graph layout
+GRAPH_VERSION = 1
+
+# Names of the files that make up a graph directory
+META_FILE = 'meta.json'
+OFFSETS_FILE = 'offsets.i64'
+TARGETS_FILE = 'targets.i32'
+TITLE_OFFSETS_FILE = 'title_offsets.i64'
+TITLES_FILE = 'titles.bin'
+REVERSE_OFFSETS_FILE = 'reverse_offsets.i64'
+REVERSE_TARGETS_FILE = 'reverse_targets.i32'
+
+# Pattern matching the leading (id, namespace, 'title' fields of a row in the page, redirect, linktarget and pre-2024 pagelinks dumps
+SQL_ROW_PATTERN = re.compile(r"\((\d+),(-?\d+),'((?:[^'\\]|\\.)*)'")
+
+# Pattern matching a (pl_from, pl_from_namespace, pl_target_id) row of the current pagelinks dump, whose titles are in linktarget
+SQL_LINK_ROW_PATTERN = re.compile(r"\((\d+),(-?\d+),(\d+)\)")
+
+# Pattern matching a backslash escape inside an SQL string literal
+SQL_ESCAPE_PATTERN = re.compile(r'\\(.)')
+
+
+# Define a class named LinkGraph, a read-only link source backed by memory-mapped CSR arrays
+class LinkGraph:
+    # Constructor method that opens the graph stored in the given directory
+    def __init__(self, path):
+        # Load and validate the metadata written by build_graph
+        with open(os.path.join(path, META_FILE)) as meta_file:
+            meta = json.load(meta_file)
+        if meta.get('version') != GRAPH_VERSION:
+            raise ValueError(f"Unsupported link graph version in {path}: {meta.get('version')}")
+        if meta.get('byteorder') != sys.byteorder:
+            raise ValueError(f"Link graph in {path} was built with {meta.get('byteorder')} byte order")
+
+        self.path = path  # Directory the graph was loaded from
+        self.node_count = meta['nodes']  # Number of pages in the graph
+        self.edge_count = meta['edges']  # Number of links in the graph
+        self._maps = []  # Open memory maps, kept so they can be closed
+
+        # Map the CSR arrays: outgoing links of page i are targets[offsets[i]:offsets[i + 1]]
+        self.offsets = self._map(path, OFFSETS_FILE, 'q')
+        self.targets = self._map(path, TARGETS_FILE, 'i')
+
+        # Map the reverse CSR arrays: pages linking to page i are reverse_targets[reverse_offsets[i]:reverse_offsets[i + 1]]
+        # Graphs built before the reverse index existed have no such files and no backlinks
+        self.has_backlinks = os.path.exists(os.path.join(path, REVERSE_OFFSETS_FILE))
+        if self.has_backlinks:
+            self.reverse_offsets = self._map(path, REVERSE_OFFSETS_FILE, 'q')
+            self.reverse_targets = self._map(path, REVERSE_TARGETS_FILE, 'i')
+
+        # Map the title table: page ids are assigned in sorted UTF-8 title order
+        self.title_offsets = self._map(path, TITLE_OFFSETS_FILE, 'q')
+        self.title_blob = self._map(path, TITLES_FILE, 'B')
+
+    # Method that memory-maps one array file read-only and returns a typed view of it
+    def _map(self, path, name, typecode):
+        with open(os.path.join(path, name), 'rb') as array_file:
+            # mmap refuses empty files, so fall back to an empty in-memory array
+            if os.fstat(array_file.fileno()).st_size == 0:
+                return memoryview(array(typecode))
+            mapped = mmap.mmap(array_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return memoryview(mapped).cast(typecode)
+
+    # Method that releases the memory maps
+    def close(self):
+        # Drop the views first so the maps can actually be closed
+        self.offsets = self.targets = self.title_offsets = self.title_blob = None
+        self.reverse_offsets = self.reverse_targets = None
+        for mapped in self._maps:
+            mapped.close()
+        self._maps = []
+
+    # Method that returns the encoded title of a page id
+    def title_bytes(self, page_id):
+        return bytes(self.title_blob[self.title_offsets[page_id]:self.title_offsets[page_id + 1]])
+
+    # Method that returns the title of a page id
+    def title(self, page_id):
+        return self.title_bytes(page_id).decode('utf-8')
+
+    # Method that looks up the page id of a title with a binary search over the sorted title table
+    def id_of(self, title):
+        key = title.encode('utf-8')
+        low, high = 0, self.node_count
+        while low < high:
+            middle = (low + high) // 2
+            if self.title_bytes(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        # Return the id only if the title at the insertion point is an exact match
+        if low < self.node_count and self.title_bytes(low) == key:
+            return low
+        return None
+
+    # Method that returns the ids of the pages linked from a page id
+    def neighbors(self, page_id):
+        return self.targets[self.offsets[page_id]:self.offsets[page_id + 1]]
+
+    # Method that returns the number of outgoing links of a page id
+    def degree(self, page_id):
+        return self.offsets[page_id + 1] - self.offsets[page_id]
+
+    # Method that returns the ids of the pages linking to a page id
+    def predecessors(self, page_id):
+        return self.reverse_targets[self.reverse_offsets[page_id]:self.reverse_offsets[page_id + 1]]
+
+    # Method with the same contract as crawler.get_links, served from the graph instead of the network
+    def get_links(self, page_url, logs_queue, search_id):
+        # Look up the page in the title table
+        page_id = self.id_of(url_to_title(page_url))
+        if page_id is None:
+            logs_queue.put(f"Page not in link graph: {page_url}")
+            return [], 0
+
+        # Convert the neighbor ids back to article URLs
+        valid_links = [title_to_url(self.title(target)) for target in self.neighbors(page_id)]
+        return valid_links, len(valid_links)
+
+    # Method with the same contract as crawler.get_backlinks, returning the pages that link to a page
+    def get_backlinks(self, page_url, logs_queue, search_id):
+        # Look up the page in the title table
+        page_id = self.id_of(url_to_title(page_url)) if self.has_backlinks else None
+        if page_id is None:
+            logs_queue.put(f"No backlinks in link graph for: {page_url}")
+            return [], 0
+
+        # Convert the predecessor ids back to article URLs
+        backlinks = [title_to_url(self.title(source)) for source in self.predecessors(page_id)]
+        return backlinks, len(backlinks)
+
+
+# Define a function named build_graph that writes a graph directory from (source title, target title) pairs
+def build_graph(edges, path):
+    # Intern titles to temporary ids in the order they are first seen
+    temporary_ids = {}
+    titles = []
+    sources = array('i')
+    targets = array('i')
+    for source_title, target_title in edges:
+        for title in (source_title, target_title):
+            if title not in temporary_ids:
+                temporary_ids[title] = len(titles)
+                titles.append(title)
+        sources.append(temporary_ids[source_title])
+        targets.append(temporary_ids[target_title])
+    del temporary_ids
+
+    # Assign final ids in sorted UTF-8 order so titles can be found with a binary search
+    encoded_titles = [title.encode('utf-8') for title in titles]
+    del titles
+    order = sorted(range(len(encoded_titles)), key=encoded_titles.__getitem__)
+    final_ids = array('i', bytes(4 * len(order)))
+    for final_id, temporary_id in enumerate(order):
+        final_ids[temporary_id] = final_id
+
+    # Bucket the edges by source page (counting sort)
+    node_count = len(order)
+    counts = array('q', bytes(8 * (node_count + 1)))
+    for source in sources:
+        counts[final_ids[source] + 1] += 1
+    for page_id in range(node_count):
+        counts[page_id + 1] += counts[page_id]
+    positions = array('q', counts)
+    bucketed = array('i', bytes(4 * len(targets)))
+    for source, target in zip(sources, targets):
+        source_id = final_ids[source]
+        bucketed[positions[source_id]] = final_ids[target]
+        positions[source_id] += 1
+    del sources, targets, positions
+
+    # Sort each adjacency list and drop duplicate links and self links
+    offsets = array('q', [0])
+    csr_targets = array('i')
+    for page_id in range(node_count):
+        neighbors = sorted(set(bucketed[counts[page_id]:counts[page_id + 1]]))
+        csr_targets.extend(target for target in neighbors if target != page_id)
+        offsets.append(len(csr_targets))
+    del bucketed, counts
+
+    # Build the reverse CSR arrays (sources come out sorted because pages are visited in id order)
+    reverse_offsets = array('q', bytes(8 * (node_count + 1)))
+    for target in csr_targets:
+        reverse_offsets[target + 1] += 1
+    for page_id in range(node_count):
+        reverse_offsets[page_id + 1] += reverse_offsets[page_id]
+    positions = array('q', reverse_offsets)
+    reverse_targets = array('i', bytes(4 * len(csr_targets)))
+    for page_id in range(node_count):
+        for target in csr_targets[offsets[page_id]:offsets[page_id + 1]]:
+            reverse_targets[positions[target]] = page_id
+            positions[target] += 1
+    del positions
+
+    # Write the arrays and the title table
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, OFFSETS_FILE), 'wb') as out:
+        offsets.tofile(out)
+    with open(os.path.join(path, TARGETS_FILE), 'wb') as out:
+        csr_targets.tofile(out)
+    with open(os.path.join(path, REVERSE_OFFSETS_FILE), 'wb') as out:
+        reverse_offsets.tofile(out)
+    with open(os.path.join(path, REVERSE_TARGETS_FILE), 'wb') as out:
+        reverse_targets.tofile(out)
+    title_offsets = array('q', [0])
+    with open(os.path.join(path, TITLES_FILE), 'wb') as out:
+        for temporary_id in order:
+            out.write(encoded_titles[temporary_id])
+            title_offsets.append(title_offsets[-1] + len(encoded_titles[temporary_id]))
+    with open(os.path.join(path, TITLE_OFFSETS_FILE), 'wb') as out:
+        title_offsets.tofile(out)
+
+    # Write the metadata last so a half-written directory is never opened
+    meta = {'version': GRAPH_VERSION, 'byteorder': sys.byteorder, 'nodes': node_count, 'edges': len(csr_targets)}
+    with open(os.path.join(path, META_FILE), 'w') as out:
+        json.dump(meta, out)
+    return meta
+
+
+# Define a function named iter_sql_matches that yields the matches of a row pattern in the INSERT statements of a dump
+def iter_sql_matches(dump_path, pattern):
+    # Open plain or gzip-compressed dumps
+    opener = gzip.open if dump_path.endswith('.gz') else open
+    with opener(dump_path, 'rt', encoding='utf-8', errors='replace') as dump:
+        for line in dump:
+            if line.startswith('INSERT INTO'):
+                yield from pattern.finditer(line)
+
+
+# Define a function named iter_sql_rows that yields (id, namespace, title) from the INSERT statements of a dump
+def iter_sql_rows(dump_path):
+    for match in iter_sql_matches(dump_path, SQL_ROW_PATTERN):
+        yield int(match.group(1)), int(match.group(2)), SQL_ESCAPE_PATTERN.sub(r'\1', match.group(3))
+
+
+# Define a function named iter_link_rows that yields (source id, target title) of article links from the pagelinks dump
+# Current dumps give each link as (pl_from, pl_from_namespace, pl_target_id) and keep the target's namespace and title in the
+# linktarget dump, (lt_id, lt_namespace, 'lt_title'); pre-2024 dumps give (pl_from, pl_namespace, 'pl_title', ...) and need none
+# A dump that gives no rows at all is in a layout the arguments do not match, and raises ValueError instead of building an empty graph
+def iter_link_rows(pagelinks_dump, linktarget_dump=None):
+    rows = 0
+    if linktarget_dump:
+        titles = {target_id: title for target_id, namespace, title in iter_sql_rows(linktarget_dump) if namespace == 0}
+        for match in iter_sql_matches(pagelinks_dump, SQL_LINK_ROW_PATTERN):
+            rows += 1
+            target_title = titles.get(int(match.group(3)))
+            if target_title is not None:
+                yield int(match.group(1)), target_title
+    else:
+        for source_id, namespace, target_title in iter_sql_rows(pagelinks_dump):
+            rows += 1
+            if namespace == 0:
+                yield source_id, target_title
+    if not rows:
+        if linktarget_dump:
+            raise ValueError(f"No (pl_from, pl_from_namespace, pl_target_id) rows in {pagelinks_dump}; "
+                             "is it a pre-2024 dump that needs no linktarget dump?")
+        raise ValueError(f"No (pl_from, pl_namespace, 'pl_title') rows in {pagelinks_dump}; "
+                         "dumps since 2024 keep link titles in the linktarget table, pass its dump too")
+
+
+# Define a function named read_article_titles that maps the page ids of articles (namespace 0) to their titles
+def read_article_titles(page_dump):
+    return {page_id: title for page_id, namespace, title in iter_sql_rows(page_dump) if namespace == 0}
+
+
+# Define a function named iter_dump_redirects that yields (redirect title, target title) of articles from the page and redirect dumps
+# Redirect rows are (rd_from, rd_namespace, rd_title, ...); title_by_id can be passed in when the page dump has already been read
+def iter_dump_redirects(page_dump, redirect_dump, title_by_id=None):
+    title_by_id = title_by_id if title_by_id is not None else read_article_titles(page_dump)
+    for source_id, namespace, target_title in iter_sql_rows(redirect_dump):
+        source_title = title_by_id.get(source_id)
+        if namespace == 0 and source_title is not None:
+            yield source_title, target_title
+
+
+# Define a function named iter_dump_edges that yields article links from the page and pagelinks dumps (and the linktarget dump of current dumps)
+# With a redirect dump, links to redirects point at their targets and redirect pages themselves are left out of the graph
+def iter_dump_edges(page_dump, pagelinks_dump, redirect_dump=None, linktarget_dump=None):
+    # Map page ids of articles (namespace 0) to their titles
+    title_by_id = read_article_titles(page_dump)
+    redirects = dict(iter_dump_redirects(page_dump, redirect_dump, title_by_id)) if redirect_dump else {}
+    existing_titles = set(title_by_id.values()) - set(redirects)
+
+    # Keep links between existing articles
+    for source_id, target_title in iter_link_rows(pagelinks_dump, linktarget_dump):
+        source_title = title_by_id.get(source_id)
+        target_title = redirects.get(target_title, target_title)
+        if source_title is not None and source_title not in redirects and target_title in existing_titles:
+            yield source_title, target_title
+
+
+# Define a function named main that implements the command line interface
+def main():
+    parser = argparse.ArgumentParser(description='Build or inspect an offline Wikipedia link graph.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    # Command for building a graph from the page and pagelinks SQL dumps
+    build = commands.add_parser('build-dump', help='build a graph from page/pagelinks SQL dumps')
+    build.add_argument('--page', required=True, help='path to enwiki-*-page.sql(.gz)')
+    build.add_argument('--pagelinks', required=True, help='path to enwiki-*-pagelinks.sql(.gz)')
+    build.add_argument('--redirect', help='path to enwiki-*-redirect.sql(.gz), to merge redirects into their targets')
+    build.add_argument('--linktarget', help='path to enwiki-*-linktarget.sql(.gz), needed with pagelinks dumps since 2024')
+    build.add_argument('out', help='output graph directory')
+
+    # Command for building a graph from the link cache filled by previous searches
+    build_cache = commands.add_parser('build-cache', help='build a graph from the crawler link cache')
+    build_cache.add_argument('--cache', default='link_cache.sqlite', help='path to the link cache database')
+    build_cache.add_argument('out', help='output graph directory')
+
+    # Command for printing a summary of a graph
+    info = commands.add_parser('info', help='print a summary of a graph')
+    info.add_argument('graph', help='graph directory')
+
+    args = parser.parse_args()
+    if args.command == 'build-dump':
+        try:
+            print(build_graph(iter_dump_edges(args.page, args.pagelinks, args.redirect, args.linktarget), args.out))
+        except ValueError as e:
+            parser.error(str(e))
+    elif args.command == 'build-cache':
+        print(build_graph(LinkCache(args.cache).iter_edges(), args.out))
+    elif args.command == 'info':
+        graph = LinkGraph(args.graph)
+        print(f"{graph.node_count} pages, {graph.edge_count} links")
+        graph.close()
+
+
+# Entry point of the command line interface
+if __name__ == '__main__':
+    main()
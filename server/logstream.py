@@ -0,0 +1,137 @@
+import time  # Importing time for stamping log entries
+from collections import deque, Counter, OrderedDict  # Importing containers for the ring buffer, subscriber levels and channel registry
+from threading import Condition, Lock  # Importing Condition and Lock for waking subscribers and guarding the registry
+
+# Verbosity levels: lower is more verbose (the same ordering as the logging module)
+DEBUG = 10  # Messages from the innermost loops, such as every enqueued link
+INFO = 20  # Messages about every expanded page
+ERROR = 40  # Failures
+
+# Names accepted for verbosity levels in configuration and query strings
+LEVEL_NAMES = {'debug': DEBUG, 'info': INFO, 'error': ERROR}
+
+
+# Define a function named parse_level that turns a level name (or number) into a level, falling back to a default
+def parse_level(value, default=INFO):
+    if value is None:
+        return default
+    if str(value).isdigit():
+        return int(value)
+    return LEVEL_NAMES.get(str(value).lower(), default)
+
+
+# Define a function named log_enabled that tells whether a message of a level would be kept by a log sink
+# Plain queues keep every message, as before channels existed
+def log_enabled(logs, level):
+    return logs.enabled(level) if isinstance(logs, LogChannel) else True
+
+
+# Define a function named log that puts a message of a level on a log sink (a LogChannel or a plain queue)
+def log(logs, message, level=INFO):
+    if isinstance(logs, LogChannel):
+        logs.put(message, level)
+    else:
+        logs.put(message)
+
+
+# Define a class named LogChannel, a bounded ring buffer of log messages that subscribers read by sequence number
+# The oldest messages are dropped when the buffer is full; a message with a coalesce key replaces the newest one with the same key
+class LogChannel:
+    # Constructor method that takes the number of messages kept and the level kept when nobody is subscribed
+    def __init__(self, capacity=1000, level=INFO):
+        self.capacity = capacity  # Number of messages kept
+        self.level = level  # Messages at this level or above are kept even when nobody is listening
+        self.dropped = 0  # Number of messages pushed out of the buffer
+        self.closed = False  # Set once no more messages will be put
+        self._entries = deque(maxlen=capacity)  # (sequence number, level, coalesce key, time, message)
+        self._next_seq = 1
+        self._subscriber_levels = Counter()
+        self._threshold = level
+        self._condition = Condition()
+
+    # Method that tells whether a message of a level would be kept, so callers can skip formatting it otherwise
+    def enabled(self, level):
+        return level >= self._threshold
+
+    # Method that adds a message, waking every subscriber waiting for one
+    def put(self, message, level=INFO, key=None):
+        if level < self._threshold:
+            return
+        with self._condition:
+            if self.closed:
+                return
+            # Replace the newest message if it carries the same coalesce key, such as a progress line
+            if key is not None and self._entries and self._entries[-1][2] == key:
+                self._entries.pop()
+            elif len(self._entries) == self.capacity:
+                self.dropped += 1
+            self._entries.append((self._next_seq, level, key, time.time(), message))
+            self._next_seq += 1
+            self._condition.notify_all()
+
+    # Method that marks the channel as finished and wakes every subscriber
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+    # Method that registers a subscriber reading at a level, so messages of that level start being kept
+    def subscribe(self, level=INFO):
+        with self._condition:
+            self._subscriber_levels[level] += 1
+            self._threshold = min([self.level] + list(self._subscriber_levels))
+
+    # Method that removes a subscriber registered with subscribe
+    def unsubscribe(self, level=INFO):
+        with self._condition:
+            self._subscriber_levels[level] -= 1
+            if not self._subscriber_levels[level]:
+                del self._subscriber_levels[level]
+            self._threshold = min([self.level] + list(self._subscriber_levels))
+
+    # Method that waits up to timeout seconds for messages after a sequence number
+    # It returns the (sequence number, message) pairs of the given level or above, and how many messages were missed because they were dropped
+    def read(self, after=0, level=INFO, timeout=None):
+        with self._condition:
+            self._condition.wait_for(lambda: self.closed or (self._entries and self._entries[-1][0] > after), timeout)
+            missed = max(0, self._entries[0][0] - after - 1) if self._entries and after else 0
+            entries = [(seq, message) for seq, entry_level, _, _, message in self._entries
+                       if seq > after and entry_level >= level]
+            return entries, missed
+
+    # Method that returns the (sequence number, level, message) entries after a sequence number without waiting, e.g. for copying them elsewhere
+    def since(self, after=0):
+        with self._condition:
+            return [(seq, level, message) for seq, level, _, _, message in self._entries if seq > after]
+
+
+# Define a class named LogChannels, a registry of the log channels of recent searches that forgets the oldest ones beyond a limit
+class LogChannels:
+    # Constructor method that takes the number of channels kept, and the capacity and level of new channels
+    def __init__(self, max_channels=1000, capacity=1000, level=INFO):
+        self.max_channels = max_channels
+        self.capacity = capacity
+        self.level = level
+        self._channels = OrderedDict()
+        self._lock = Lock()
+
+    # Method that returns the channel of a search, creating it if needed
+    def create(self, search_id):
+        with self._lock:
+            channel = self._channels.get(search_id)
+            if channel is None:
+                channel = self._channels[search_id] = LogChannel(self.capacity, self.level)
+                while len(self._channels) > self.max_channels:
+                    _, old_channel = self._channels.popitem(last=False)
+                    old_channel.close()
+            return channel
+
+    # Method that returns the channel of a search, or None if there is none
+    def get(self, search_id):
+        with self._lock:
+            return self._channels.get(search_id)
+
+    # Method that returns a snapshot of the (search id, channel) pairs
+    def items(self):
+        with self._lock:
+            return list(self._channels.items())
@@ -0,0 +1,121 @@
+import os  # Importing os for reading whether metrics are enabled
+import time  # Importing time for measuring durations
+import threading  # Importing threading for guarding the metric values
+from bisect import bisect_left  # Importing bisect_left for finding histogram buckets
+from functools import wraps  # Importing wraps for the timing decorator
+
+# Whether metrics are recorded; with WIKI_METRICS=0 the timing decorators return the functions unchanged
+ENABLED = os.environ.get('WIKI_METRICS', '1') != '0'
+
+# Upper bounds (in seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+# Metrics and collectors exported by render, in registration order
+registry = []
+collectors = []
+
+
+# Define a function named format_labels that renders a label dictionary in the Prometheus text format
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+
+# Define a class named Counter, a value that only goes up, kept per combination of label values
+class Counter:
+    # Constructor method that takes the metric name and help text, and registers the metric
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    # Method that adds to the counter of the given labels
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    # Method that returns the lines of the metric in the Prometheus text format
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        lines.extend(f"{self.name}{format_labels(key)} {value}" for key, value in sorted(values.items()))
+        return lines
+
+
+# Define a class named Histogram, counts of observed values by bucket plus their sum, kept per combination of label values
+class Histogram:
+    # Constructor method that takes the metric name, help text and bucket upper bounds, and registers the metric
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._values = {}  # Label values to [bucket counts..., count above the last bucket, sum]
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    # Method that records one value for the given labels
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    # Method that returns the lines of the metric in the Prometheus text format (buckets are cumulative)
+    def render(self):
+        with self._lock:
+            values = {key: list(counts) for key, counts in self._values.items()}
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, counts in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{format_labels(key + (('le', bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(key)} {counts[-1]}")
+            lines.append(f"{self.name}_count{format_labels(key)} {cumulative}")
+        return lines
+
+
+# Define a function named collector that registers a function called at export time
+# The function returns (name, type, help text, [(labels dictionary, value), ...]) tuples, for values other modules already keep
+def collector(function):
+    collectors.append(function)
+    return function
+
+
+# Define a function named timed that returns a decorator recording the duration of every call in a histogram
+def timed(histogram, **labels):
+    def decorator(function):
+        if not ENABLED:
+            return function
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start_time, **labels)
+        return wrapper
+    return decorator
+
+
+# Define a function named render that returns every metric in the Prometheus text exposition format
+def render():
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    for function in collectors:
+        for name, kind, help_text, samples in function():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{format_labels(tuple(sorted(labels.items())))} {value}" for labels, value in samples)
+    return '\n'.join(lines) + '\n'
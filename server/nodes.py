@@ -0,0 +1,90 @@
+from array import array  # Importing array for compact integer storage
+
+
+# Define a class named NodeTable that interns page URLs to small consecutive integer ids
+class NodeTable:
+    # Constructor method to create an empty table
+    def __init__(self):
+        self._ids = {}  # Page URL to node id
+        self._urls = []  # Node id to page URL
+
+    # Method that returns the id of a URL, assigning the next free id to new URLs
+    def intern(self, url):
+        node = self._ids.get(url)
+        if node is None:
+            node = self._ids[url] = len(self._urls)
+            self._urls.append(url)
+        return node
+
+    # Method that makes a URL another name of an existing node (a redirect found once its page was fetched), unless it already has a node
+    # It returns the node the URL stands for
+    def alias(self, url, node):
+        return self._ids.setdefault(url, node)
+
+    # Method that returns the id of a URL, or None if it has not been interned
+    def id_of(self, url):
+        return self._ids.get(url)
+
+    # Method that returns the URL of a node id
+    def url(self, node):
+        return self._urls[node]
+
+    # Method that returns the number of interned URLs
+    def __len__(self):
+        return len(self._urls)
+
+
+# Define a class named NodeBitset, a set of node ids stored as one bit per id
+class NodeBitset:
+    # Constructor method to create an empty set
+    def __init__(self):
+        self._bits = bytearray()
+        self.count = 0  # Number of ids in the set
+
+    # Method that adds a node id to the set
+    def add(self, node):
+        byte = node >> 3
+        if byte >= len(self._bits):
+            # Grow geometrically so adding n ids costs O(n) overall
+            self._bits.extend(bytes(max(byte + 1 - len(self._bits), len(self._bits))))
+        mask = 1 << (node & 7)
+        if not self._bits[byte] & mask:
+            self._bits[byte] |= mask
+            self.count += 1
+
+    # Method that checks whether a node id is in the set
+    def __contains__(self, node):
+        byte = node >> 3
+        return byte < len(self._bits) and bool(self._bits[byte] & (1 << (node & 7)))
+
+    # Method that returns the number of ids in the set
+    def __len__(self):
+        return self.count
+
+
+# Define a class named NodeArray, an int32 array indexed by node id that grows on demand
+class NodeArray:
+    # Constructor method that takes the value of entries that were never set
+    def __init__(self, default=-1):
+        self.default = default
+        self._values = array('i')
+
+    # Method that returns the value of a node id
+    def __getitem__(self, node):
+        return self._values[node] if node < len(self._values) else self.default
+
+    # Method that sets the value of a node id
+    def __setitem__(self, node, value):
+        if node >= len(self._values):
+            # Grow geometrically so setting n ids costs O(n) overall
+            self._values.extend([self.default] * max(node + 1 - len(self._values), len(self._values)))
+        self._values[node] = value
+
+
+# Define a function named build_path that follows parent pointers from a node back to the root and returns the URLs root first
+def build_path(parents, node, table):
+    path = []
+    while node != -1:
+        path.append(table.url(node))
+        node = parents[node]
+    return path[::-1]
@@ -0,0 +1,44 @@
+from concurrent.futures import ProcessPoolExecutor  # Importing ProcessPoolExecutor for parsing outside the GIL
+import keywords  # Importing keywords for text and keyword extraction
+from extract import extract_links  # Importing extract_links for link extraction
+
+
+# Define a function named init_worker that runs once in every worker process
+def init_worker():
+    # Load the NLTK stopwords, tokenizer and tagger up front instead of on every call
+    # Only the server process downloads missing data, so the workers do not all download it at once
+    try:
+        keywords.load_nltk(download=False)
+    except LookupError:
+        # Missing NLTK data only matters to keyword extraction, which reports it when it is called
+        pass
+
+
+# Define a function named parse_links that extracts (valid links, total link count) from raw HTML bytes
+def parse_links(content, page_url):
+    return extract_links(content.decode('utf-8', errors='replace'), page_url)
+
+
+# Define a function named parse_keywords that extracts the keyword dictionary from raw HTML bytes
+def parse_keywords(content):
+    return keywords.extract_keywords(keywords.extract_text(content.decode('utf-8', errors='replace')))
+
+
+# Define a class named ParsePool, a pool of worker processes for CPU-bound HTML parsing and keyword extraction
+class ParsePool:
+    # Constructor method that starts the given number of worker processes
+    def __init__(self, processes):
+        self.processes = processes  # Number of worker processes
+        self._executor = ProcessPoolExecutor(max_workers=processes, initializer=init_worker)
+
+    # Method that returns (valid links, total link count) of a page, parsed in a worker
+    def links(self, content, page_url):
+        return self._executor.submit(parse_links, content, page_url).result()
+
+    # Method that returns the keyword dictionary of a page, extracted in a worker
+    def keywords(self, content):
+        return self._executor.submit(parse_keywords, content).result()
+
+    # Method that stops the worker processes
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
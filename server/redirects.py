@@ -0,0 +1,187 @@
+import csv  # Importing csv for reading tab-separated redirect lists
+import sys  # Importing sys for raising the csv field size limit
+import time  # Importing time for timestamping redirects
+import sqlite3  # Importing sqlite3 for the shared on-disk table
+import argparse  # Importing argparse for the command line interface
+import threading  # Importing threading for locks and per-thread connections
+from titles import url_to_title  # Importing url_to_title for normalizing titles before they are stored
+
+# Maximum number of SQL parameters used in a single IN (...) query
+SQL_BATCH_SIZE = 900
+
+# Maximum number of redirects followed from one title (MediaWiki itself follows one; longer chains are broken double redirects)
+MAX_REDIRECT_HOPS = 3
+
+
+# Define a class named RedirectTable, a persistent map of redirect titles to the titles of the articles they lead to
+# Resolved titles (including the ones that are not redirects) are remembered in memory, so the searches' hot path rarely reaches SQLite
+class RedirectTable:
+    # Constructor method to open (or create) the table
+    def __init__(self, path, max_memory=200000):
+        self.path = path  # SQLite database file shared by all processes
+        self.max_memory = max_memory  # Number of resolved titles remembered in memory before the memory is cleared
+        self._memory = {}  # Title to its resolved title
+        self._local = threading.local()  # Per-thread connections
+        self._lock = threading.Lock()  # Lock protecting the memory and the counters
+        self._counters = {'lookups': 0, 'memory_hits': 0, 'redirects_followed': 0, 'added': 0}
+
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS redirects (title TEXT PRIMARY KEY, target TEXT NOT NULL, '
+                               'origin TEXT, updated_at REAL)')
+
+    # Method that returns this thread's connection, in WAL mode so readers never block the writer
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    # Method that adds to one of the counters
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    # Method that returns a snapshot of the counters
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, memory=len(self._memory))
+
+    # Method that returns the number of stored redirects
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM redirects').fetchone()[0]
+
+    # Method that remembers resolved titles, forgetting everything once the memory is full
+    def _remember(self, resolved):
+        with self._lock:
+            if len(self._memory) + len(resolved) > self.max_memory:
+                self._memory.clear()
+            self._memory.update(resolved)
+
+    # Method that returns the stored targets of a list of titles (titles that are not redirects are left out)
+    def _targets(self, titles):
+        connection = self._connection()
+        targets = {}
+        for start in range(0, len(titles), SQL_BATCH_SIZE):
+            batch = titles[start:start + SQL_BATCH_SIZE]
+            query = 'SELECT title, target FROM redirects WHERE title IN ({})'.format(','.join('?' * len(batch)))
+            targets.update(connection.execute(query, batch))
+        return targets
+
+    # Method that returns the title a title resolves to (itself if it is not a redirect)
+    def resolve(self, title):
+        return self.resolve_many([title])[0]
+
+    # Method that resolves a list of titles, returning the resolved titles in the same order
+    def resolve_many(self, titles):
+        memory = self._memory
+        resolved = {}
+        unknown = set()
+        for title in titles:
+            target = memory.get(title)
+            if target is None:
+                unknown.add(title)
+            else:
+                resolved[title] = target
+        with self._lock:
+            self._counters['lookups'] += len(titles)
+            self._counters['memory_hits'] += len(titles) - len(unknown)
+
+        if unknown:
+            # Follow the chains of the unknown titles hop by hop, one batched query per hop
+            found = {title: title for title in unknown}
+            pending = list(unknown)
+            for _ in range(MAX_REDIRECT_HOPS):
+                targets = self._targets(list({found[title] for title in pending}))
+                pending = [title for title in pending if found[title] in targets]
+                for title in pending:
+                    found[title] = targets[found[title]]
+                if not pending:
+                    break
+            self._count('redirects_followed', sum(1 for title in unknown if found[title] != title))
+            self._remember(found)
+            resolved.update(found)
+        return [resolved[title] for title in titles]
+
+    # Method that records that a title redirects to a target
+    def add(self, title, target, origin='fetch'):
+        self.add_many([(title, target)], origin)
+
+    # Method that records a list of (title, target) redirects; redirects of a title to itself are ignored
+    def add_many(self, redirects, origin='fetch'):
+        rows = [(title, target, origin, time.time()) for title, target in redirects if title != target]
+        if not rows:
+            return 0
+        connection = self._connection()
+        with connection:
+            connection.executemany('INSERT INTO redirects (title, target, origin, updated_at) VALUES (?, ?, ?, ?) '
+                                   'ON CONFLICT (title) DO UPDATE SET target = excluded.target, '
+                                   'origin = excluded.origin, updated_at = excluded.updated_at', rows)
+        # Chains may have changed, so forget every remembered resolution
+        with self._lock:
+            self._memory.clear()
+            self._counters['added'] += len(rows)
+        return len(rows)
+
+    # Method that returns the titles redirecting to a target
+    def redirects_to(self, target):
+        return [title for title, in self._connection().execute('SELECT title FROM redirects WHERE target = ?', (target,))]
+
+
+# Define a function named iter_tsv_redirects that yields (title, target) pairs from a file of tab-separated lines
+def iter_tsv_redirects(path):
+    csv.field_size_limit(sys.maxsize)
+    with open(path, newline='', encoding='utf-8') as redirect_file:
+        for row in csv.reader(redirect_file, delimiter='\t'):
+            if len(row) >= 2:
+                yield url_to_title(row[0]), url_to_title(row[1])
+
+
+# Define a function named load_redirects that stores redirects in batches and returns how many were stored
+def load_redirects(table, redirects, origin, batch_size=10000):
+    loaded = 0
+    batch = []
+    for redirect in redirects:
+        batch.append(redirect)
+        if len(batch) == batch_size:
+            loaded += table.add_many(batch, origin)
+            batch = []
+    return loaded + table.add_many(batch, origin)
+
+
+# Define a function named main that implements the command line interface
+def main():
+    parser = argparse.ArgumentParser(description='Load or query the redirect table used to canonicalize article titles.')
+    parser.add_argument('--db', default='redirects.sqlite', help='path to the redirect table database')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    # Command for loading redirects from the page and redirect SQL dumps
+    load_dump = commands.add_parser('load-dump', help='load redirects from page/redirect SQL dumps')
+    load_dump.add_argument('--page', required=True, help='path to enwiki-*-page.sql(.gz)')
+    load_dump.add_argument('--redirect', required=True, help='path to enwiki-*-redirect.sql(.gz)')
+
+    # Command for loading redirects from a tab-separated list
+    load_tsv = commands.add_parser('load-tsv', help='load redirects from lines of "title<TAB>target"')
+    load_tsv.add_argument('path', help='path to the tab-separated file')
+
+    # Command for resolving titles
+    resolve = commands.add_parser('resolve', help='print the titles some titles resolve to')
+    resolve.add_argument('titles', nargs='+', help='titles or article URLs')
+
+    args = parser.parse_args()
+    table = RedirectTable(args.db)
+    if args.command == 'load-dump':
+        from linkgraph import iter_dump_redirects
+        print(f"Loaded {load_redirects(table, iter_dump_redirects(args.page, args.redirect), 'dump')} redirects")
+    elif args.command == 'load-tsv':
+        print(f"Loaded {load_redirects(table, iter_tsv_redirects(args.path), 'dump')} redirects")
+    elif args.command == 'resolve':
+        for title in args.titles:
+            print(f"{url_to_title(title)}\t{table.resolve(url_to_title(title))}")
+
+
+# Entry point of the command line interface
+if __name__ == '__main__':
+    main()
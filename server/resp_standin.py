@@ -0,0 +1,269 @@
+import time  # Importing time for key expiry
+import fnmatch  # Importing fnmatch for KEYS patterns
+import argparse  # Importing argparse for the command line interface
+import threading  # Importing threading for the lock and the background thread
+from socketserver import ThreadingTCPServer, StreamRequestHandler  # Importing the TCP server the stand-in runs on
+from statestore import RespError  # Importing RespError for turning failed commands into error replies
+
+# Error reply for commands applied to a key of the wrong type, in Redis' words
+WRONG_TYPE = 'WRONGTYPE Operation against a key holding the wrong kind of value'
+
+
+# Define a function named encode_reply that encodes a Python value as a RESP2 reply
+def encode_reply(value):
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, bool):
+        return b':%d\r\n' % int(value)
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if isinstance(value, RespError):
+        return b'-%s\r\n' % str(value).encode('utf-8')
+    if isinstance(value, list):
+        return b'*%d\r\n' % len(value) + b''.join(encode_reply(item) for item in value)
+    if isinstance(value, SimpleString):
+        return b'+%s\r\n' % value.encode('utf-8')
+    data = value if isinstance(value, bytes) else str(value).encode('utf-8')
+    return b'$%d\r\n%s\r\n' % (len(data), data)
+
+
+# Define a class named SimpleString, a str sent as a status reply (such as OK or PONG) instead of a bulk string
+class SimpleString(str):
+    pass
+
+
+# Define a class named RespStandin, a small in-memory server speaking enough of the Redis protocol for statestore.RespStateStore
+# It supports strings, hashes and sorted sets with expiry, so the shared state can be tested without a Redis installation
+class RespStandin:
+    # Constructor method that takes the address to listen on (port 0 picks a free one)
+    def __init__(self, host='127.0.0.1', port=0):
+        self.data = {}  # Key to value: str, dict (hash) or dict of member to score (sorted set, tagged in self.types)
+        self.types = {}  # Key to 'string', 'hash' or 'zset'
+        self.expiry = {}  # Key to the time.time() it expires at
+        self.commands = 0  # Number of commands served
+        self._lock = threading.Lock()
+        self._server = ThreadingTCPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    # Property with the redis:// URL of the running server
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    # Method that starts serving in a background thread and returns the URL
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    # Method that serves in the calling thread until interrupted
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    # Method that stops the server
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # Method that builds the request handler class bound to this server
+    def _handler_class(self):
+        standin = self
+
+        # Define a class named Handler reading commands off one connection until it closes
+        class Handler(StreamRequestHandler):
+            # Method that answers the commands of one connection
+            def handle(self):
+                while True:
+                    args = read_command(self.rfile)
+                    if args is None:
+                        return
+                    try:
+                        reply = standin.execute(args)
+                    except RespError as e:
+                        reply = e
+                    self.wfile.write(encode_reply(reply))
+
+        return Handler
+
+    # Method that drops a key if it has expired
+    def _expire(self, key):
+        expires_at = self.expiry.get(key)
+        if expires_at is not None and expires_at <= time.time():
+            self._delete(key)
+
+    # Method that deletes a key and returns whether it existed
+    def _delete(self, key):
+        self.expiry.pop(key, None)
+        self.types.pop(key, None)
+        return self.data.pop(key, None) is not None
+
+    # Method that returns the value of a key of a type, creating it if asked to
+    def _value(self, key, kind, create=False):
+        self._expire(key)
+        if key not in self.data:
+            if not create:
+                return None
+            self.data[key] = {} if kind in ('hash', 'zset') else ''
+            self.types[key] = kind
+        if self.types[key] != kind:
+            raise RespError(WRONG_TYPE)
+        return self.data[key]
+
+    # Method that runs one command and returns its reply
+    def execute(self, args):
+        with self._lock:
+            self.commands += 1
+            name, args = args[0].upper(), args[1:]
+            handler = getattr(self, f"command_{name.lower()}", None)
+            if handler is None:
+                raise RespError(f"ERR unknown command '{name}'")
+            try:
+                return handler(*args)
+            except TypeError:
+                raise RespError(f"ERR wrong number of arguments for '{name.lower()}' command")
+
+    # Method that answers PING
+    def command_ping(self, *args):
+        return SimpleString('PONG')
+
+    # Method that answers SELECT
+    def command_select(self, db):
+        return SimpleString('OK')
+
+    # Method that answers AUTH
+    def command_auth(self, *args):
+        return SimpleString('OK')
+
+    # Method that answers FLUSHDB
+    def command_flushdb(self):
+        self.data.clear()
+        self.types.clear()
+        self.expiry.clear()
+        return SimpleString('OK')
+
+    # Method that answers KEYS
+    def command_keys(self, pattern):
+        for key in list(self.data):
+            self._expire(key)
+        return [key for key in self.data if fnmatch.fnmatchcase(key, pattern)]
+
+    # Method that answers DEL
+    def command_del(self, *keys):
+        return sum(self._delete(key) for key in keys)
+
+    # Method that answers EXISTS
+    def command_exists(self, *keys):
+        for key in keys:
+            self._expire(key)
+        return sum(key in self.data for key in keys)
+
+    # Method that answers EXPIRE
+    def command_expire(self, key, seconds):
+        return self.command_pexpire(key, int(seconds) * 1000)
+
+    # Method that answers PEXPIRE
+    def command_pexpire(self, key, milliseconds):
+        self._expire(key)
+        if key not in self.data:
+            return 0
+        self.expiry[key] = time.time() + int(milliseconds) / 1000
+        return 1
+
+    # Method that answers PTTL
+    def command_pttl(self, key):
+        self._expire(key)
+        if key not in self.data:
+            return -2
+        if key not in self.expiry:
+            return -1
+        return int((self.expiry[key] - time.time()) * 1000)
+
+    # Method that answers GET
+    def command_get(self, key):
+        return self._value(key, 'string')
+
+    # Method that answers SET
+    def command_set(self, key, value):
+        self._delete(key)
+        self.data[key] = value
+        self.types[key] = 'string'
+        return SimpleString('OK')
+
+    # Method that answers INCRBY
+    def command_incrby(self, key, amount):
+        value = self._value(key, 'string', create=True)
+        try:
+            value = int(value or 0) + int(amount)
+        except ValueError:
+            raise RespError('ERR value is not an integer or out of range')
+        self.data[key] = str(value)
+        return value
+
+    # Method that answers HSET
+    def command_hset(self, key, *pairs):
+        hash_value = self._value(key, 'hash', create=True)
+        added = 0
+        for field, value in zip(pairs[::2], pairs[1::2]):
+            added += field not in hash_value
+            hash_value[field] = value
+        return added
+
+    # Method that answers HGET
+    def command_hget(self, key, field):
+        hash_value = self._value(key, 'hash')
+        return hash_value.get(field) if hash_value is not None else None
+
+    # Method that answers HGETALL
+    def command_hgetall(self, key):
+        hash_value = self._value(key, 'hash') or {}
+        return [item for pair in hash_value.items() for item in pair]
+
+    # Method that answers ZADD
+    def command_zadd(self, key, *pairs):
+        members = self._value(key, 'zset', create=True)
+        added = 0
+        for score, member in zip(pairs[::2], pairs[1::2]):
+            added += member not in members
+            members[member] = float(score)
+        return added
+
+    # Method that answers ZRANGEBYSCORE
+    def command_zrangebyscore(self, key, low, high):
+        members = self._value(key, 'zset') or {}
+        low_open, low = low.startswith('('), float(low.lstrip('('))
+        high_open, high = high.startswith('('), float(high.lstrip('('))
+        selected = [(score, member) for member, score in members.items()
+                    if (score > low if low_open else score >= low) and (score < high if high_open else score <= high)]
+        return [member for _, member in sorted(selected)]
+
+
+# Define a function named read_command that reads one command (an array of bulk strings, or an inline command) from a binary file
+def read_command(reader):
+    line = reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b'*'):
+        return line.decode('utf-8').split()
+    args = []
+    for _ in range(int(line[1:-2])):
+        length = int(reader.readline()[1:-2])
+        args.append(reader.read(length + 2)[:-2].decode('utf-8'))
+    return args
+
+
+# Define a function named main that runs the stand-in from the command line
+def main():
+    parser = argparse.ArgumentParser(description='Serve a minimal Redis-protocol stand-in for testing the shared search state.')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=6379, help='port to listen on')
+    args = parser.parse_args()
+    standin = RespStandin(args.host, args.port)
+    print(f"Serving {standin.url} (WIKI_STATE_STORE={standin.url})")
+    standin.serve_forever()
+
+
+# Entry point of the command line interface
+if __name__ == '__main__':
+    main()
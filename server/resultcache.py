@@ -0,0 +1,102 @@
+import json  # Importing json for storing search results
+import time  # Importing time for staleness and recency timestamps
+import sqlite3  # Importing sqlite3 for the on-disk store
+import threading  # Importing threading for locks and per-thread connections
+from titles import url_to_title  # Importing url_to_title for normalizing the cache key
+
+
+# Define a function named result_key that returns the cache key of a search request
+# Start and finish are keyed by title so different spellings of the same URL share an entry; results of searches that run A*
+# (A* itself, or a race with an A* strategy, for which the caller passes the heuristic) also depend on the heuristic
+def result_key(start_page, finish_page, method, heuristic=None):
+    parts = [method, url_to_title(start_page), url_to_title(finish_page)]
+    if method == 'a_star' or heuristic is not None:
+        parts.append(heuristic or 'titles')
+    return '\n'.join(parts)
+
+
+# Define a class named ResultCache, a persistent store of solved searches with a time to live and least-recently-used eviction
+class ResultCache:
+    # Constructor method to open (or create) the store
+    def __init__(self, path, ttl=86400, max_entries=10000, touch_interval=60):
+        self.path = path  # SQLite database file
+        self.ttl = ttl  # Seconds after which a stored result is searched for again
+        self.max_entries = max_entries  # Number of results kept before the least recently used ones are evicted
+        self.touch_interval = touch_interval  # Minimum seconds between recency updates of one entry
+        self._local = threading.local()  # Per-thread connections
+        self._lock = threading.Lock()  # Lock protecting the counters
+        self._counters = {'hits': 0, 'misses': 0, 'stale': 0, 'puts': 0, 'evictions': 0}
+
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result TEXT, '
+                               'created_at REAL, accessed_at REAL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed_at)')
+
+    # Method that returns this thread's connection, in WAL mode so readers never block the writer
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    # Method that adds to one of the counters
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    # Method that returns a snapshot of the counters
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+    # Method that returns the stored result of a key, or None if it is missing or stale
+    def get(self, key):
+        connection = self._connection()
+        row = connection.execute('SELECT result, created_at, accessed_at FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self._count('misses')
+            return None
+        now = time.time()
+        if now - row[1] > self.ttl:
+            self._count('stale')
+            return None
+        self._count('hits')
+
+        # Update the recency used by eviction, but not on every single read
+        if now - row[2] > self.touch_interval:
+            with connection:
+                connection.execute('UPDATE results SET accessed_at = ? WHERE key = ?', (now, key))
+        return json.loads(row[0])
+
+    # Method that stores the result of a key
+    def put(self, key, result):
+        connection = self._connection()
+        now = time.time()
+        with connection:
+            connection.execute('INSERT OR REPLACE INTO results (key, result, created_at, accessed_at) VALUES (?, ?, ?, ?)',
+                               (key, json.dumps(result), now, now))
+        self._count('puts')
+        if self._counters['puts'] % 100 == 0:
+            self.evict()
+
+    # Method that returns the (key, result) pairs of the most recently used fresh results, newest first
+    def recent(self, limit=1000):
+        rows = self._connection().execute('SELECT key, result FROM results WHERE created_at >= ? '
+                                          'ORDER BY accessed_at DESC LIMIT ?', (time.time() - self.ttl, limit))
+        return [(key, json.loads(result)) for key, result in rows]
+
+    # Method that deletes the least recently used results beyond max_entries (down to 90% of it)
+    def evict(self):
+        connection = self._connection()
+        with connection:
+            count = connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+            if count <= self.max_entries:
+                return 0
+            excess = count - int(self.max_entries * 0.9)
+            connection.execute('DELETE FROM results WHERE key IN '
+                               '(SELECT key FROM results ORDER BY accessed_at LIMIT ?)', (excess,))
+        self._count('evictions', excess)
+        return excess
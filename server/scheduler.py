@@ -0,0 +1,315 @@
+import math  # Importing math for checking that budget limits are finite
+import time  # Importing time for recording when searches start and finish
+from collections import deque  # Importing deque for the admission queue
+from threading import Thread, Condition, Event, Lock  # Importing threading primitives for the worker pool
+import metrics  # Importing metrics for search counters and timings
+from metrics import Counter, Histogram  # Importing the metric types
+
+# Search metrics exported by the /metrics endpoint
+PAGES_EXPANDED = Counter('wiki_pages_expanded_total', 'Pages whose links have been read by a search')
+QUEUE_WAIT_SECONDS = Histogram('wiki_search_queue_wait_seconds', 'Seconds a search waited for a worker')
+SEARCH_SECONDS = Histogram('wiki_search_seconds', 'Seconds a search ran, by method and outcome')
+BUDGETS_EXHAUSTED = Counter('wiki_search_budgets_exhausted_total', 'Searches stopped because a limit of their budget was reached, by limit')
+
+# Contexts of the searches that are queued or running, by search ID
+search_contexts = {}
+
+
+# Define a class named SearchBudget holding the limits of one search; a limit of None is no limit
+class SearchBudget:
+    # Names of the limits, in constructor order
+    LIMITS = ('deadline', 'max_pages', 'max_frontier', 'max_visited')
+
+    # Constructor method that takes the limits
+    def __init__(self, deadline=None, max_pages=None, max_frontier=None, max_visited=None):
+        self.deadline = deadline  # Seconds the search may run for
+        self.max_pages = max_pages  # Number of pages the search may expand
+        self.max_frontier = max_frontier  # Number of pages that may wait to be expanded
+        self.max_visited = max_visited  # Number of pages the search may discover
+
+    # Class method that builds a budget from a dictionary such as the 'budget' of a request, raising ValueError on bad values
+    @classmethod
+    def from_dict(cls, data):
+        limits = {}
+        for name in cls.LIMITS:
+            value = data.get(name)
+            if value is not None:
+                # NaN and infinity would compare as never reached, so they are refused rather than taken as no limit
+                number = float(value)
+                if not math.isfinite(number):
+                    raise ValueError(f"{name} must be a finite number")
+                limits[name] = number if name == 'deadline' else int(value)
+                if limits[name] <= 0:
+                    raise ValueError(f"{name} must be positive")
+        return cls(**limits)
+
+    # Method that returns the limits as a dictionary
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.LIMITS}
+
+    # Method that returns a budget with the tighter of each limit of this budget and another one
+    def tighter(self, other):
+        limits = {}
+        for name in self.LIMITS:
+            mine, theirs = getattr(self, name), getattr(other, name)
+            limits[name] = theirs if mine is None else mine if theirs is None else min(mine, theirs)
+        return SearchBudget(**limits)
+
+    # Method that returns the name of the first limit a search has reached, or None
+    def exceeded(self, context):
+        if self.deadline is not None and time.time() >= context.deadline_at():
+            return 'deadline'
+        if self.max_pages is not None and context.pages_expanded >= self.max_pages:
+            return 'max_pages'
+        if self.max_frontier is not None and context.frontier_size > self.max_frontier:
+            return 'max_frontier'
+        if self.max_visited is not None and context.visited_size > self.max_visited:
+            return 'max_visited'
+        return None
+
+
+# Define a class named SearchContext that holds everything belonging to one search: its request, cancel token, target keywords and counters
+class SearchContext:
+    # Constructor method that takes the search ID and the search request
+    def __init__(self, search_id, start_page=None, finish_page=None, method=None, heuristic='titles', logs=None, budget=None, finish_pages=None):
+        self.search_id = search_id  # Unique ID of the search
+        self.start_page = start_page  # Page the search starts from
+        self.finish_page = finish_page  # Page the search looks for
+        self.finish_pages = finish_pages  # Pages a multi-target search looks for (None for a single finish page)
+        self.paths = {}  # Paths a multi-target search has found so far, by finish page
+        self.method = method  # Search method ('breadth-first', 'bidirectional', 'a_star' or 'race')
+        self.heuristic = heuristic  # A* heuristic ('titles', 'content' or 'landmarks')
+        self.finish_keywords = None  # Keywords of the finish page, used by the A* heuristics
+        self.logs = logs  # Log channel (logstream.LogChannel) the search writes to
+        self.budget = budget  # Limits (SearchBudget) the search stops at, or None
+        self.exhausted = None  # Name of the budget limit that stopped the search, if one did
+        self.status = 'queued'  # 'queued', 'running', 'done', 'cancelled' or 'exhausted'
+        self.subscribers = 1  # Number of requests waiting for this search's result
+        self.pages_expanded = 0  # Number of pages whose links have been read
+        self.links_found = 0  # Number of links seen on those pages
+        self.frontier_size = 0  # Number of pages waiting to be expanded
+        self.visited_size = 0  # Number of pages discovered
+        self.created_at = time.time()  # When the search was submitted
+        self.started_at = None  # When a worker picked the search up
+        self.finished_at = None  # When the search finished
+        self.timings = {}  # Name of a step (fetch, parse, heuristic...) to [number of times, total seconds]
+        self.parent = None  # Context of the race this search is one strategy of, or None
+        self.strategies = {}  # Contexts of the strategies of a race, by strategy name
+        self.race = None  # Winner and per-strategy costs of a finished race
+        self._cancel_event = Event()
+        self._lock = Lock()
+
+    # Method that asks the search to stop at its next check
+    def cancel(self):
+        self._cancel_event.set()
+
+    # Property that tells whether the search has to stop: it has been cancelled, or it has reached a limit of its budget
+    # The searches check it before every expansion and get_links before every fetch, so a budget is enforced cooperatively
+    # The strategies of a race also stop when the race does (cancelled, out of budget, or won by another strategy)
+    @property
+    def cancelled(self):
+        if self._cancel_event.is_set():
+            return True
+        if self.parent is not None and self.parent.cancelled:
+            self._cancel_event.set()
+            return True
+        if self.budget is not None:
+            reason = self.budget.exceeded(self)
+            if reason is not None:
+                self.exhausted = reason
+                self._cancel_event.set()
+                return True
+        return False
+
+    # Property that tells whether the search has been told to stop, without checking its budget again
+    @property
+    def stopped(self):
+        return self._cancel_event.is_set()
+
+    # Method that returns the time (a time.time() value) by which the search has to end, or None if it has no deadline
+    # The deadline counts from when a worker picked the search up, so time spent in the queue is not charged to it
+    def deadline_at(self):
+        if self.budget is None or self.budget.deadline is None:
+            return None
+        return (self.started_at or self.created_at) + self.budget.deadline
+
+    # Method that describes why the search stopped early, for its log
+    def stop_message(self):
+        if self.exhausted:
+            return f"stopped: its {self.exhausted} budget of {getattr(self.budget, self.exhausted)} was exhausted"
+        return "aborted by user request"
+
+    # Method that returns the structured report of an exhausted budget (None if the budget did not stop the search)
+    def budget_report(self):
+        if not self.exhausted:
+            return None
+        progress = self.progress()
+        return {
+            'reason': self.exhausted,
+            'limit': getattr(self.budget, self.exhausted),
+            'budget': self.budget.to_dict(),
+            'pages_expanded': progress['pages_expanded'],
+            'frontier_size': progress['frontier_size'],
+            'visited_size': self.visited_size,
+            'links_found': progress['links_found'],
+            'elapsed': progress['elapsed'],
+        }
+
+    # Method that counts one expanded page and the links found on it (called from the fetch threads)
+    # A race strategy's pages count toward the race too, so the race's budget covers all of its strategies
+    def count_page(self, links):
+        with self._lock:
+            self.pages_expanded += 1
+            self.links_found += links
+        if self.parent is not None:
+            self.parent.count_page(links)
+        elif metrics.ENABLED:
+            PAGES_EXPANDED.inc()
+
+    # Method that adds the duration of one step of the search to its timings (called from the fetch threads)
+    def add_time(self, name, seconds):
+        with self._lock:
+            timing = self.timings.setdefault(name, [0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+        if self.parent is not None:
+            self.parent.add_time(name, seconds)
+
+    # Method that creates the context of one strategy of a race, registered under "<search ID>/<strategy>" so get_links finds it
+    # The strategy shares the race's log channel, budget, deadline and finish page keywords
+    def strategy(self, name, method=None):
+        context = SearchContext(f"{self.search_id}/{name}", self.start_page, self.finish_page, method or name, self.heuristic,
+                                logs=self.logs, budget=self.budget)
+        context.parent = self
+        context.finish_keywords = self.finish_keywords
+        context.status = 'running'
+        context.created_at = self.created_at
+        context.started_at = self.started_at or time.time()
+        self.strategies[name] = context
+        search_contexts[context.search_id] = context
+        return context
+
+    # Method that marks a race strategy as finished and unregisters it
+    def finish_strategy(self):
+        search_contexts.pop(self.search_id, None)
+        self.status = 'exhausted' if self.exhausted else 'cancelled' if self.stopped else 'done'
+        self.finished_at = time.time()
+
+    # Method that returns the search's metrics for its result record
+    def metrics(self):
+        progress = self.progress()
+        with self._lock:
+            timings = {name: {'count': count, 'seconds': seconds} for name, (count, seconds) in self.timings.items()}
+        return {
+            'queue_wait_seconds': self.started_at - self.created_at if self.started_at else None,
+            'run_seconds': progress['elapsed'],
+            'pages_expanded': progress['pages_expanded'],
+            'links_found': progress['links_found'],
+            'pages_per_second': progress['fetch_rate'],
+            'timings': timings,
+        }
+
+    # Method that returns a snapshot of the search's progress
+    def progress(self):
+        elapsed = (self.finished_at or time.time()) - self.started_at if self.started_at else 0
+        return {
+            'status': self.status,
+            'pages_expanded': self.pages_expanded,
+            'frontier_size': self.frontier_size,
+            'links_found': self.links_found,
+            'elapsed': elapsed,
+            'fetch_rate': self.pages_expanded / elapsed if elapsed else 0,  # Pages expanded per second
+        }
+
+
+# Define a function named get_context that returns the context of a search, or a fresh one for searches run outside the scheduler
+def get_context(search_id):
+    context = search_contexts.get(search_id)
+    return context if context is not None else SearchContext(search_id)
+
+
+# Define an exception named SchedulerFull that is raised when the admission queue has no room for another search
+class SchedulerFull(Exception):
+    pass
+
+
+# Define a class named SearchScheduler that runs searches on a fixed number of worker threads behind a bounded admission queue
+class SearchScheduler:
+    # Constructor method that takes the function running one search (given its context), the worker count and the queue size
+    def __init__(self, run, workers=4, max_queued=16):
+        self.workers = workers  # Number of searches that run at the same time
+        self.max_queued = max_queued  # Number of searches that may wait for a worker
+        self._run = run
+        self._queue = deque()
+        self._running = 0
+        self._condition = Condition()
+        for index in range(workers):
+            Thread(target=self._work, name=f"search-worker-{index}", daemon=True).start()
+
+    # Method that queues a search and returns its queue position (1 is next), raising SchedulerFull when the queue is full
+    def submit(self, context):
+        with self._condition:
+            if len(self._queue) >= self.max_queued:
+                raise SchedulerFull(f"{len(self._queue)} searches are already waiting")
+            self._queue.append(context)
+            search_contexts[context.search_id] = context
+            self._condition.notify()
+            return len(self._queue)
+
+    # Method that returns the queue position of a search: 1 or more while it waits, 0 while it runs, None once it is gone
+    def position(self, search_id):
+        with self._condition:
+            context = search_contexts.get(search_id)
+            if context is None:
+                return None
+            if context.status == 'running':
+                return 0
+            return self._queue.index(context) + 1
+
+    # Method that cancels a search; a waiting search is taken off the queue, a running one stops at its next check
+    # It returns the context of the search, or None if the search is not queued or running
+    def cancel(self, search_id):
+        with self._condition:
+            context = search_contexts.get(search_id)
+            if context is None:
+                return None
+            context.cancel()
+            if context.status == 'queued':
+                self._queue.remove(context)
+                del search_contexts[search_id]
+                context.status = 'cancelled'
+                context.finished_at = time.time()
+            return context
+
+    # Method that returns the number of running and waiting searches
+    def stats(self):
+        with self._condition:
+            return {'workers': self.workers, 'running': self._running, 'queued': len(self._queue), 'max_queued': self.max_queued}
+
+    # Method run by each worker thread: take the next search off the queue and run it
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+                context = self._queue.popleft()
+                context.status = 'running'
+                context.started_at = time.time()
+                self._running += 1
+            if metrics.ENABLED:
+                QUEUE_WAIT_SECONDS.observe(context.started_at - context.created_at)
+            try:
+                self._run(context)
+            except Exception as e:
+                # The run function records its own errors; anything escaping it must not take the worker down
+                print(f"Search {context.search_id} failed in the scheduler: {type(e).__name__}: {e}")
+            finally:
+                with self._condition:
+                    self._running -= 1
+                    search_contexts.pop(context.search_id, None)
+                    context.status = 'exhausted' if context.exhausted else 'cancelled' if context.stopped else 'done'
+                    context.finished_at = time.time()
+                if metrics.ENABLED:
+                    SEARCH_SECONDS.observe(context.finished_at - context.started_at, method=context.method, status=context.status)
+                    if context.exhausted:
+                        BUDGETS_EXHAUSTED.inc(limit=context.exhausted)
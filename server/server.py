@@ -1,90 +1,184 @@
 import os  # Importing os for operating system related functionality
 import ssl  # Importing ssl for SSL support
-import nltk  # Importing nltk for natural language processing tasks
 import time  # Importing time for time-related functions
 import uuid  # Importing uuid for generating unique identifiers
 from flask import Flask, request, jsonify, send_from_directory, Response  # Importing Flask modules for web server functionality
 from flask_limiter import Limiter  # Importing Limiter for rate limiting in Flask
 from flask_limiter.util import get_remote_address  # Importing get_remote_address for IP address handling in Flask
-from threading import Thread, Lock  # Importing Thread and Lock for thread-related operations
-from queue import Queue  # Importing Queue for implementing a FIFO queue
-from crawler import abort_search_event, breadth_first_search, bidirectional_search, a_star  # Importing search algorithms from crawler module
+import json  # Importing json for encoding streamed results
+from threading import Lock, Thread  # Importing Lock and Thread for thread-related operations
+from crawler import breadth_first_search, bidirectional_search, a_star, multi_target_search, race_search  # Importing search algorithms from crawler module
 import logging  # Importing logging for logging functionality
-from threading import Thread, Event, Timer  # Importing Thread, Event, and Timer for thread-related operations
 from crawler import precompute_finish_page_keywords  # Importing function for precomputing finish page keywords from crawler module
+from crawler import configure_parse_pool  # Importing function for setting up the parse worker processes
+from linkgraph import LinkGraph  # Importing LinkGraph for searching an offline link graph
+from landmarks import Landmarks, LANDMARKS_DIRECTORY  # Importing Landmarks for the A* landmark heuristic
+from scheduler import SearchContext, SearchBudget, SearchScheduler, SchedulerFull, search_contexts  # Importing the search scheduler, per-search contexts and budgets
+from resultcache import ResultCache, result_key  # Importing the persistent cache of solved searches
+from logstream import LogChannels, parse_level, INFO  # Importing the per-search log channels
+import crawler  # Importing crawler for its server-wide log channel
+import keywords  # Importing keywords for checking that the NLTK data of the A* keyword heuristics is there
+import metrics  # Importing metrics for the /metrics endpoint
+from warmer import CacheWarmer  # Importing CacheWarmer for prefetching the links around popular pages
+from statestore import open_state_store  # Importing open_state_store for the search state shared between worker processes
 
 
-# Define a class named StoppableThread, inheriting from Thread
-class StoppableThread(Thread):
-    # Constructor method to initialize the thread
-    def __init__(self, timeout=None, *args, **kwargs):
-        # Remove the custom 'timeout' argument before calling the superclass constructor
-        self._timeout = timeout
-        kwargs.pop('timeout', None)  # Remove timeout from kwargs if it exists to prevent TypeError
-        super().__init__(*args, **kwargs)  # Call superclass constructor with remaining args and kwargs
-        self._stop_event = Event()  # Initialize stop event to synchronize thread termination
-        self._start_time = None  # Initialize start time of the thread
-
-    # Method representing the thread's execution
-    def run(self):
-        # If timeout is specified, set up a timer to stop the thread after the timeout period
-        if self._timeout:
-            timer = Timer(self._timeout, self.stop)  # Setup a timer that will stop the thread after the timeout period
-            timer.start()  # Start the timer
-        try:
-            super().run()  # Call superclass run method to execute the thread's work
-        finally:
-            # If timeout is specified and the work completes before the timeout, cancel the timer
-            if self._timeout:
-                timer.cancel()  # Cancel the timer if the work completes before the timeout
-
-    # Method to stop the thread's execution
-    def stop(self):
-        self._stop_event.set()  # Set the stop event to signal the thread to stop execution
-
-    # Method to check if the thread has stopped
-    def stopped(self):
-        return self._stop_event.is_set()  # Check if the stop event is set, indicating thread termination
-
 # Configure the logging level for the application to INFO
 logging.basicConfig(level=logging.INFO)
 
-
-# Add a global dictionary to keep track of search states
-search_states = {}
-search_completed = {}
-
 # Set PYTHONHTTPSVERIFY environment variable to disable SSL certificate verification
 os.environ['PYTHONHTTPSVERIFY'] = '0'
 
-# Set NLTK_DATA environment variable
-nltk_data_path = "/Users/tony/nltk_data"
-os.environ["NLTK_DATA"] = nltk_data_path
-nltk.data.path.append(nltk_data_path)
-
 # Disable SSL certificate verification
 ssl._create_default_https_context = ssl._create_unverified_context
 
-# Download NLTK data
-nltk.download('punkt')
-nltk.download('stopwords')
-
 # Set the rate limit for requests
 RATE_LIMIT = "10/minute"
 
+# Directory of an offline link graph built with linkgraph.py; when set, searches run without network access
+LINK_GRAPH_PATH = os.environ.get('WIKI_LINK_GRAPH')
+link_graph = LinkGraph(LINK_GRAPH_PATH) if LINK_GRAPH_PATH else None
+
+# Graph directory whose precomputed landmarks (python landmarks.py build graph/) serve the 'landmarks' A* heuristic
+# It defaults to the offline link graph; a graph built from a dump can also guide searches that crawl Wikipedia
+LANDMARKS_PATH = os.environ.get('WIKI_LANDMARKS', LINK_GRAPH_PATH)
+landmarks = None
+if LANDMARKS_PATH and os.path.exists(os.path.join(LANDMARKS_PATH, LANDMARKS_DIRECTORY)):
+    landmarks = Landmarks(link_graph if LANDMARKS_PATH == LINK_GRAPH_PATH else LinkGraph(LANDMARKS_PATH))
+
+# Number of most promising neighbors per A* expansion rescored by page content when the content heuristic is chosen
+A_STAR_REFINE_TOP_K = 5
+
+# Search methods the 'race' method runs at the same time, the first path found by any of them being the result
+RACE_STRATEGIES = os.environ.get('WIKI_RACE_STRATEGIES', 'bidirectional,breadth-first,a_star').split(',')
+
+# Heuristics an A* search can be asked for
+A_STAR_HEURISTICS = ('titles', 'content', 'landmarks')
+
+# Largest number of finish pages one /find_paths request may ask for
+MAX_BATCH_TARGETS = 100
+
+# Number of worker processes for HTML parsing and keyword extraction (0 parses on the request threads)
+PARSE_PROCESSES = int(os.environ.get('WIKI_PARSE_PROCESSES', 0))
+configure_parse_pool(PARSE_PROCESSES)
+
+# Number of pages fetched in parallel by the breadth-first and bidirectional searches (the offline graph needs no parallelism)
+SEARCH_CONCURRENCY = int(os.environ.get('WIKI_SEARCH_CONCURRENCY', 8)) if link_graph is None else None
+
+# Number of searches run at the same time, and number of searches that may wait for one of them before requests are turned away
+SEARCH_WORKERS = int(os.environ.get('WIKI_SEARCH_WORKERS', 4))
+SEARCH_QUEUE_SIZE = int(os.environ.get('WIKI_SEARCH_QUEUE_SIZE', 16))
+
+# Budget of every search: seconds it may run, pages it may expand, and pages it may hold in its frontier and visited set
+# Requests may ask for a tighter budget, never a looser one; 0 means no limit
+SEARCH_DEADLINE = float(os.environ.get('WIKI_SEARCH_DEADLINE', 300))
+SEARCH_MAX_PAGES = int(os.environ.get('WIKI_SEARCH_MAX_PAGES', 20000))
+SEARCH_MAX_FRONTIER = int(os.environ.get('WIKI_SEARCH_MAX_FRONTIER', 2000000))
+SEARCH_MAX_VISITED = int(os.environ.get('WIKI_SEARCH_MAX_VISITED', 5000000))
+search_budget = SearchBudget(SEARCH_DEADLINE or None, SEARCH_MAX_PAGES or None, SEARCH_MAX_FRONTIER or None, SEARCH_MAX_VISITED or None)
+
+# Persistent cache of found paths by (start, finish, method), so repeated requests are answered without crawling
+RESULT_CACHE_TTL = int(os.environ.get('WIKI_RESULT_CACHE_TTL', 86400))  # Seconds before a cached path is searched for again
+RESULT_CACHE_MAX_ENTRIES = 10000  # Number of paths kept before the least recently used ones are evicted
+result_cache = ResultCache('result_cache.sqlite', ttl=RESULT_CACHE_TTL, max_entries=RESULT_CACHE_MAX_ENTRIES)
+
+# Number of finished searches whose results are kept in memory for /get_results
+MAX_STORED_RESULTS = 1000
+
+# Store of the search records (status, results, progress, logs and cancel requests) and of the rate-limit counters
+# 'memory://' keeps them in this process; 'sqlite:///state.sqlite' shares them between the worker processes of one host, and
+# 'redis://host:6379/0' between hosts, so any worker can answer /get_results, /results, /logs and /abort_search for any search
+STATE_STORE_URI = os.environ.get('WIKI_STATE_STORE', 'memory://')
+STATE_TTL = int(os.environ.get('WIKI_STATE_TTL', 3600))  # Seconds a shared search record is kept after its last update
+state_store = open_state_store(STATE_STORE_URI, max_searches=MAX_STORED_RESULTS, ttl=STATE_TTL)
+
 # Initialize the Flask application
 app = Flask(__name__, static_folder='../client')
 
-# Set the rate limit storage explicitly for Flask-Limiter
-storage_uri = "memory://"
+# Set the rate limit storage explicitly for Flask-Limiter: this process's memory, or the shared state store
+storage_uri = "statestore://" if state_store.shared else "memory://"
 
 # Initialize Flask-Limiter with explicit storage URI
-limiter = Limiter(app=app, key_func=get_remote_address, storage_uri=storage_uri)
-
-# Initialize a queue and lock for managing logs and search results
-logs_queue = Queue()  # Thread-safe queue for logs
-search_results = {}
-search_results_lock = Lock()  # Lock for thread-safe access to search_results
+limiter = Limiter(app=app, key_func=get_remote_address, storage_uri=storage_uri,
+                  storage_options={'store': state_store} if state_store.shared else {})
+
+# Verbosity of the log messages kept for each search when nobody is listening ('debug', 'info' or 'error')
+LOG_LEVEL = parse_level(os.environ.get('WIKI_LOG_LEVEL'), INFO)
+
+# Number of log messages kept per search; older ones are dropped when a subscriber falls behind
+LOG_CHANNEL_CAPACITY = 1000
+
+# Seconds between keep-alive comments on an idle log stream
+LOG_KEEPALIVE = 15
+
+# Seconds between two reads of a log kept in a shared state store
+LOG_POLL_INTERVAL = 0.25
+
+# Seconds between progress snapshots on a result stream, and the longest wait a /get_results long-poll may ask for
+PROGRESS_INTERVAL = 0.5
+MAX_RESULT_WAIT = 60
+
+# Initialize the per-search log channels of the searches run by this process
+log_channels = LogChannels(max_channels=MAX_STORED_RESULTS, capacity=LOG_CHANNEL_CAPACITY, level=LOG_LEVEL)
+
+# Searches that are queued or running by result key, so identical requests attach to them instead of starting another crawl
+inflight_searches = {}
+inflight_lock = Lock()  # Lock for thread-safe access to inflight_searches and the subscriber counts
+
+
+# Define a function named store_results that records the results of a finished search in the state store
+# The store wakes the result streams and long-polls waiting for it, and forgets the oldest searches beyond its bound
+def store_results(search_id, results):
+    state_store.finish_search(search_id, results)
+    # The pages on found paths are the hubs the cache warmer keeps fetched
+    if warmer is not None:
+        for path in [results.get('path')] + list((results.get('paths') or {}).values()):
+            if path:
+                warmer.record_path(path)
+
+
+# Define a function named results_body that returns the JSON body describing a finished search
+def results_body(results):
+    return {
+        'path': results['path'],
+        'time': results['time'],
+        'discovered': results['discovered'],
+        'completed': results['completed'],
+        'error': results['error'],
+        'search_method': results['search_method'],
+        'path_length': results['path_length'],
+        'pages_expanded': results['pages_expanded'],
+        'budget_exhausted': results.get('budget_exhausted'),
+        'paths': results.get('paths'),
+        'race': results.get('race'),
+        'cached': results['cached'],
+        'metrics': results.get('metrics'),
+    }
+
+
+# Define a function named progress_body that returns the JSON body describing a search that has not finished
+# Searches run by another worker process are described by the last progress snapshot that process published to the shared state store
+def progress_body(search_id):
+    context = search_contexts.get(search_id)
+    if context is None:
+        body = (state_store.progress(search_id) if state_store.shared else None) or {}
+        body.setdefault('message', 'Search is still in progress')
+        body.setdefault('queue_position', None)
+        return body
+    body = context.progress()
+    if context.finish_pages is not None:
+        body['paths'] = dict(context.paths)
+    if context.strategies:
+        body['strategies'] = {name: strategy.progress() for name, strategy in context.strategies.items()}
+    body.update({'message': 'Search is still in progress', 'queue_position': scheduler.position(search_id)})
+    return body
+
+
+# Define a function named finish_inflight that stops identical requests from attaching to a search that is over
+def finish_inflight(key, context):
+    with inflight_lock:
+        if inflight_searches.get(key) is context:
+            del inflight_searches[key]
 
 # Decorator specifying that this function handles GET requests to the root URL ('/')
 @app.route('/', methods=['GET'])
@@ -94,17 +188,30 @@ def home():
 
 
 
-# Define a function named search_and_log that takes start and finish page URLs, search method, and search ID as input
-def search_and_log(start_page, finish_page, search_method, search_id):
-    # Access global variables
-    global search_completed, search_states
+# Define a function named runs_a_star that tells whether a search method runs A*, alone or as one strategy of a race
+def runs_a_star(search_method):
+    return search_method == 'a_star' or (search_method == 'race' and 'a_star' in RACE_STRATEGIES)
 
-    # Set initial search state to incomplete
-    search_states[search_id] = {'completed': False}
-    
-    # Precompute and cache the finish page keywords if A* search is selected
-    if search_method == 'a_star':
-        precompute_finish_page_keywords(finish_page)
+
+# Define a function named search_key that returns the result cache key of a search
+# The heuristic is part of the key whenever A* runs, so races with different heuristics neither share results nor coalesce
+def search_key(start_page, finish_page, search_method, heuristic_choice):
+    return result_key(start_page, finish_page, search_method, heuristic_choice if runs_a_star(search_method) else None)
+
+
+# Define a function named search_and_log that takes start and finish page URLs, search method, search ID and the search's context as input
+def search_and_log(start_page, finish_page, search_method, search_id, heuristic_choice='titles', context=None):
+    # Searches run outside the scheduler get a context of their own, and every search logs to its own channel
+    context = context or SearchContext(search_id, start_page, finish_page, search_method, heuristic_choice, budget=search_budget)
+    logs = context.logs if context.logs is not None else log_channels.create(search_id)
+
+    # Canonicalize the page URLs so they match the links returned by the link cache and the offline link graph
+    start_page = crawler.canonical_page(start_page)
+    finish_page = crawler.canonical_page(finish_page)
+    key = search_key(start_page, finish_page, search_method, heuristic_choice)
+
+    # The content heuristic rescores the most promising neighbors of each A* expansion by their page content
+    refine_top_k = A_STAR_REFINE_TOP_K if heuristic_choice == 'content' else 0
 
     # Print a confirmation message with search ID
     print(f"Search and log called with search_id: {search_id}")
@@ -116,33 +223,56 @@ def search_and_log(start_page, finish_page, search_method, search_id):
     error_message = None
     start_time = time.time()
 
-    # Initialize the search as incomplete
-    search_completed[search_id] = False
+    # Initialize the search as incomplete (searches queued on the scheduler already are)
+    if state_store.status(search_id) is None:
+        state_store.start_search(search_id)
     try:
-        abort_search_event.clear()
+        # Precompute and cache the finish page keywords if A* search is selected
+        # The offline graph has no page text, so A* falls back to a zero heuristic there unless landmarks are chosen
+        # A race runs A* among its strategies, so it needs the heuristic too; its A* computes the finish page keywords itself,
+        # so failing to get them takes only A* out of the race
+        uses_a_star = runs_a_star(search_method)
+        heuristic = None
+        if uses_a_star and heuristic_choice == 'landmarks' and landmarks is not None:
+            heuristic = landmarks.heuristic(finish_page)
+        elif uses_a_star and link_graph is not None:
+            heuristic = lambda page: 0
+        elif search_method == 'a_star':
+            precompute_finish_page_keywords(finish_page, context)
+
+        # Define a function named run_method that runs one search method under a context (the search's own, or a race strategy's)
+        def run_method(method, method_context):
+            if method == 'bidirectional':
+                return bidirectional_search(start_page, finish_page, logs, method_context.search_id, link_source=link_graph, max_workers=SEARCH_CONCURRENCY, context=method_context)
+            if method == 'breadth-first':
+                return breadth_first_search(start_page, finish_page, logs, method_context.search_id, link_source=link_graph, max_workers=SEARCH_CONCURRENCY, context=method_context)
+            if method == 'a_star':
+                return a_star(start_page, finish_page, logs, method_context.search_id, link_source=link_graph, heuristic=heuristic, refine_top_k=refine_top_k, context=method_context)
+            raise ValueError(f"Unknown search method: {method}")
+
         # Execute the search based on the selected search method
         print(search_method)
-        if search_method == 'bidirectional':
-            path, time_elapsed, discovered, search_method, total_links = bidirectional_search(start_page, finish_page, logs_queue, search_id)
-        if search_method == 'breadth-first':
-            path, time_elapsed, discovered, search_method, total_links = breadth_first_search(start_page, finish_page, logs_queue, search_id)
-        elif search_method == 'a_star':
-            path, time_elapsed, discovered, search_method, total_links = a_star(start_page, finish_page, logs_queue, search_id)
+        if search_method == 'race':
+            strategies = {method: (lambda strategy_context, method=method: run_method(method, strategy_context)) for method in RACE_STRATEGIES}
+            path, time_elapsed, discovered, search_method, total_links = race_search(start_page, finish_page, logs, search_id, strategies, context=context)
+        else:
+            path, time_elapsed, discovered, search_method, total_links = run_method(search_method, context)
             
         print(f"Search {search_id} completed. Path found: {path}")
         
 
-        # If a path is found, set the search state to completed
+        # Log whether a path was found
         if path:
-            search_states[search_id]['completed'] = True
-            logs_queue.put(f"Search {search_id} completed. Path found: {path}")
+            logs.put(f"Search {search_id} completed. Path found: {path}")
+        elif context.exhausted:
+            logs.put(f"Search {search_id} {context.stop_message()} after {context.pages_expanded} pages.")
         else:
-            logs_queue.put(f"Search {search_id} concluded without finding a path.")
+            logs.put(f"Search {search_id} concluded without finding a path.")
 
     except Exception as e:
         # Handle any exceptions and log the error message
         error_message = f"{type(e).__name__}: {str(e)}"
-        logs_queue.put(f"Search {search_id} error: {error_message}")
+        logs.put(f"Search {search_id} error: {error_message}")
         print(f"Search {search_id} failed with error: {error_message}")
         time_elapsed = time.time() - start_time
 
@@ -153,37 +283,147 @@ def search_and_log(start_page, finish_page, search_method, search_id):
         search_time = time.time() - start_time
         path_length = len(path) if path else 0
 
-        # Update search_results dictionary with search information
-        with search_results_lock:
-            search_results[search_id] = {
-                'path': path,
-                'time': search_time,
-                'discovered': discovered,
-                'total_links': total_links,
-                'completed': path is not None,
-                'error': error_message,
-                'search_method': search_method,
-                'path_length': path_length,
-            }
-            print(f"Stored results for {search_id}: {search_results[search_id]}")
-        print("abc")
-        # Mark the search as completed
-        search_completed[search_id] = True
+        # Store the search's results in the state store and mark the search as completed
+        results = {
+            'path': path,
+            'time': search_time,
+            'discovered': discovered,
+            'total_links': total_links,
+            'completed': path is not None,
+            'error': error_message,
+            'search_method': search_method,
+            'path_length': path_length,
+            'pages_expanded': context.pages_expanded,
+            'budget_exhausted': context.budget_report(),
+            'race': context.race,
+            'cached': False,
+            'metrics': context.metrics() if metrics.ENABLED else None,
+        }
+        store_results(search_id, results)
+        print(f"Stored results for {search_id}: {results}")
+
+        # Keep found paths for repeated requests, then let new identical requests start a search of their own
+        if path and not context.stopped:
+            result_cache.put(key, results)
+        finish_inflight(key, context)
 
         # Log completion or error message
         if error_message:
             error_completion_message = f"Search {search_id} error: {error_message}"
             print(error_completion_message)
-            logs_queue.put(error_completion_message)
+            logs.put(error_completion_message)
         else:
             print(f"Search {search_id} completed successfully.")
 
-        # Sleep to ensure clean thread shutdown
-        time.sleep(1)
+        # No more messages will follow, so let the log subscribers finish
+        logs.close()
+
+
+# Define a function named cache_path that stores a breadth-first path in the result cache, so /find_path answers it without crawling
+def cache_path(start_page, finish_page, path, search_time, discovered, total_links, pages_expanded):
+    result_cache.put(result_key(start_page, finish_page, 'breadth-first'), {
+        'path': path,
+        'time': search_time,
+        'discovered': discovered,
+        'total_links': total_links,
+        'completed': True,
+        'error': None,
+        'search_method': 'breadth-first',
+        'path_length': len(path),
+        'pages_expanded': pages_expanded,
+        'budget_exhausted': None,
+        'cached': False,
+        'metrics': None,
+    })
+
+
+# Define a function named search_many_and_log that runs a multi-target search for a /find_paths request and stores its results
+# Paths already in the result cache are taken from it; every path found is stored there as it is reached
+def search_many_and_log(context):
+    search_id = context.search_id
+    logs = context.logs if context.logs is not None else log_channels.create(search_id)
+    start_page = context.start_page
+    start_time = time.time()
+    discovered = 0
+    total_links = 0
+    error_message = None
+
+    # Define a function named on_path that publishes a path the moment the traversal reaches its finish page
+    def on_path(finish_page, path):
+        context.paths[finish_page] = path
+        cache_path(start_page, finish_page, path, time.time() - start_time, 0, 0, context.pages_expanded)
+
+    try:
+        # Only crawl for the finish pages whose paths are not cached
+        remaining = []
+        for finish_page in context.finish_pages:
+            cached = result_cache.get(result_key(start_page, finish_page, 'breadth-first'))
+            if cached is not None:
+                context.paths[finish_page] = cached['path']
+            else:
+                remaining.append(finish_page)
+        logs.put(f"Search {search_id}: {len(context.paths)} paths cached, searching for {len(remaining)} finish pages.")
+        if remaining:
+            _, _, discovered, _, total_links = multi_target_search(start_page, remaining, logs, search_id, link_source=link_graph,
+                                                                   max_workers=SEARCH_CONCURRENCY, context=context, on_path=on_path)
+    except Exception as e:
+        # Handle any exceptions and log the error message
+        error_message = f"{type(e).__name__}: {str(e)}"
+        logs.put(f"Search {search_id} error: {error_message}")
+    finally:
+        # Report every finish page, with None for the ones not reached
+        paths = {finish_page: context.paths.get(finish_page) for finish_page in context.finish_pages}
+        store_results(search_id, {
+            'path': None,
+            'paths': paths,
+            'time': time.time() - start_time,
+            'discovered': discovered,
+            'total_links': total_links,
+            'completed': all(path is not None for path in paths.values()),
+            'error': error_message,
+            'search_method': 'breadth-first',
+            'path_length': 0,
+            'pages_expanded': context.pages_expanded,
+            'budget_exhausted': context.budget_report(),
+            'cached': False,
+            'metrics': context.metrics() if metrics.ENABLED else None,
+        })
+        logs.put(f"Search {search_id} finished with {sum(1 for path in paths.values() if path)} of {len(paths)} paths found.")
+        logs.close()
+
+
+# Scheduler running the searches on a fixed pool of worker threads (multi-target searches are the ones with finish_pages)
+scheduler = SearchScheduler(lambda context: search_many_and_log(context) if context.finish_pages is not None else
+                            search_and_log(context.start_page, context.finish_page, context.method, context.search_id, context.heuristic, context),
+                            workers=SEARCH_WORKERS, max_queued=SEARCH_QUEUE_SIZE)
+
+# Background crawler prefetching the links of popular start and finish pages and of the hubs on found paths into the link cache
+# It fetches at most WIKI_WARMER_CONCURRENCY pages at a time and WIKI_WARMER_RATE pages per second, and waits while searches
+# are queued or every worker is busy; the offline link graph needs no warming
+# It is off unless WIKI_WARMER=1, since every process importing this module would start one; set it for one worker only
+WARMER_ENABLED = os.environ.get('WIKI_WARMER', '0') == '1' and link_graph is None
+WARMER_CONCURRENCY = int(os.environ.get('WIKI_WARMER_CONCURRENCY', 2))
+WARMER_RATE = float(os.environ.get('WIKI_WARMER_RATE', 2))
+WARMER_INTERVAL = float(os.environ.get('WIKI_WARMER_INTERVAL', 600))
+warmer = None
+
+
+# Define a function named searches_busy that tells whether interactive searches need the fetch capacity the warmer would use
+def searches_busy():
+    stats = scheduler.stats()
+    return stats['queued'] > 0 or stats['running'] >= stats['workers']
+
+
+if WARMER_ENABLED:
+    warmer = CacheWarmer(busy=searches_busy, concurrency=WARMER_CONCURRENCY, rate=WARMER_RATE, interval=WARMER_INTERVAL)
+    # Start from the searches of the result cache, so a restarted server warms what was popular before
+    warmer.load_recent(result_cache)
+    warmer.start()
 
 
 # Decorator specifying that this function handles POST requests to the '/find_path' endpoint
 @app.route('/find_path', methods=['POST'])
+@limiter.limit(RATE_LIMIT)  # Searches are the expensive requests, so each client may start only RATE_LIMIT of them
 def find_path():
     # Retrieve JSON data from the request
     data = request.get_json()
@@ -192,99 +432,367 @@ def find_path():
     start_page = data.get('start')
     finish_page = data.get('finish')
     search_method = data.get('method', 'breadth-first')  # Default to 'breadth-first' if method is not provided
-    timeout = 300  # Example: 300 seconds timeout
+    heuristic_choice = data.get('heuristic', 'titles')  # A* heuristic: 'titles' (link titles only), 'content' (also page content) or 'landmarks' (precomputed distances)
 
     # Check if start and finish pages are provided
     if not start_page or not finish_page:
         return jsonify({'message': 'Missing parameters'}), 400  # Return error message and status code 400 for missing parameters
 
+    # Tighten the server's search budget with the one asked for, if any (deadline, max_pages, max_frontier, max_visited)
+    try:
+        budget = search_budget.tighter(SearchBudget.from_dict(data.get('budget') or {}))
+    except (ValueError, TypeError, AttributeError) as e:
+        return jsonify({'message': f'Invalid budget: {e}'}), 400
+
+    # An A* search is cached under its heuristic, so the heuristic has to be one that can actually run rather than a silent fallback
+    uses_a_star = runs_a_star(search_method)
+    if uses_a_star and heuristic_choice not in A_STAR_HEURISTICS:
+        return jsonify({'message': f"Unknown heuristic: {heuristic_choice!r} (choose from {', '.join(A_STAR_HEURISTICS)})"}), 400
+    if uses_a_star and heuristic_choice == 'landmarks' and landmarks is None:
+        return jsonify({'message': 'The landmarks heuristic is unavailable: no landmarks are loaded (see WIKI_LANDMARKS)'}), 400
+
+    # The keyword heuristics of A* need the NLTK data (the offline graph and landmarks need none); without it the search could only fail
+    if search_method == 'a_star' and link_graph is None and heuristic_choice != 'landmarks':
+        try:
+            keywords.load_nltk()
+        except LookupError as e:
+            return jsonify({'message': f'A* with the {heuristic_choice} heuristic is unavailable: {e}'}), 503
+
+    # Canonicalize the page URLs (through known redirects) so identical requests share a result key
+    start_page = crawler.canonical_page(start_page)
+    finish_page = crawler.canonical_page(finish_page)
+    key = search_key(start_page, finish_page, search_method, heuristic_choice)
+    if warmer is not None:
+        warmer.record_query(start_page, [finish_page])
+
     # Generate a unique search ID using UUID
     search_id = str(uuid.uuid4())
 
-    # Create a StoppableThread for executing the search_and_log function with the provided parameters
-    search_thread = StoppableThread(target=search_and_log, args=(start_page, finish_page, search_method, search_id), timeout=300)
+    # Answer from the result cache when this path has been found before
+    lookup_start = time.time()
+    cached = result_cache.get(key)
+    if cached is not None:
+        store_results(search_id, dict(cached, time=time.time() - lookup_start, cached=True, metrics=None))
+        logs = log_channels.create(search_id)
+        logs.put(f"Search {search_id} answered from the result cache. Path found: {cached['path']}")
+        logs.close()
+        return jsonify({'message': 'Search completed', 'search_id': search_id, 'queue_position': None})
+
+    with inflight_lock:
+        # Attach to an identical search that is already queued or running
+        context = inflight_searches.get(key)
+        if context is not None and not context.stopped:
+            context.subscribers += 1
+            return jsonify({'message': 'Search started', 'search_id': context.search_id, 'queue_position': scheduler.position(context.search_id)})
+
+        # Queue the search on the scheduler, turning the request away when too many searches are already waiting
+        context = SearchContext(search_id, start_page, finish_page, search_method, heuristic_choice, logs=log_channels.create(search_id), budget=budget)
+        state_store.start_search(search_id)
+        try:
+            queue_position = scheduler.submit(context)
+        except SchedulerFull:
+            state_store.forget_search(search_id)
+            stats = scheduler.stats()
+            response = jsonify({'message': 'Server is busy, try again later', 'queue_position': stats['queued'] + 1, **stats})
+            return response, 503, {'Retry-After': '5'}
+        inflight_searches[key] = context
+
+    # Return a JSON response indicating that the search has been queued along with the search ID and its queue position
+    return jsonify({'message': 'Search started', 'search_id': search_id, 'queue_position': queue_position})
+
 
-    # Start the search thread
-    search_thread.start()
 
-    # Return a JSON response indicating that the search has started along with the search ID
-    return jsonify({'message': 'Search started', 'search_id': search_id})
+# Route to find paths from one start page to many finish pages with a single breadth-first traversal
+# The results (see /get_results and /results) carry 'paths', by canonical finish page URL; progress snapshots carry the paths found so far
+@app.route('/find_paths', methods=['POST'])
+@limiter.limit(RATE_LIMIT)  # Searches are the expensive requests, so each client may start only RATE_LIMIT of them
+def find_paths():
+    data = request.get_json(silent=True) or {}
+    start_page = data.get('start')
+    finish_pages = data.get('finishes')
+    if not start_page or not finish_pages or not isinstance(finish_pages, list):
+        return jsonify({'message': 'Missing parameters'}), 400
+    if len(finish_pages) > MAX_BATCH_TARGETS:
+        return jsonify({'message': f'At most {MAX_BATCH_TARGETS} finish pages per request'}), 400
+
+    # Tighten the server's search budget with the one asked for, if any
+    try:
+        budget = search_budget.tighter(SearchBudget.from_dict(data.get('budget') or {}))
+    except (ValueError, TypeError, AttributeError) as e:
+        return jsonify({'message': f'Invalid budget: {e}'}), 400
 
+    # Canonicalize the page URLs so the paths share result keys with /find_path
+    start_page = crawler.canonical_page(start_page)
+    finish_pages = list(dict.fromkeys(crawler.canonical_page(finish_page) for finish_page in finish_pages))
+    if warmer is not None:
+        warmer.record_query(start_page, finish_pages)
+
+    # Queue the search on the scheduler, turning the request away when too many searches are already waiting
+    search_id = str(uuid.uuid4())
+    context = SearchContext(search_id, start_page, None, 'breadth-first', logs=log_channels.create(search_id),
+                            budget=budget, finish_pages=finish_pages)
+    state_store.start_search(search_id)
+    try:
+        queue_position = scheduler.submit(context)
+    except SchedulerFull:
+        state_store.forget_search(search_id)
+        stats = scheduler.stats()
+        response = jsonify({'message': 'Server is busy, try again later', 'queue_position': stats['queued'] + 1, **stats})
+        return response, 503, {'Retry-After': '5'}
+    return jsonify({'message': 'Search started', 'search_id': search_id, 'queue_position': queue_position, 'finishes': finish_pages})
 
 
 # Decorator specifying that this function handles GET requests to the '/get_results/<search_id>' endpoint
+# With ?wait=<seconds> the request is held open until the search finishes or the wait runs out (long-polling)
 @app.route('/get_results/<search_id>', methods=['GET'])
 def get_results(search_id):
-    global search_completed  # Reference the global dictionary
-
-    # Debugging line to print search ID
-    print(f"Getting results for search ID: {search_id}")
-    # Check if the search has completed
-    if search_id in search_completed:
-        if search_completed[search_id]:
-            # If search is completed, retrieve and return the results
-            with search_results_lock:
-                # Debugging line to print available search results
-                print(f"Available search results: {list(search_results.keys())}")
-
-                # Get the results for the provided search ID
-                results = search_results.get(search_id)
-
-                # Check if results are available for the search ID
-                if results is not None:
-                    # Return the results as a JSON response with status code 200 (OK)
-                    return jsonify({
-                        'path': results['path'],
-                        'time': results['time'],
-                        'discovered': results['discovered'],
-                        'completed': results['completed'],
-                        'error': results['error'],
-                        'search_method': results['search_method'],
-                        'path_length': results['path_length'],
-                    }), 200
-                else:
-                    # Return a message indicating that the search completed but no results were found with status code 404 (Not Found)
-                    return jsonify({'message': 'Search completed but no results found'}), 404
-        else:
-            # Return a message indicating that the search is still in progress with status code 200 (OK)
-            return jsonify({'message': 'Search is still in progress'}), 200
-    else:
+    # Parse the wait like the budget parameters: anything but a non-negative number of seconds is a client error
+    try:
+        wait = float(request.args.get('wait', 0) or 0)
+    except ValueError:
+        return jsonify({'message': f"Invalid wait: {request.args.get('wait')!r} is not a number"}), 400
+    if not wait >= 0:
+        return jsonify({'message': f"Invalid wait: {request.args.get('wait')!r} is not a non-negative number"}), 400
+    wait = min(wait, MAX_RESULT_WAIT)
+
+    # Check if the search exists
+    status = state_store.status(search_id)
+    if status is None:
         # Return a message indicating that the provided search ID was not found with status code 404 (Not Found)
         return jsonify({'message': 'Search ID not found'}), 404
 
+    # Wait for the search to finish if asked to
+    if wait > 0 and status == 'pending':
+        status = state_store.wait(search_id, wait)
+    results = state_store.results(search_id) if status == 'done' else None
+
+    # Return the results as a JSON response with status code 200 (OK) if the search has completed
+    if results is not None:
+        return jsonify(results_body(results)), 200
+    # Return the search's progress (and queue position) with status code 200 (OK) otherwise
+    return jsonify(progress_body(search_id)), 200
+
+
+# Route to stream the progress of a search and then its results via Server-Sent Events
+# A 'progress' event is sent every PROGRESS_INTERVAL seconds while the search runs, and a 'result' event the moment it finishes
+@app.route('/results/<search_id>', methods=['GET'])
+def stream_results(search_id):
+    if state_store.status(search_id) is None:
+        return jsonify({'message': 'Search ID not found'}), 404
 
-# Route to stream logs via Server-Sent Events
-@app.route('/logs', methods=['GET'])
-def stream_logs():
     def generate():
         while True:
-            # Check if the logs queue is not empty
-            if not logs_queue.empty():
-                # Get the next log from the queue and yield it as a Server-Sent Event
-                log = logs_queue.get()
-                yield f"data: {log}\n\n"  # Yield the log in the required format for Server-Sent Events
-            time.sleep(1)  # Sleep for 1 second before checking the logs queue again
+            status = state_store.wait(search_id, PROGRESS_INTERVAL)
+            results = state_store.results(search_id) if status == 'done' else None
+            evicted = status is None
+            if results is not None:
+                yield f"event: result\ndata: {json.dumps(results_body(results))}\n\n"
+                return
+            if evicted:
+                yield f"event: result\ndata: {json.dumps({'message': 'Search ID not found'})}\n\n"
+                return
+            yield f"event: progress\ndata: {json.dumps(progress_body(search_id))}\n\n"
 
     # Return a Response object with the generator function and set the MIME type to text/event-stream
     return Response(generate(), mimetype='text/event-stream')
 
 
+# Route to stream the logs of one search (or, without a search ID, the server-wide logs) via Server-Sent Events
+# The optional 'level' query parameter ('debug', 'info' or 'error') sets the verbosity; reconnecting clients resume after Last-Event-ID
+@app.route('/logs', methods=['GET'])
+@app.route('/logs/<search_id>', methods=['GET'])
+def stream_logs(search_id=None):
+    search_id = search_id or request.args.get('search_id')
+    channel = log_channels.get(search_id) if search_id else crawler.logs_queue
+    level = parse_level(request.args.get('level'), INFO)
+    last_seen = request.headers.get('Last-Event-ID', '0')
+    after = int(last_seen) if last_seen.isdigit() else 0
+
+    # The log of a search run by another worker process is read from the shared state store
+    if channel is None and search_id and state_store.shared and state_store.read_logs(search_id, after, level) is not None:
+        return Response(shared_log_events(search_id, after, level), mimetype='text/event-stream')
+    if channel is None:
+        return jsonify({'message': 'Search ID not found'}), 404
+
+    def generate(after):
+        channel.subscribe(level)
+        try:
+            while True:
+                # Wait until there are new messages (no polling), sending a keep-alive comment when the stream is idle
+                entries, missed = channel.read(after, level, timeout=LOG_KEEPALIVE)
+                if missed:
+                    yield f"data: ({missed} older messages dropped)\n\n"
+                for seq, message in entries:
+                    yield f"id: {seq}\ndata: {message}\n\n"  # Yield the log in the required format for Server-Sent Events
+                    after = seq
+                if not entries:
+                    if channel.closed:
+                        # Tell the client the search is over so it does not reconnect
+                        yield "event: end\ndata: \n\n"
+                        return
+                    yield ": keep-alive\n\n"
+        finally:
+            channel.unsubscribe(level)
+
+    # Return a Response object with the generator function and set the MIME type to text/event-stream
+    return Response(generate(after), mimetype='text/event-stream')
+
+
+# Define a generator named shared_log_events that streams a search's log from the shared state store as Server-Sent Events
+# The store is polled every LOG_POLL_INTERVAL seconds; the log holds the messages the running process kept (see publish_state)
+def shared_log_events(search_id, after, level):
+    idle_since = time.monotonic()
+    while True:
+        log_state = state_store.read_logs(search_id, after, level)
+        if log_state is None:
+            yield "event: end\ndata: \n\n"
+            return
+        entries, closed = log_state
+        for seq, message in entries:
+            yield f"id: {seq}\ndata: {message}\n\n"
+            after = seq
+        if entries:
+            idle_since = time.monotonic()
+        elif closed:
+            # Tell the client the search is over so it does not reconnect
+            yield "event: end\ndata: \n\n"
+            return
+        elif time.monotonic() - idle_since > LOG_KEEPALIVE:
+            idle_since = time.monotonic()
+            yield ": keep-alive\n\n"
+        time.sleep(LOG_POLL_INTERVAL)
+
+
+# Define a function named cancel_search that aborts a search queued or running in this process
+# It returns False if this process has no such search
+def cancel_search(search_id):
+    # A search shared by identical requests keeps running until every one of them has aborted it
+    with inflight_lock:
+        context = search_contexts.get(search_id)
+        if context is not None and context.subscribers > 1:
+            context.subscribers -= 1
+            return True
+
+    # Cancel that search only; a running search stops at its next check
+    context = scheduler.cancel(search_id)
+    if context is None:
+        return False
+
+    # A search cancelled while it was still waiting never runs, so record its result here
+    if context.status == 'cancelled':
+        store_results(search_id, {
+            'path': None,
+            'time': 0,
+            'discovered': 0,
+            'total_links': 0,
+            'completed': False,
+            'error': 'Search aborted before it started',
+            'search_method': context.method,
+            'path_length': 0,
+            'pages_expanded': 0,
+            'budget_exhausted': None,
+            'cached': False,
+            'metrics': None,
+        })
+        if context.finish_pages is None:
+            finish_inflight(search_key(context.start_page, context.finish_page, context.method, context.heuristic), context)
+        context.logs.put(f"Search {search_id} aborted by user request.")
+        context.logs.close()
+    return True
+
+
 # Route to abort an ongoing search
 @app.route('/abort_search', methods=['POST'])
 def abort_search():
-    # Set the abort search event to signal the threads to stop searching
-    abort_search_event.set()
-    
-    # Clear the logs queue to remove any pending logs related to the aborted search
-    with logs_queue.mutex:
-        logs_queue.queue.clear()
-    
-    # Clear the abort search event flag
-    abort_search_event.clear()
-    
+    # Read the ID of the search to abort
+    data = request.get_json(silent=True) or {}
+    search_id = data.get('search_id')
+    if not search_id:
+        return jsonify({'message': 'Missing parameters'}), 400
+
+    # Cancel the search here, or ask the worker process running it to (it picks the request up within PROGRESS_INTERVAL)
+    if not cancel_search(search_id):
+        if not (state_store.shared and state_store.status(search_id) == 'pending'):
+            return jsonify({'message': 'Search ID not found or already finished'}), 404
+        state_store.request_cancel(search_id)
+
     # Return a JSON response indicating that the search abort has been initiated
     return jsonify({'message': 'Search abort initiated'}), 200
 
+
+# Define a function named publish_state that copies the state of this process's searches to the shared state store, forever
+# Every PROGRESS_INTERVAL seconds it publishes the progress of the searches queued or running here, appends the new messages of
+# their logs (and closes the logs of finished ones), and carries out the cancel requests other processes left for them
+def publish_state():
+    published = {}  # Search id to the last log sequence number copied, for the channels not closed yet
+    while True:
+        time.sleep(PROGRESS_INTERVAL)
+        try:
+            contexts = [context for context in search_contexts.values() if context.parent is None]
+            for context in contexts:
+                state_store.put_progress(context.search_id, progress_body(context.search_id))
+            for search_id, channel in log_channels.items():
+                after = published.get(search_id, 0)
+                if after is None:
+                    continue
+                closed = channel.closed
+                entries = channel.since(after)
+                state_store.append_logs(search_id, entries)
+                published[search_id] = None if closed else (entries[-1][0] if entries else after)
+                if closed:
+                    state_store.close_logs(search_id)
+            # Forget the channels LogChannels has dropped
+            kept = {search_id for search_id, _ in log_channels.items()}
+            for search_id in [search_id for search_id in published if search_id not in kept]:
+                del published[search_id]
+            for search_id in state_store.take_cancel_requests(context.search_id for context in contexts):
+                cancel_search(search_id)
+        except Exception as e:
+            # A store that is briefly unreachable must not stop the publishing for good
+            print(f"Publishing the search state failed: {type(e).__name__}: {e}")
+
+
+# Only processes sharing their state publish it
+if state_store.shared:
+    Thread(target=publish_state, name='state-publisher', daemon=True).start()
+
+
+# Define a function named server_metrics that exports the scheduler and result cache state
+@metrics.collector
+def server_metrics():
+    stats, result_stats = scheduler.stats(), result_cache.stats()
+    return [
+        ('wiki_searches_running', 'gauge', 'Searches running now', [({}, stats['running'])]),
+        ('wiki_searches_queued', 'gauge', 'Searches waiting for a worker', [({}, stats['queued'])]),
+        ('wiki_result_cache_requests_total', 'counter', 'Lookups in the result cache by result',
+         [({'result': result}, result_stats[name]) for name, result in (('hits', 'hit'), ('misses', 'miss'), ('stale', 'stale'))]),
+    ] + ([] if warmer is None else [
+        ('wiki_warmer_coverage', 'gauge', 'Fraction of the pages planned by the current warming cycle that are in the link cache',
+         [({}, warmer.stats()['coverage'] or 0)]),
+        ('wiki_warmer_paused_seconds_total', 'counter', 'Seconds the warmer has waited for interactive searches',
+         [({}, warmer.stats()['paused_seconds'])]),
+    ])
+
+
+# Route exporting the metrics in the Prometheus text format
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+# Route reporting how many searches are running and waiting
+@app.route('/scheduler', methods=['GET'])
+def scheduler_stats():
+    return jsonify(scheduler.stats()), 200
+
+
+# Route reporting the progress of the cache warmer and how much of what it plans to warm is cached
+@app.route('/warmer', methods=['GET'])
+def warmer_stats():
+    if warmer is None:
+        return jsonify({'running': False}), 200
+    return jsonify(warmer.stats()), 200
+
 # Entry point of the application
 if __name__ == '__main__':
     # Run the Flask application with the specified host, port, debug mode, and threaded mode
@@ -28,3 +28,6 @@ source venv/bin/activate
 
 # Install the dependencies
 pip install -r requirements.txt
+
+# Download the NLTK data used by the A* content heuristic into the bundled nltk_data directory (the server never downloads it itself)
+python -m nltk.downloader -d ../nltk_data punkt punkt_tab stopwords averaged_perceptron_tagger averaged_perceptron_tagger_eng
@@ -0,0 +1,116 @@
+import zlib  # Importing zlib for a hash that is stable across processes
+from functools import lru_cache  # Importing lru_cache for memoizing term hashes
+import threading  # Importing threading for guarding the document frequencies
+from collections import namedtuple  # Importing namedtuple for term vectors
+import numpy as np  # Importing NumPy for batch scoring
+
+# Size of the hashed feature space
+N_FEATURES = 2 ** 18
+
+# Similarity measures the engine can compute
+METRICS = ('jaccard', 'cosine', 'tfidf')
+
+# Define a function named term_hash that returns a hash of a term that is stable across processes
+@lru_cache(maxsize=2 ** 20)
+def term_hash(term):
+    return zlib.crc32(term.encode('utf-8'))
+
+
+# Define a named tuple TermVector: sorted unique feature indices and their weights
+TermVector = namedtuple('TermVector', ['indices', 'weights'])
+
+# Define a named tuple Target: the dense form of the target page used for scoring
+Target = namedtuple('Target', ['weights', 'mask', 'term_count', 'total_weight'])
+
+
+# Define a class named KeywordEngine that turns keyword dictionaries into hashed sparse vectors and scores them in batches
+class KeywordEngine:
+    # Constructor method that takes the feature space size and the default metric
+    def __init__(self, n_features=N_FEATURES, metric='jaccard'):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown similarity metric: {metric}")
+        self.n_features = n_features  # Number of hashed features
+        self.metric = metric  # Default similarity measure
+        self.document_frequency = np.zeros(n_features, dtype=np.int32)  # Pages containing each feature, for TF-IDF
+        self.documents = 0  # Number of pages observed
+        self._lock = threading.Lock()
+
+    # Method that maps a term to its feature index
+    def feature(self, term):
+        return term_hash(term) % self.n_features
+
+    # Method that turns a {term: weight} dictionary (or an iterable of terms, each weighing 1) into a TermVector
+    def vectorize(self, keywords):
+        if not isinstance(keywords, dict):
+            keywords = dict.fromkeys(keywords, 1)
+        indices = np.fromiter(map(term_hash, keywords), dtype=np.int64, count=len(keywords)) % self.n_features
+        weights = np.fromiter(keywords.values(), dtype=np.float32, count=len(keywords))
+        order = np.argsort(indices)
+        indices, weights = indices[order], weights[order]
+        if not len(indices) or np.all(indices[1:] != indices[:-1]):
+            return TermVector(indices, weights)
+        # Merge the weights of terms that hash to the same feature
+        unique_indices, positions = np.unique(indices, return_inverse=True)
+        merged = np.zeros(len(unique_indices), dtype=np.float32)
+        np.add.at(merged, positions, weights)
+        return TermVector(unique_indices, merged)
+
+    # Method that records a page's terms in the document frequencies used by TF-IDF
+    def observe(self, vector):
+        with self._lock:
+            self.document_frequency[vector.indices] += 1
+            self.documents += 1
+
+    # Method that returns the inverse document frequency of each feature
+    def idf(self):
+        return np.log((1 + self.documents) / (1 + self.document_frequency)).astype(np.float32) + 1
+
+    # Method that builds the dense target used by score and coverage
+    def target(self, keywords):
+        vector = self.vectorize(keywords)
+        weights = np.zeros(self.n_features, dtype=np.float32)
+        weights[vector.indices] = vector.weights
+        mask = np.zeros(self.n_features, dtype=bool)
+        mask[vector.indices] = True
+        return Target(weights, mask, len(vector.indices), float(vector.weights.sum()))
+
+    # Method that concatenates a batch of vectors into flat arrays plus the batch position of each entry
+    def _flatten(self, vectors):
+        lengths = np.fromiter((len(vector.indices) for vector in vectors), dtype=np.int64, count=len(vectors))
+        if not lengths.sum():
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64), lengths
+        indices = np.concatenate([vector.indices for vector in vectors])
+        weights = np.concatenate([vector.weights for vector in vectors])
+        rows = np.repeat(np.arange(len(vectors)), lengths)
+        return indices, weights, rows, lengths
+
+    # Method that returns the similarity (between 0 and 1) of each vector in a batch to the target
+    def score(self, target, vectors, metric=None):
+        metric = metric or self.metric
+        if not vectors:
+            return np.zeros(0, dtype=np.float32)
+        indices, weights, rows, lengths = self._flatten(vectors)
+        batch = len(vectors)
+
+        # Jaccard similarity of the term sets: |A & B| / |A | B|
+        if metric == 'jaccard':
+            intersection = np.bincount(rows, weights=target.mask[indices], minlength=batch)
+            union = lengths + target.term_count - intersection
+            return np.divide(intersection, union, out=np.zeros(batch), where=union > 0)
+
+        # Cosine similarity of the weight vectors, optionally with both sides weighted by IDF
+        target_weights = target.weights
+        if metric == 'tfidf':
+            idf = self.idf()
+            weights = weights * idf[indices]
+            target_weights = target_weights * idf
+        dot = np.bincount(rows, weights=weights * target_weights[indices], minlength=batch)
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=batch)) * np.linalg.norm(target_weights)
+        return np.divide(dot, norms, out=np.zeros(batch), where=norms > 0)
+
+    # Method that returns, for each vector in a batch, the share of the target weight its terms cover
+    def coverage(self, target, vectors):
+        if not vectors or not target.total_weight:
+            return np.zeros(len(vectors))
+        indices, _, rows, _ = self._flatten(vectors)
+        return np.bincount(rows, weights=target.weights[indices], minlength=len(vectors)) / target.total_weight
@@ -0,0 +1,272 @@
+import os  # Importing os for reading saved pages from disk
+import time  # Importing time for simulated latency
+import json  # Importing json for MediaWiki API responses
+import hashlib  # Importing hashlib for ETags
+import random  # Importing random for generating synthetic link graphs
+import argparse  # Importing argparse for the command line interface
+import threading  # Importing threading for running the server in the background
+from html import escape  # Importing escape for rendering page titles
+from email.utils import formatdate  # Importing formatdate for Last-Modified headers
+from urllib.parse import urlsplit, unquote, parse_qs  # Importing URL helpers for routing requests
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler  # Importing the standard library HTTP server
+from titles import WIKI_ORIGIN, title_to_url, url_to_title  # Importing title helpers for writing article links
+from extract import extract_links  # Importing extract_links for deriving backlinks from the canned pages
+
+# Last-Modified value reported for every canned page
+LAST_MODIFIED = formatdate(0, usegmt=True)
+
+# Number of backlinks returned per API request, like the real API's bllimit=max for anonymous users
+BACKLINKS_PAGE_SIZE = 500
+
+
+# Words that synthetic titles are made of; pages about the same topic share the topic word
+SYNTHETIC_TOPICS = ['Physics', 'Music', 'History', 'Biology', 'Football', 'Painting', 'Chemistry', 'Cinema',
+                    'Geography', 'Literature', 'Computing', 'Cooking', 'Astronomy', 'Medicine', 'Railway', 'Opera']
+SYNTHETIC_WORDS = ['Theory', 'Society', 'School', 'River', 'Festival', 'Museum', 'Award', 'Journal', 'Method',
+                   'Institute', 'Prize', 'Movement', 'Station', 'Company', 'Season', 'Collection', 'Record', 'Era']
+
+
+# Define a function named render_article that returns Wikipedia-like HTML for a title and its outgoing links
+def render_article(title, links):
+    # Paragraph text and article links, the part of the page searches care about
+    paragraphs = ''.join(
+        f'<p>{escape(title)} is related to <a href="{title_to_url(link)[len(WIKI_ORIGIN):]}" '
+        f'title="{escape(link.replace("_", " "))}">{escape(link.replace("_", " "))}</a>.</p>\n'
+        for link in links)
+
+    # Surround the content with the navigation, sidebar and footer links every real article has
+    return (
+        '<!DOCTYPE html>\n<html><head><meta charset="UTF-8">'
+        f'<title>{escape(title)} - Wikipedia</title>'
+        f'<link rel="canonical" href="{title_to_url(title)}"></head><body>\n'
+        '<div id="mw-navigation"><a href="#bodyContent">Jump to content</a> <a href="/wiki/Main_Page">Main page</a> '
+        '<a href="/wiki/Special:Random">Random article</a> <a href="/wiki/Help:Contents">Help</a></div>\n'
+        f'<h1 id="firstHeading">{escape(title)}</h1>\n'
+        '<div id="bodyContent"><div id="mw-content-text" class="mw-body-content">'
+        f'<div class="mw-parser-output">\n{paragraphs}</div></div>\n'
+        '<div id="catlinks"><a href="/wiki/Category:Articles">Category: Articles</a></div></div>\n'
+        '<div id="footer"><a href="https://foundation.wikimedia.org/wiki/Privacy_policy">Privacy policy</a> '
+        '<a href="/wiki/Wikipedia:About">About Wikipedia</a></div>\n'
+        '</body></html>\n')
+
+
+# Define a class named StandinServer, a local stand-in for en.wikipedia.org serving canned pages
+class StandinServer:
+    # Constructor method that takes a dictionary of titles to HTML, and optionally one of redirect titles to their targets
+    def __init__(self, pages, host='127.0.0.1', port=0, latency=0.0, redirects=None):
+        self.pages = pages  # Canned HTML by article title
+        self.redirects = redirects or {}  # Redirect titles served with the page of their target, like the real site does
+        self.latency = latency  # Seconds added to every response
+        self.failures = {}  # Titles mapped to a number of failure answers to give before serving the page
+        self.failure_status = 503  # Status code of the failure answers, e.g. 429 to simulate rate limiting
+        self.retry_after = '0'  # Retry-After header sent with the failure answers
+        self.requests = 0  # Number of requests served
+        self.connections = 0  # Number of client connections accepted
+        self._backlinks = None  # Titles linking to each title, derived from the pages on first use
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    # Property with the base URL of the running server
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    # Method that starts serving in a background thread and returns the base URL
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    # Method that serves in the calling thread until interrupted
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    # Method that stops the server
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # Method that builds the request handler class bound to this server
+    def _handler_class(self):
+        standin = self
+
+        # Define a class named Handler answering article requests
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep connections alive like the real site
+
+            # Method that counts a new client connection
+            def setup(self):
+                super().setup()
+                with standin._lock:
+                    standin.connections += 1
+
+            # Method that answers GET requests
+            def do_GET(self):
+                with standin._lock:
+                    standin.requests += 1
+                if standin.latency:
+                    time.sleep(standin.latency)
+                standin.handle(self)
+
+            # Method that silences the default request logging
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    # Method that sends one response
+    def respond(self, handler, status, body=b'', headers=None):
+        handler.send_response(status)
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    # Method that returns the titles linking to each title
+    def backlinks(self):
+        with self._lock:
+            if self._backlinks is None:
+                self._backlinks = {}
+                for title, html in self.pages.items():
+                    links, _ = extract_links(html, title_to_url(title))
+                    for link in dict.fromkeys(links):
+                        self._backlinks.setdefault(url_to_title(link), []).append(title)
+            return self._backlinks
+
+    # Method that answers a prop=redirects query of the MediaWiki API (all redirects in one response)
+    # With redirects=1 a title that is itself a redirect is resolved first, and reported under query.redirects
+    def handle_redirects(self, handler, params):
+        title = params.get('titles', '').replace(' ', '_')
+        query = {}
+        if params.get('redirects') and title in self.redirects:
+            query['redirects'] = [{'from': title.replace('_', ' '), 'to': self.redirects[title].replace('_', ' ')}]
+            title = self.redirects[title]
+        redirects = [{'ns': 0, 'title': source.replace('_', ' ')} for source, target in self.redirects.items() if target == title]
+        query['pages'] = [{'ns': 0, 'title': title.replace('_', ' '), 'redirects': redirects}]
+        data = {'batchcomplete': True, 'query': query}
+        self.respond(handler, 200, json.dumps(data).encode('utf-8'), {'Content-Type': 'application/json'})
+
+    # Method that answers a list=backlinks or prop=redirects query of the MediaWiki API
+    def handle_api(self, handler, query):
+        params = {name: values[0] for name, values in parse_qs(query).items()}
+        if params.get('prop') == 'redirects':
+            return self.handle_redirects(handler, params)
+        if params.get('list') != 'backlinks':
+            return self.respond(handler, 400)
+
+        # Page through the backlinks with a numeric continuation offset
+        sources = self.backlinks().get(params.get('bltitle', '').replace(' ', '_'), [])
+        offset = int(params.get('blcontinue', 0))
+        page = sources[offset:offset + BACKLINKS_PAGE_SIZE]
+        data = {'batchcomplete': True,
+                'query': {'backlinks': [{'ns': 0, 'title': title.replace('_', ' ')} for title in page]}}
+        if offset + BACKLINKS_PAGE_SIZE < len(sources):
+            data['continue'] = {'blcontinue': str(offset + BACKLINKS_PAGE_SIZE), 'continue': '-||'}
+        self.respond(handler, 200, json.dumps(data).encode('utf-8'), {'Content-Type': 'application/json'})
+
+    # Method that routes a request to a canned page or the API
+    def handle(self, handler):
+        parts = urlsplit(handler.path)
+        path = parts.path
+        if path == '/w/api.php':
+            return self.handle_api(handler, parts.query)
+        if not path.startswith('/wiki/'):
+            return self.respond(handler, 404)
+        title = unquote(path[len('/wiki/'):])
+        title = self.redirects.get(title, title)
+
+        # Inject configured transient failures
+        with self._lock:
+            if self.failures.get(title):
+                self.failures[title] -= 1
+                return self.respond(handler, self.failure_status, headers={'Retry-After': self.retry_after})
+        if title not in self.pages:
+            return self.respond(handler, 404)
+
+        # Serve the page, honouring conditional requests
+        body = self.pages[title].encode('utf-8')
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        headers = {'ETag': etag, 'Last-Modified': LAST_MODIFIED}
+        if handler.headers.get('If-None-Match') == etag:
+            return self.respond(handler, 304, headers=headers)
+        headers['Content-Type'] = 'text/html; charset=UTF-8'
+        self.respond(handler, 200, body, headers)
+
+
+# Define a function named synthetic_graph that generates a Wikipedia-like link graph as {title: [linked titles]}
+# Pages cluster by topic: most links stay within the page's topic, the rest go anywhere with a preference for popular pages
+def synthetic_graph(pages=2000, degree=20, local=0.8, seed=0):
+    rng = random.Random(seed)
+    titles = [f"{SYNTHETIC_TOPICS[index % len(SYNTHETIC_TOPICS)]}_{rng.choice(SYNTHETIC_WORDS)}_{index}" for index in range(pages)]
+    by_topic = {}
+    for index, title in enumerate(titles):
+        by_topic.setdefault(index % len(SYNTHETIC_TOPICS), []).append(title)
+
+    # Pages picked as link targets become more likely to be picked again, which grows hubs like real Wikipedia has
+    popular = list(titles)
+    graph = {}
+    for index, title in enumerate(titles):
+        links = set()
+        while len(links) < min(degree, pages - 1):
+            if rng.random() < local:
+                target = rng.choice(by_topic[index % len(SYNTHETIC_TOPICS)])
+            else:
+                target = rng.choice(popular)
+            if target != title:
+                links.add(target)
+        graph[title] = sorted(links)
+        popular.extend(rng.sample(graph[title], max(1, len(links) // 4)))
+    return graph
+
+
+# Define a function named synthetic_pages that renders a synthetic link graph as HTML pages
+def synthetic_pages(graph):
+    return {title: render_article(title, links) for title, links in graph.items()}
+
+
+# Define a function named save_pages that writes pages as Title.html files, the format load_pages reads
+def save_pages(pages, directory):
+    os.makedirs(directory, exist_ok=True)
+    for title, html in pages.items():
+        with open(os.path.join(directory, title + '.html'), 'w', encoding='utf-8') as page_file:
+            page_file.write(html)
+
+
+# Define a function named load_pages that reads saved article HTML files (Title.html) from a directory
+def load_pages(directory):
+    pages = {}
+    for name in os.listdir(directory):
+        if name.endswith('.html'):
+            with open(os.path.join(directory, name), encoding='utf-8') as page_file:
+                pages[name[:-len('.html')]] = page_file.read()
+    return pages
+
+
+# Entry point: serve a directory of saved pages (or a synthetic graph), e.g. for WIKI_STANDIN=http://127.0.0.1:8000 python server.py
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve saved Wikipedia HTML as a local stand-in for en.wikipedia.org.')
+    parser.add_argument('pages', nargs='?', help='directory of Title.html files')
+    parser.add_argument('--synthetic', type=int, help='serve a synthetic graph of this many pages instead')
+    parser.add_argument('--degree', type=int, default=20, help='links per synthetic page')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic graph')
+    parser.add_argument('--save', help='write the synthetic pages to this directory and exit')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    args = parser.parse_args()
+    if args.synthetic:
+        pages = synthetic_pages(synthetic_graph(args.synthetic, args.degree, seed=args.seed))
+    elif args.pages:
+        pages = load_pages(args.pages)
+    else:
+        parser.error('give a directory of pages or --synthetic')
+    if args.save:
+        save_pages(pages, args.save)
+        print(f"Saved {len(pages)} pages to {args.save}")
+        raise SystemExit
+    server = StandinServer(pages, port=args.port, latency=args.latency)
+    print(f"Serving {len(server.pages)} pages on {server.url}")
+    server.serve_forever()
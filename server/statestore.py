@@ -0,0 +1,534 @@
+import json  # Importing json for storing results, progress and log entries
+import time  # Importing time for expiry timestamps and polling
+import socket  # Importing socket for talking the Redis protocol
+import sqlite3  # Importing sqlite3 for the single-host shared store
+import threading  # Importing threading for locks, conditions and per-thread connections
+from collections import OrderedDict  # Importing OrderedDict for bounding the in-process store
+from urllib.parse import urlsplit, unquote  # Importing urlsplit for parsing store URIs
+from limits.storage import Storage  # Importing Storage for plugging the stores into Flask-Limiter
+
+# Seconds between two looks at a shared store while waiting for a search to finish
+POLL_INTERVAL = 0.1
+
+
+# Define a function named poll_status that waits up to timeout seconds for a search of a shared store to stop being pending
+# Stores shared between processes cannot be notified, so they are polled; the status is returned (None if the search is unknown)
+def poll_status(store, search_id, timeout):
+    deadline = time.monotonic() + timeout
+    status = store.status(search_id)
+    while status == 'pending' and time.monotonic() < deadline:
+        time.sleep(min(POLL_INTERVAL, max(0, deadline - time.monotonic())))
+        status = store.status(search_id)
+    return status
+
+
+# Define a class named MemoryStateStore, the state of the searches of a single process (the default)
+# Search records are kept in dictionaries; waiting for a result uses a condition instead of polling
+class MemoryStateStore:
+    # Whether other processes see this store; only shared stores get progress, logs and cancel requests published to them
+    shared = False
+
+    # Constructor method that takes the number of finished searches kept
+    def __init__(self, max_searches=1000):
+        self.max_searches = max_searches  # Number of finished searches kept before the oldest are forgotten
+        self._status = {}  # Search id to 'pending' or 'done'
+        self._results = OrderedDict()  # Results of finished searches, oldest first
+        self._condition = threading.Condition()  # Condition notified whenever a search's results are stored
+
+    # Method that records a search that has not finished yet
+    def start_search(self, search_id):
+        with self._condition:
+            self._status[search_id] = 'pending'
+
+    # Method that stores the results of a finished search, forgetting the oldest searches beyond max_searches
+    def finish_search(self, search_id, results):
+        with self._condition:
+            self._results[search_id] = results
+            self._status[search_id] = 'done'
+            while len(self._results) > self.max_searches:
+                old_search_id, _ = self._results.popitem(last=False)
+                self._status.pop(old_search_id, None)
+            self._condition.notify_all()
+
+    # Method that forgets a search
+    def forget_search(self, search_id):
+        with self._condition:
+            self._status.pop(search_id, None)
+            self._results.pop(search_id, None)
+            self._condition.notify_all()
+
+    # Method that returns 'pending' or 'done' for a known search, None otherwise
+    def status(self, search_id):
+        with self._condition:
+            return self._status.get(search_id)
+
+    # Method that returns the results of a finished search, or None
+    def results(self, search_id):
+        with self._condition:
+            return self._results.get(search_id)
+
+    # Method that waits up to timeout seconds for a search to finish and returns its status
+    def wait(self, search_id, timeout):
+        with self._condition:
+            self._condition.wait_for(lambda: self._status.get(search_id) != 'pending', timeout=timeout)
+            return self._status.get(search_id)
+
+
+# Define a class named SqliteStateStore, search records, log messages and rate-limit counters shared by the processes of one host
+# The database is in WAL mode, so the readers polling it never block the worker writing to it
+class SqliteStateStore:
+    # Whether other processes see this store
+    shared = True
+
+    # Constructor method that opens (or creates) the database
+    def __init__(self, path, ttl=3600, prune_every=100):
+        self.path = path  # SQLite database file shared by the worker processes
+        self.ttl = ttl  # Seconds a search record and its log are kept after its last update
+        self.prune_every = prune_every  # Number of finished searches between two prunings of old records
+        self._local = threading.local()  # Per-thread connections
+        self._finished = 0  # Number of searches finished by this process
+        self._lock = threading.Lock()  # Lock protecting the finished count
+
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS searches (search_id TEXT PRIMARY KEY, status TEXT NOT NULL, '
+                               'results TEXT, progress TEXT, cancel INTEGER NOT NULL DEFAULT 0, '
+                               'logs_closed INTEGER NOT NULL DEFAULT 0, updated_at REAL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS searches_updated ON searches (updated_at)')
+            connection.execute('CREATE TABLE IF NOT EXISTS logs (search_id TEXT, seq INTEGER, level INTEGER, message TEXT, '
+                               'PRIMARY KEY (search_id, seq)) WITHOUT ROWID')
+            connection.execute('CREATE TABLE IF NOT EXISTS counters (key TEXT PRIMARY KEY, value INTEGER NOT NULL, expires_at REAL NOT NULL)')
+
+    # Method that returns this thread's connection, in WAL mode so readers never block the writer
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    # Method that sets columns of a search's record
+    def _update(self, search_id, **columns):
+        connection = self._connection()
+        assignments = ', '.join(f"{name} = ?" for name in columns)
+        with connection:
+            connection.execute(f'UPDATE searches SET {assignments}, updated_at = ? WHERE search_id = ?',
+                               list(columns.values()) + [time.time(), search_id])
+
+    # Method that reads one column of a search's record
+    def _column(self, search_id, column):
+        row = self._connection().execute(f'SELECT {column} FROM searches WHERE search_id = ?', (search_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    # Method that records a search that has not finished yet
+    def start_search(self, search_id):
+        connection = self._connection()
+        with connection:
+            connection.execute('INSERT OR REPLACE INTO searches (search_id, status, updated_at) VALUES (?, ?, ?)',
+                               (search_id, 'pending', time.time()))
+
+    # Method that stores the results of a finished search, pruning old records every so often
+    def finish_search(self, search_id, results):
+        connection = self._connection()
+        with connection:
+            connection.execute('INSERT INTO searches (search_id, status, results, updated_at) VALUES (?, ?, ?, ?) '
+                               'ON CONFLICT (search_id) DO UPDATE SET status = excluded.status, results = excluded.results, '
+                               'updated_at = excluded.updated_at', (search_id, 'done', json.dumps(results), time.time()))
+        with self._lock:
+            self._finished += 1
+            prune = self._finished % self.prune_every == 0
+        if prune:
+            self.prune()
+
+    # Method that forgets a search and its log
+    def forget_search(self, search_id):
+        connection = self._connection()
+        with connection:
+            connection.execute('DELETE FROM searches WHERE search_id = ?', (search_id,))
+            connection.execute('DELETE FROM logs WHERE search_id = ?', (search_id,))
+
+    # Method that deletes the searches (and logs) not updated for ttl seconds, and the expired counters
+    def prune(self):
+        connection = self._connection()
+        now = time.time()
+        with connection:
+            deleted = connection.execute('DELETE FROM searches WHERE updated_at < ?', (now - self.ttl,)).rowcount
+            connection.execute('DELETE FROM logs WHERE search_id NOT IN (SELECT search_id FROM searches)')
+            connection.execute('DELETE FROM counters WHERE expires_at < ?', (now,))
+        return deleted
+
+    # Method that returns 'pending' or 'done' for a known search, None otherwise
+    def status(self, search_id):
+        return self._column(search_id, 'status')
+
+    # Method that returns the results of a finished search, or None
+    def results(self, search_id):
+        results = self._column(search_id, 'results')
+        return json.loads(results) if results is not None else None
+
+    # Method that waits up to timeout seconds for a search to finish and returns its status
+    def wait(self, search_id, timeout):
+        return poll_status(self, search_id, timeout)
+
+    # Method that stores the latest progress snapshot of a search
+    def put_progress(self, search_id, progress):
+        self._update(search_id, progress=json.dumps(progress))
+
+    # Method that returns the latest progress snapshot of a search, or None
+    def progress(self, search_id):
+        progress = self._column(search_id, 'progress')
+        return json.loads(progress) if progress is not None else None
+
+    # Method that asks the process running a search to cancel it
+    def request_cancel(self, search_id):
+        self._update(search_id, cancel=1)
+
+    # Method that returns which of a list of searches have been asked to cancel, clearing the requests so each is handled once
+    def take_cancel_requests(self, search_ids):
+        search_ids = list(search_ids)
+        if not search_ids:
+            return []
+        connection = self._connection()
+        query = 'UPDATE searches SET cancel = 0 WHERE cancel = 1 AND search_id IN ({}) RETURNING search_id'.format(','.join('?' * len(search_ids)))
+        with connection:
+            return [search_id for search_id, in connection.execute(query, search_ids).fetchall()]
+
+    # Method that appends (sequence number, level, message) entries to a search's log
+    def append_logs(self, search_id, entries):
+        connection = self._connection()
+        with connection:
+            connection.executemany('INSERT OR REPLACE INTO logs (search_id, seq, level, message) VALUES (?, ?, ?, ?)',
+                                   [(search_id, seq, level, message) for seq, level, message in entries])
+
+    # Method that marks a search's log as complete
+    def close_logs(self, search_id):
+        self._update(search_id, logs_closed=1)
+
+    # Method that returns the (sequence number, message) entries of a level or above after a sequence number, and whether the log is complete
+    # It returns None for an unknown search
+    def read_logs(self, search_id, after=0, level=0):
+        connection = self._connection()
+        closed = self._column(search_id, 'logs_closed')
+        if closed is None:
+            return None
+        entries = connection.execute('SELECT seq, message FROM logs WHERE search_id = ? AND seq > ? AND level >= ? ORDER BY seq',
+                                     (search_id, after, level)).fetchall()
+        return entries, bool(closed)
+
+    # Method that adds to a rate-limit counter, starting it with an expiry when it is new (or expired), and returns its value
+    def incr(self, key, expiry, amount=1):
+        connection = self._connection()
+        now = time.time()
+        with connection:
+            connection.execute('DELETE FROM counters WHERE key = ? AND expires_at <= ?', (key, now))
+            return connection.execute('INSERT INTO counters (key, value, expires_at) VALUES (?, ?, ?) '
+                                      'ON CONFLICT (key) DO UPDATE SET value = value + excluded.value RETURNING value',
+                                      (key, amount, now + expiry)).fetchone()[0]
+
+    # Method that returns the value of a rate-limit counter (0 if it is missing or expired)
+    def get(self, key):
+        row = self._connection().execute('SELECT value FROM counters WHERE key = ? AND expires_at > ?', (key, time.time())).fetchone()
+        return row[0] if row is not None else 0
+
+    # Method that returns when a rate-limit counter expires (now if it is missing)
+    def get_expiry(self, key):
+        row = self._connection().execute('SELECT expires_at FROM counters WHERE key = ?', (key,)).fetchone()
+        return row[0] if row is not None else time.time()
+
+    # Method that deletes a rate-limit counter
+    def clear(self, key):
+        connection = self._connection()
+        with connection:
+            connection.execute('DELETE FROM counters WHERE key = ?', (key,))
+
+    # Method that deletes every rate-limit counter and returns how many there were
+    def clear_all(self):
+        connection = self._connection()
+        with connection:
+            return connection.execute('DELETE FROM counters').rowcount
+
+    # Method that tells whether the database answers
+    def check(self):
+        return self._connection().execute('SELECT 1').fetchone() == (1,)
+
+
+# Commands that only read, which RespClient sends again on a new connection when the connection is lost
+RETRIED_COMMANDS = {'GET', 'HGET', 'HGETALL', 'EXISTS', 'PTTL', 'KEYS', 'ZRANGEBYSCORE', 'PING'}
+
+
+# Define an exception named RespError that is raised for error replies of a Redis-protocol server
+class RespError(Exception):
+    pass
+
+
+# Define a class named RespClient, a minimal client of the Redis serialization protocol (RESP2) with one connection per thread
+class RespClient:
+    # Constructor method that takes the server address, database number and optional password
+    def __init__(self, host='127.0.0.1', port=6379, db=0, password=None, timeout=5.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout  # Seconds a connect or reply may take
+        self._local = threading.local()  # Per-thread (socket, reader) pairs
+
+    # Method that returns this thread's connection, opening it (and authenticating and selecting the database) if needed
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            connection = self._local.connection = (sock, sock.makefile('rb'))
+            if self.password:
+                self._send(connection, ('AUTH', self.password))
+            if self.db:
+                self._send(connection, ('SELECT', self.db))
+        return connection
+
+    # Method that closes this thread's connection
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection[1].close()
+            connection[0].close()
+            self._local.connection = None
+
+    # Method that sends one command on a connection and returns its reply
+    def _send(self, connection, args):
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+        connection[0].sendall(b''.join(parts))
+        return read_reply(connection[1])
+
+    # Method that sends a command and returns its reply
+    # A lost connection is always dropped; only reads are sent again on a new one, since a write such as INCRBY or ZADD
+    # may have been applied before the connection broke, and repeating it would apply it twice
+    def command(self, *args):
+        try:
+            return self._send(self._connection(), args)
+        except OSError:
+            self.close()
+            if str(args[0]).upper() not in RETRIED_COMMANDS:
+                raise
+            return self._send(self._connection(), args)
+
+
+# Define a function named read_reply that reads one RESP2 reply from a binary file, decoding bulk strings as UTF-8
+def read_reply(reader):
+    line = reader.readline()
+    if not line:
+        raise ConnectionError('Connection closed by the server')
+    kind, rest = line[:1], line[1:-2]
+    if kind == b'+':
+        return rest.decode('utf-8')
+    if kind == b'-':
+        raise RespError(rest.decode('utf-8'))
+    if kind == b':':
+        return int(rest)
+    if kind == b'$':
+        length = int(rest)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)[:-2]
+        return data.decode('utf-8')
+    if kind == b'*':
+        length = int(rest)
+        return None if length < 0 else [read_reply(reader) for _ in range(length)]
+    raise RespError(f"Unexpected reply {line!r}")
+
+
+# Define a class named RespStateStore, search records, log messages and rate-limit counters kept on a Redis-protocol server
+# Every worker process on every host that talks to the same server sees the same searches
+# A search is a hash (status, results, progress, cancel, logs_closed) and its log a sorted set scored by sequence number; both expire after ttl seconds
+class RespStateStore:
+    # Whether other processes see this store
+    shared = True
+
+    # Constructor method that takes a RespClient, a key prefix and the seconds records are kept after their last update
+    def __init__(self, client, prefix='wiki:', ttl=3600):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    # Method that returns the key of a search's record
+    def _search_key(self, search_id):
+        return f"{self.prefix}search:{search_id}"
+
+    # Method that returns the key of a search's log
+    def _log_key(self, search_id):
+        return f"{self.prefix}log:{search_id}"
+
+    # Method that returns the key of a rate-limit counter
+    def _counter_key(self, key):
+        return f"{self.prefix}limit:{key}"
+
+    # Method that sets fields of a search's record and renews its expiry
+    def _update(self, search_id, **fields):
+        key = self._search_key(search_id)
+        args = [item for name, value in fields.items() for item in (name, value)]
+        self.client.command('HSET', key, *args)
+        self.client.command('EXPIRE', key, self.ttl)
+
+    # Method that sets fields of a search's record only if the search is known
+    def _update_known(self, search_id, **fields):
+        if self.client.command('EXISTS', self._search_key(search_id)):
+            self._update(search_id, **fields)
+
+    # Method that records a search that has not finished yet
+    def start_search(self, search_id):
+        self.client.command('DEL', self._search_key(search_id), self._log_key(search_id))
+        self._update(search_id, status='pending', cancel=0, logs_closed=0)
+
+    # Method that stores the results of a finished search
+    def finish_search(self, search_id, results):
+        self._update(search_id, status='done', results=json.dumps(results))
+
+    # Method that forgets a search and its log
+    def forget_search(self, search_id):
+        self.client.command('DEL', self._search_key(search_id), self._log_key(search_id))
+
+    # Method that returns 'pending' or 'done' for a known search, None otherwise
+    def status(self, search_id):
+        return self.client.command('HGET', self._search_key(search_id), 'status')
+
+    # Method that returns the results of a finished search, or None
+    def results(self, search_id):
+        results = self.client.command('HGET', self._search_key(search_id), 'results')
+        return json.loads(results) if results is not None else None
+
+    # Method that waits up to timeout seconds for a search to finish and returns its status
+    def wait(self, search_id, timeout):
+        return poll_status(self, search_id, timeout)
+
+    # Method that stores the latest progress snapshot of a search
+    def put_progress(self, search_id, progress):
+        self._update_known(search_id, progress=json.dumps(progress))
+
+    # Method that returns the latest progress snapshot of a search, or None
+    def progress(self, search_id):
+        progress = self.client.command('HGET', self._search_key(search_id), 'progress')
+        return json.loads(progress) if progress is not None else None
+
+    # Method that asks the process running a search to cancel it
+    def request_cancel(self, search_id):
+        self._update_known(search_id, cancel=1)
+
+    # Method that returns which of a list of searches have been asked to cancel, clearing the requests so each is handled once
+    # Only the process running a search takes its requests, so reading and clearing need not be atomic
+    def take_cancel_requests(self, search_ids):
+        requested = []
+        for search_id in search_ids:
+            if self.client.command('HGET', self._search_key(search_id), 'cancel') == '1':
+                self.client.command('HSET', self._search_key(search_id), 'cancel', 0)
+                requested.append(search_id)
+        return requested
+
+    # Method that appends (sequence number, level, message) entries to a search's log
+    def append_logs(self, search_id, entries):
+        if not entries:
+            return
+        key = self._log_key(search_id)
+        args = [item for seq, level, message in entries for item in (seq, json.dumps([seq, level, message]))]
+        self.client.command('ZADD', key, *args)
+        self.client.command('EXPIRE', key, self.ttl)
+
+    # Method that marks a search's log as complete
+    def close_logs(self, search_id):
+        self._update_known(search_id, logs_closed=1)
+
+    # Method that returns the (sequence number, message) entries of a level or above after a sequence number, and whether the log is complete
+    # It returns None for an unknown search
+    def read_logs(self, search_id, after=0, level=0):
+        closed = self.client.command('HGET', self._search_key(search_id), 'logs_closed')
+        if closed is None:
+            return None
+        entries = [json.loads(entry) for entry in self.client.command('ZRANGEBYSCORE', self._log_key(search_id), f"({after}", '+inf')]
+        return [(seq, message) for seq, entry_level, message in entries if entry_level >= level], closed == '1'
+
+    # Method that adds to a rate-limit counter, starting it with an expiry when it is new, and returns its value
+    def incr(self, key, expiry, amount=1):
+        key = self._counter_key(key)
+        value = self.client.command('INCRBY', key, amount)
+        if value == amount:
+            self.client.command('PEXPIRE', key, int(expiry * 1000))
+        return value
+
+    # Method that returns the value of a rate-limit counter (0 if it is missing or expired)
+    def get(self, key):
+        return int(self.client.command('GET', self._counter_key(key)) or 0)
+
+    # Method that returns when a rate-limit counter expires (now if it is missing)
+    def get_expiry(self, key):
+        milliseconds = self.client.command('PTTL', self._counter_key(key))
+        return time.time() + max(0, milliseconds) / 1000
+
+    # Method that deletes a rate-limit counter
+    def clear(self, key):
+        self.client.command('DEL', self._counter_key(key))
+
+    # Method that deletes every rate-limit counter and returns how many there were
+    def clear_all(self):
+        keys = self.client.command('KEYS', self._counter_key('*'))
+        return self.client.command('DEL', *keys) if keys else 0
+
+    # Method that tells whether the server answers
+    def check(self):
+        return self.client.command('PING') == 'PONG'
+
+
+# Define a class named StateStoreLimits that lets Flask-Limiter keep its fixed-window counters in a shared state store
+# It is selected with storage_uri='statestore://' and storage_options={'store': store}
+class StateStoreLimits(Storage):
+    STORAGE_SCHEME = ['statestore']
+
+    # Constructor method that takes the storage URI (unused) and the store to keep the counters in
+    def __init__(self, uri=None, wrap_exceptions=False, store=None, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.store = store
+
+    # Property with the exceptions of the underlying stores
+    @property
+    def base_exceptions(self):
+        return (sqlite3.Error, OSError, RespError)
+
+    # Method that adds to the counter of a key and returns its value
+    def incr(self, key, expiry, amount=1):
+        return self.store.incr(key, expiry, amount)
+
+    # Method that returns the counter of a key
+    def get(self, key):
+        return self.store.get(key)
+
+    # Method that returns when the counter of a key expires
+    def get_expiry(self, key):
+        return self.store.get_expiry(key)
+
+    # Method that tells whether the store answers
+    def check(self):
+        return self.store.check()
+
+    # Method that deletes every counter
+    def reset(self):
+        return self.store.clear_all()
+
+    # Method that deletes the counter of a key
+    def clear(self, key):
+        self.store.clear(key)
+
+
+# Define a function named open_state_store that opens the store named by a URI
+# 'memory://' keeps the state in this process; 'sqlite:///state.sqlite' (relative) or 'sqlite:////var/lib/state.sqlite' (absolute) shares it between the processes of one host;
+# 'redis://[:password@]host:port/db' shares it between hosts through a Redis-protocol server
+def open_state_store(uri, max_searches=1000, ttl=3600):
+    parts = urlsplit(uri)
+    if parts.scheme == 'memory':
+        return MemoryStateStore(max_searches)
+    if parts.scheme == 'sqlite':
+        return SqliteStateStore(unquote(parts.path[1:]), ttl=ttl)
+    if parts.scheme == 'redis':
+        db = int(parts.path.strip('/') or 0)
+        client = RespClient(parts.hostname or '127.0.0.1', parts.port or 6379, db, unquote(parts.password or '') or None)
+        return RespStateStore(client, ttl=ttl)
+    raise ValueError(f"Unknown state store {uri!r} (expected memory://, sqlite:///path or redis://host:port/db)")
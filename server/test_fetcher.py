@@ -0,0 +1,108 @@
+import time  # Importing time for measuring Retry-After delays
+import pytest  # Importing pytest for fixtures
+import requests  # Importing requests for the error a failed fetch raises
+from fetcher import Fetcher  # Importing the fetcher under test
+from standin import StandinServer, render_article  # Importing the local stand-in for en.wikipedia.org
+from titles import title_to_url  # Importing title_to_url for building article URLs
+
+# Canned pages served by the stand-in
+PAGES = {
+    'Alpha': render_article('Alpha', ['Beta', 'Gamma']),
+    'Beta': render_article('Beta', ['Alpha']),
+    'Gamma': render_article('Gamma', ['Beta']),
+}
+
+
+# Define a fixture named standin that serves the canned pages for one test
+@pytest.fixture
+def standin():
+    server = StandinServer(dict(PAGES))
+    server.start()
+    yield server
+    server.stop()
+
+
+# Define a function named make_fetcher that builds a fetcher pointed at the stand-in
+def make_fetcher(standin, **options):
+    options.setdefault('backoff', 0)
+    return Fetcher(host_overrides={'en.wikipedia.org': standin.url}, **options)
+
+
+# Define a function named test_keep_alive_reuses_one_connection that checks sequential fetches share a connection
+def test_keep_alive_reuses_one_connection(standin):
+    fetcher = make_fetcher(standin)
+    for title in ['Alpha', 'Beta', 'Gamma', 'Alpha']:
+        assert fetcher.fetch(title_to_url(title)).status_code == 200
+    assert standin.requests == 4
+    assert standin.connections == 1
+
+
+# Define a function named test_retries_503_then_succeeds that checks transient 503 answers are retried
+def test_retries_503_then_succeeds(standin):
+    standin.failures['Alpha'] = 2
+    fetcher = make_fetcher(standin)
+    result = fetcher.fetch(title_to_url('Alpha'))
+    assert result.status_code == 200
+    assert result.content == PAGES['Alpha'].encode('utf-8')
+    assert standin.requests == 3
+    assert fetcher.stats()['retries'] == 2
+    assert fetcher.stats()['errors'] == 0
+
+
+# Define a function named test_429_honours_retry_after that checks the fetcher waits as long as Retry-After asks
+def test_429_honours_retry_after(standin):
+    standin.failures['Beta'] = 1
+    standin.failure_status = 429
+    standin.retry_after = '1'
+    fetcher = make_fetcher(standin)
+    start = time.monotonic()
+    assert fetcher.fetch(title_to_url('Beta')).status_code == 200
+    assert time.monotonic() - start >= 1.0
+    assert fetcher.stats()['retries'] == 1
+
+
+# Define a function named test_gives_up_after_retries that checks the last failure is raised once the retries run out
+def test_gives_up_after_retries(standin):
+    standin.failures['Gamma'] = 10
+    fetcher = make_fetcher(standin, retries=2)
+    with pytest.raises(requests.exceptions.HTTPError):
+        fetcher.fetch(title_to_url('Gamma'))
+    assert standin.requests == 3
+    assert fetcher.stats()['retries'] == 2
+    assert fetcher.stats()['errors'] == 1
+
+
+# Define a function named test_etag_revalidation that checks stale entries are revalidated with a 304
+def test_etag_revalidation(standin, tmp_path):
+    fetcher = make_fetcher(standin, cache_path=str(tmp_path / 'pages.sqlite'), max_age=0)
+    first = fetcher.fetch(title_to_url('Alpha'))
+    second = fetcher.fetch(title_to_url('Alpha'))
+    assert not first.from_cache
+    assert second.from_cache
+    assert second.content == first.content
+    assert standin.requests == 2
+    stats = fetcher.stats()
+    assert stats['misses'] == 1
+    assert stats['revalidations'] == 1
+    # The 304 has no body, so only the first download counts towards the bytes
+    assert stats['bytes'] == len(first.content)
+
+
+# Define a function named test_fresh_entries_are_hits that checks fresh entries are served without a request
+def test_fresh_entries_are_hits(standin, tmp_path):
+    fetcher = make_fetcher(standin, cache_path=str(tmp_path / 'pages.sqlite'))
+    fetcher.fetch(title_to_url('Beta'))
+    assert fetcher.fetch(title_to_url('Beta')).from_cache
+    assert standin.requests == 1
+    assert fetcher.stats() == {'hits': 1, 'misses': 1, 'revalidations': 0, 'retries': 0, 'errors': 0,
+                               'bytes': len(PAGES['Beta'].encode('utf-8'))}
+
+
+# Define a function named test_cache_is_bounded that checks the least recently fetched pages are evicted past max_entries
+def test_cache_is_bounded(standin, tmp_path):
+    fetcher = make_fetcher(standin, cache_path=str(tmp_path / 'pages.sqlite'), max_entries=2)
+    for title in ['Alpha', 'Beta', 'Gamma']:
+        fetcher.fetch(title_to_url(title))
+    cached = [url for url, in fetcher._connection().execute('SELECT url FROM pages')]
+    assert len(cached) <= 2
+    assert title_to_url('Alpha') not in cached
@@ -0,0 +1,58 @@
+from linkcache import LinkCache, encode_ids, decode_ids  # Importing the link cache under test
+
+
+# Define a function named test_ids_round_trip that checks the delta encoding of id lists
+def test_ids_round_trip():
+    ids = [1, 127, 128, 16383, 16384, 2 ** 31 - 1]
+    assert decode_ids(encode_ids(reversed(ids))) == ids
+    assert decode_ids(encode_ids([])) == []
+
+
+# Define a function named test_evict_sweeps_unused_titles that checks eviction drops titles no cached page uses any more
+def test_evict_sweeps_unused_titles(tmp_path):
+    cache = LinkCache(str(tmp_path / 'links.sqlite'), max_entries=10)
+    for number in range(12):
+        cache.put_links(f'Page_{number}', [f'Only_from_{number}', f'Page_{(number + 1) % 12}'], 2)
+    assert cache.evict() == 3
+
+    # The evicted pages and the titles only they linked to are gone; every remaining list still reads back
+    titles = {title for title, in cache._connection().execute('SELECT title FROM titles')}
+    for number in range(3):
+        assert cache.get_links(f'Page_{number}') is None
+        assert f'Only_from_{number}' not in titles
+    for number in range(3, 12):
+        assert sorted(cache.get_links(f'Page_{number}')[0]) == sorted([f'Only_from_{number}', f'Page_{(number + 1) % 12}'])
+
+    # A title that a remaining page links to stays even though its own page was evicted
+    assert 'Page_0' in titles
+
+
+# Define a function named test_keywords_go_stale_on_their_own that checks keywords stored after the links get their own timestamp
+def test_keywords_go_stale_on_their_own(tmp_path):
+    cache = LinkCache(str(tmp_path / 'links.sqlite'), ttl=100)
+    cache.put_links('Page', ['Other'], 1)
+    with cache._connection() as connection:
+        connection.execute('UPDATE pages SET fetched_at = fetched_at - 150')
+    cache.put_keywords('Page', {'word': 1})
+    assert cache.get_links('Page') is None
+    assert cache.get_keywords('Page') == {'word': 1}
+
+
+# Define a function named test_links_survive_a_concurrent_sweep that checks a link list reads back whole while another connection evicts
+def test_links_survive_a_concurrent_sweep(tmp_path):
+    cache = LinkCache(str(tmp_path / 'links.sqlite'), max_entries=1)
+    cache.put_links('Old', ['Only_from_old'], 1)
+    cache.put_links('New', ['Other'], 1)
+
+    # Start the read, then let a second cache on the same file evict 'Old' and sweep its titles before the titles are looked up
+    titles_for = cache._titles_for
+
+    # Define a function named evict_first that runs the eviction between reading the row and reading its titles
+    def evict_first(connection, ids):
+        assert LinkCache(cache.path, max_entries=1).evict() > 0
+        return titles_for(connection, ids)
+
+    cache._titles_for = evict_first
+    assert cache.get_links('Old') == (['Only_from_old'], 1)
+    cache._titles_for = titles_for
+    assert cache.get_links('Old') is None
@@ -0,0 +1,59 @@
+import gzip  # Importing gzip for writing a compressed dump fixture
+import pytest  # Importing pytest for fixtures and expected errors
+from linkgraph import LinkGraph, build_graph, iter_dump_edges  # Importing the dump reader and graph under test
+
+# Articles 1-3 and the redirect 4 (Old_beta to Beta) of the page dump; 5 is a talk page
+PAGE_DUMP = ("INSERT INTO `page` VALUES (1,0,'Alpha','',0,0,0.5,'20240101000000',NULL,1,10,'wikitext',NULL),"
+             "(2,0,'Beta','',0,0,0.5,'20240101000000',NULL,1,10,'wikitext',NULL),"
+             "(3,0,'Gamma_(letter)','',0,0,0.5,'20240101000000',NULL,1,10,'wikitext',NULL),"
+             "(4,0,'Old_beta','',1,0,0.5,'20240101000000',NULL,1,10,'wikitext',NULL),"
+             "(5,1,'Alpha','',0,0,0.5,'20240101000000',NULL,1,10,'wikitext',NULL);\n")
+REDIRECT_DUMP = "INSERT INTO `redirect` VALUES (4,0,'Beta','','');\n"
+
+# The same links in the pre-2024 layout, (pl_from, pl_namespace, 'pl_title', pl_from_namespace), and in the current one,
+# (pl_from, pl_from_namespace, pl_target_id) with the targets in linktarget, (lt_id, lt_namespace, 'lt_title')
+OLD_PAGELINKS_DUMP = ("INSERT INTO `pagelinks` VALUES (1,0,'Old_beta',0),(1,0,'Gamma_(letter)',0),(1,10,'Infobox',0),"
+                      "(2,0,'Alpha',0),(3,0,'Missing_page',0),(5,0,'Beta',1);\n")
+PAGELINKS_DUMP = "INSERT INTO `pagelinks` VALUES (1,0,1),(1,0,2),(1,0,3),(2,0,4),(3,0,5),(5,1,6);\n"
+LINKTARGET_DUMP = ("INSERT INTO `linktarget` VALUES (1,0,'Old_beta'),(2,0,'Gamma_(letter)'),(3,10,'Infobox'),"
+                   "(4,0,'Alpha'),(5,0,'Missing_page'),(6,0,'Beta');\n")
+
+# Links both layouts describe, with the redirect merged into its target
+EXPECTED_EDGES = [('Alpha', 'Beta'), ('Alpha', 'Gamma_(letter)'), ('Beta', 'Alpha')]
+
+
+# Define a fixture named dumps that writes the dump fixtures and returns their paths by name
+@pytest.fixture
+def dumps(tmp_path):
+    paths = {}
+    for name, text in [('page', PAGE_DUMP), ('redirect', REDIRECT_DUMP), ('old_pagelinks', OLD_PAGELINKS_DUMP),
+                       ('pagelinks', PAGELINKS_DUMP), ('linktarget', LINKTARGET_DUMP)]:
+        paths[name] = str(tmp_path / f"{name}.sql.gz")
+        with gzip.open(paths[name], 'wt', encoding='utf-8') as dump:
+            dump.write(text)
+    return paths
+
+
+# Define a function named test_pre_2024_layout that checks links are read from pagelinks rows that carry their titles
+def test_pre_2024_layout(dumps):
+    edges = iter_dump_edges(dumps['page'], dumps['old_pagelinks'], dumps['redirect'])
+    assert sorted(edges) == EXPECTED_EDGES
+
+
+# Define a function named test_linktarget_layout that checks links are read through the linktarget dump
+def test_linktarget_layout(dumps, tmp_path):
+    edges = iter_dump_edges(dumps['page'], dumps['pagelinks'], dumps['redirect'], dumps['linktarget'])
+    build_graph(edges, str(tmp_path / 'graph'))
+    graph = LinkGraph(str(tmp_path / 'graph'))
+    alpha = graph.id_of('Alpha')
+    assert sorted(graph.title(page_id) for page_id in graph.neighbors(alpha)) == ['Beta', 'Gamma_(letter)']
+    assert graph.edge_count == len(EXPECTED_EDGES)
+    graph.close()
+
+
+# Define a function named test_layout_mismatch_fails that checks a pagelinks dump read in the wrong layout raises instead of giving no links
+def test_layout_mismatch_fails(dumps):
+    with pytest.raises(ValueError, match='linktarget'):
+        list(iter_dump_edges(dumps['page'], dumps['pagelinks'], dumps['redirect']))
+    with pytest.raises(ValueError, match='pre-2024'):
+        list(iter_dump_edges(dumps['page'], dumps['old_pagelinks'], dumps['redirect'], dumps['linktarget']))
@@ -0,0 +1,11 @@
+from resultcache import result_key  # Importing the key function under test
+
+
+# Define a function named test_result_key_heuristic that checks the heuristic splits the keys of searches that run A* only
+def test_result_key_heuristic():
+    start, finish = 'https://en.wikipedia.org/wiki/Alpha', 'https://en.wikipedia.org/wiki/Beta'
+    assert result_key(start, finish, 'a_star') == result_key(start, finish, 'a_star', 'titles')
+    assert result_key(start, finish, 'a_star', 'content') != result_key(start, finish, 'a_star', 'titles')
+    assert result_key(start, finish, 'race', 'landmarks') != result_key(start, finish, 'race', 'titles')
+    assert result_key(start, finish, 'race', 'titles') != result_key(start, finish, 'race')
+    assert result_key(start, finish, 'breadth-first') == 'breadth-first\nAlpha\nBeta'
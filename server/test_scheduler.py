@@ -0,0 +1,16 @@
+import pytest  # Importing pytest for expected errors
+from scheduler import SearchBudget  # Importing the budget under test
+
+
+# Define a function named test_budget_parses_limits that checks limits are read as numbers of the right type
+def test_budget_parses_limits():
+    budget = SearchBudget.from_dict({'deadline': '2.5', 'max_pages': 10})
+    assert budget.to_dict() == {'deadline': 2.5, 'max_pages': 10, 'max_frontier': None, 'max_visited': None}
+
+
+# Define a function named test_budget_rejects_bad_limits that checks limits that could never be reached are refused
+@pytest.mark.parametrize('limits', [{'deadline': float('nan')}, {'deadline': 'inf'}, {'max_pages': float('inf')},
+                                    {'max_visited': 'nan'}, {'deadline': 0}, {'max_frontier': -1}])
+def test_budget_rejects_bad_limits(limits):
+    with pytest.raises(ValueError):
+        SearchBudget.from_dict(limits)
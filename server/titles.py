@@ -0,0 +1,52 @@
+from urllib.parse import quote, unquote  # Importing quote and unquote for percent-encoding article titles
+
+# Origin and base URL shared by every English Wikipedia article page
+WIKI_ORIGIN = 'https://en.wikipedia.org'
+WIKI_PREFIX = WIKI_ORIGIN + '/wiki/'
+
+# Characters MediaWiki leaves unescaped when it writes article links
+WIKI_SAFE_CHARS = ";@$!*(),/~:'"
+
+# Other prefixes of URLs naming the same articles (plain HTTP, protocol-relative and the mobile site)
+WIKI_ALTERNATE_PREFIXES = ('http://en.wikipedia.org/wiki/', '//en.wikipedia.org/wiki/',
+                           'https://en.m.wikipedia.org/wiki/', 'http://en.m.wikipedia.org/wiki/')
+
+
+# Define a function named url_to_title that takes an article URL (or a bare title) as input
+# The title is canonical: every spelling of the same article URL gives the same title, so they share one graph node
+def url_to_title(url):
+    # Strip the article prefix if the input is a full URL, dropping the query string and section fragment
+    if url.startswith(WIKI_PREFIX):
+        url = url[len(WIKI_PREFIX):]
+    elif url.startswith(WIKI_ALTERNATE_PREFIXES):
+        url = url[url.index('/wiki/') + len('/wiki/'):]
+    else:
+        return canonical_title(url)
+    return canonical_title(url.partition('?')[0])
+
+
+# Define a function named canonical_title that normalizes a title the way MediaWiki does
+def canonical_title(title):
+    # Drop the section fragment, decode percent-escapes and store spaces as underscores
+    title = unquote(title.partition('#')[0]).replace(' ', '_')
+
+    # Collapse runs of underscores and strip them from both ends
+    if '__' in title or title.startswith('_') or title.endswith('_'):
+        title = '_'.join(part for part in title.split('_') if part)
+
+    # Upper-case the first letter (unless that changes its length, as for 'ß')
+    first = title[:1].upper()
+    if first != title[:1] and len(first) == 1:
+        title = first + title[1:]
+    return title
+
+
+# Define a function named title_to_url that takes an article title as input
+def title_to_url(title):
+    # Percent-encode the title the same way Wikipedia encodes its own links
+    return WIKI_PREFIX + quote(title, safe=WIKI_SAFE_CHARS)
+
+
+# Define a function named canonical_url that returns the canonical URL of an article URL (or a bare title)
+def canonical_url(url):
+    return title_to_url(url_to_title(url))
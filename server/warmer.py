@@ -0,0 +1,207 @@
+import time  # Importing time for the rate budget and the cycle timings
+import threading  # Importing threading for the warmer thread, its locks and its stop event
+from collections import Counter  # Importing Counter for the page popularity scores
+from concurrent.futures import ThreadPoolExecutor  # Importing ThreadPoolExecutor for the bounded warming fetches
+import crawler  # Importing crawler for its link fetching and caches (read at call time, so swapped caches are followed)
+import metrics  # Importing metrics for exporting the warmer's progress
+from metrics import Counter as MetricCounter  # Importing the metric counter type (Counter here is the popularity one)
+from logstream import LogChannel, ERROR  # Importing LogChannel for keeping the warmer's errors
+from titles import url_to_title, title_to_url  # Importing title helpers for keying the popularity scores
+
+# Pages the warmer handled, by whether they were fetched, already cached or failed
+WARMER_PAGES = MetricCounter('wiki_warmer_pages_total', 'Pages handled by the cache warmer, by result')
+
+# Search id the warmer's fetches run under (it has no scheduler context, so it never counts against a search's budget)
+WARMER_SEARCH_ID = 'warmer'
+
+
+# Define a class named CacheWarmer, a background crawler that fills the link cache around popular pages
+# Pages are scored by how often they are searched from or to, and how often they lie on found paths (the hubs nearly every path goes through)
+# Each cycle fetches the most popular pages and then their out-links, a bounded number of pages at a time within a rate budget,
+# and waits whenever the busy callable says interactive searches need the capacity
+class CacheWarmer:
+    # Constructor method that takes the warming limits and a callable telling whether searches are waiting for capacity
+    def __init__(self, busy=None, concurrency=2, rate=2.0, interval=600, seeds=50, neighbors=100, decay=0.5):
+        self.busy = busy or (lambda: False)  # Returns True while interactive searches need the capacity
+        self.concurrency = concurrency  # Number of pages fetched at the same time
+        self.rate = rate  # Pages fetched per second at most
+        self.interval = interval  # Seconds between the starts of two cycles
+        self.seeds = seeds  # Number of most popular pages warmed per cycle
+        self.neighbors = neighbors  # Number of out-links of each popular page warmed per cycle
+        self.decay = decay  # Factor applied to every popularity score after each cycle, so old searches fade
+        self.logs = LogChannel(capacity=100, level=ERROR)  # Errors of the warming fetches
+        self._scores = Counter()  # Page title to popularity score
+        self._finishes = set()  # Titles searched to, whose backlinks and redirects are warmed too
+        self._lock = threading.Lock()  # Lock protecting the scores and the progress
+        self._stop = threading.Event()  # Set to stop the warmer
+        self._wake = threading.Event()  # Set to start the next cycle early
+        self._thread = None
+        self._next_fetch = 0.0  # time.monotonic() before which no fetch may start (the rate budget)
+        self._progress = {'cycles': 0, 'planned': 0, 'fetched': 0, 'already_cached': 0,
+                          'errors': 0, 'paused_seconds': 0.0, 'cycle_started_at': None, 'last_cycle_seconds': None}
+
+    # Method that records a search request: its start and finish pages become more popular
+    def record_query(self, start_page, finish_pages):
+        with self._lock:
+            self._scores[url_to_title(start_page)] += 1
+            for finish_page in finish_pages:
+                self._scores[url_to_title(finish_page)] += 1
+                self._finishes.add(url_to_title(finish_page))
+
+    # Method that records a found path: the pages between its ends are hubs searches pass through
+    def record_path(self, path):
+        with self._lock:
+            for page in path[1:-1]:
+                self._scores[url_to_title(page)] += 1
+
+    # Method that seeds the popularity scores from the recent results of a result cache
+    # Result keys are "method\nstart\nfinish[\nheuristic]" (see resultcache.result_key)
+    def load_recent(self, result_cache, limit=1000):
+        for key, result in result_cache.recent(limit):
+            parts = key.split('\n')
+            self.record_query(title_to_url(parts[1]), [title_to_url(parts[2])])
+            if result.get('path'):
+                self.record_path(result['path'])
+
+    # Method that returns the most popular titles, with the finish pages among them
+    def popular(self):
+        with self._lock:
+            titles = [title for title, _ in self._scores.most_common(self.seeds)]
+            return titles, self._finishes.intersection(titles)
+
+    # Method that starts the warmer thread
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='cache-warmer', daemon=True)
+            self._thread.start()
+
+    # Method that stops the warmer thread after the fetches in flight
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    # Method that starts the next cycle now instead of after the interval
+    def wake(self):
+        self._wake.set()
+
+    # Method that returns the progress of the current (or last) cycle and how much of its plan is cached
+    def stats(self):
+        with self._lock:
+            progress = dict(self._progress, tracked_pages=len(self._scores))
+        covered = progress['fetched'] + progress['already_cached']
+        progress['coverage'] = covered / progress['planned'] if progress['planned'] else None
+        progress['running'] = self._thread is not None
+        progress['paused'] = self.busy()
+        return progress
+
+    # Method that adds to the progress counters of the current cycle
+    def _add(self, **amounts):
+        with self._lock:
+            for name, amount in amounts.items():
+                self._progress[name] += amount
+
+    # Method that waits until a fetch may start: no search needs the capacity and the rate budget allows it
+    # It returns False once the warmer is stopped
+    def _wait_for_turn(self):
+        paused_at = time.monotonic()
+        while self.busy() and not self._stop.wait(0.5):
+            pass
+        self._add(paused_seconds=time.monotonic() - paused_at)
+        if self._stop.is_set():
+            return False
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_fetch)
+            self._next_fetch = start_at + 1 / self.rate
+        return not self._stop.wait(start_at - now)
+
+    # Method that fills the link cache with the links of one page (and the backlinks and redirects of a finish page)
+    # It returns the page's links, or None if the page could not be fetched
+    def _warm(self, title, finish=False):
+        page_url = title_to_url(title)
+        try:
+            links, _ = crawler.get_links(page_url, self.logs, WARMER_SEARCH_ID)
+            if finish:
+                crawler.load_redirects_to(page_url, self.logs)
+                crawler.get_backlinks(page_url, self.logs, WARMER_SEARCH_ID)
+        except Exception as e:
+            self.logs.put(f"Warming {title} failed: {type(e).__name__}: {e}", ERROR)
+            links = None
+        return links
+
+    # Method that warms a list of titles with bounded concurrency, skipping the ones whose links are cached
+    # It returns {title: links} of the titles that were fetched
+    def _warm_all(self, pool, titles, finishes=()):
+        fresh = crawler.link_cache.fresh_titles(titles)
+        self._add(already_cached=len(fresh))
+        if metrics.ENABLED and fresh:
+            WARMER_PAGES.inc(len(fresh), result='cached')
+        slots = threading.BoundedSemaphore(self.concurrency)
+        futures = {}
+        for title in titles:
+            if title in fresh:
+                continue
+            slots.acquire()
+            if not self._wait_for_turn():
+                slots.release()
+                break
+            future = pool.submit(self._warm, title, title in finishes)
+            future.add_done_callback(lambda _: slots.release())
+            futures[title] = future
+        links = {}
+        for title, future in futures.items():
+            links[title] = future.result()
+            failed = links[title] is None
+            self._add(**{'errors' if failed else 'fetched': 1})
+            if metrics.ENABLED:
+                WARMER_PAGES.inc(result='error' if failed else 'fetched')
+        return links
+
+    # Method that runs one cycle: the popular pages first, then the out-links of each
+    def warm_once(self):
+        titles, finishes = self.popular()
+        cycle_start_time = time.monotonic()
+        with self._lock:
+            self._progress.update(cycles=self._progress['cycles'] + 1, planned=len(titles), fetched=0, already_cached=0,
+                                  errors=0, cycle_started_at=time.time())
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='cache-warmer') as pool:
+            # The popular pages come first; the links of the ones already cached are read back from the cache
+            self._warm_all(pool, titles, finishes)
+            neighborhood = []
+            for title in titles:
+                if self._stop.is_set():
+                    break
+                cached = crawler.link_cache.get_links(title)
+                neighborhood.extend((cached[0] if cached else [])[:self.neighbors])
+            seeds = set(titles)
+            neighborhood = [title for title in dict.fromkeys(neighborhood) if title not in seeds]
+
+            # Then their neighborhoods, which every search from or through them expands next
+            with self._lock:
+                self._progress['planned'] += len(neighborhood)
+            if not self._stop.is_set():
+                self._warm_all(pool, neighborhood)
+
+        with self._lock:
+            self._progress['last_cycle_seconds'] = time.monotonic() - cycle_start_time
+            for title in self._scores:
+                self._scores[title] *= self.decay
+            # Forget the pages whose scores have faded away
+            for title in [title for title, score in self._scores.items() if score < 0.1]:
+                del self._scores[title]
+                self._finishes.discard(title)
+
+    # Method run by the warmer thread: one cycle every interval seconds (or sooner when woken)
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.warm_once()
+            except Exception as e:
+                self.logs.put(f"Warming cycle failed: {type(e).__name__}: {e}", ERROR)
+            self._wake.wait(self.interval)
+            self._wake.clear()
+